@@ -9,6 +9,17 @@ class Settings(BaseSettings):
     DB_NAME: str = "swahili_tts"
     MODEL_CACHE_DIR: str = "./model_cache"
 
+    # Model registry (comma-separated model names)
+    PRELOAD_MODELS: str = ""
+    PINNED_MODELS: str = ""
+    MODEL_WARMUP: bool = True
+    MODEL_MEMORY_BUDGET_MB: int = 0  # 0 means no limit
+    INFERENCE_BACKEND: str = "eager"  # "eager" or "torchscript"
+    SHARED_WEIGHTS: bool = False  # memory-map fp32 weights so workers share one copy
+
+    # Voice catalog
+    VOICE_CATALOG_REFRESH_SECONDS: int = 60
+
     SECRET_KEY: str = "your-secret-key-here"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 240
@@ -24,6 +35,60 @@ class Settings(BaseSettings):
 
     FRONTEND_URL: str = "http://localhost:8000"
 
+    # Inference executor (per worker process)
+    INFERENCE_WORKERS: int = 1
+    INFERENCE_MAX_QUEUE: int = 8
+    INFERENCE_RETRY_AFTER: int = 5
+    TORCH_NUM_THREADS: int = 0  # 0 keeps torch's default
+
+    # Dedicated inference process pool (see inference_server.py); when the
+    # socket is set, HTTP workers send synthesis there instead of running it
+    INFERENCE_POOL_SOCKET: str = ""
+    INFERENCE_POOL_PROCESSES: int = 2
+    INFERENCE_POOL_TORCH_THREADS: int = 1
+    INFERENCE_POOL_AUTHKEY: str = ""  # shared secret for pool connections, SECRET_KEY when empty
+
+    # Cross-request dynamic batching
+    BATCHING_ENABLED: bool = False
+    BATCH_MAX_SIZE: int = 8
+    BATCH_MAX_WAIT_MS: float = 20
+    BATCH_BUCKET_EDGES: str = "64,128,256"  # token-length bucket edges, also used by sentence batching
+    BATCH_MAX_TOKENS: int = 2048  # padded tokens per batch, 0 for no limit
+
+    # Intra-request batching of all sentences in one text
+    SENTENCE_BATCHING_ENABLED: bool = False
+    SENTENCE_BATCH_SIZE: int = 16
+
+    # Synthesized audio cache
+    AUDIO_CACHE_ENABLED: bool = True
+    AUDIO_CACHE_MEMORY_MB: int = 64
+    AUDIO_CACHE_DIR: str = "./audio_cache"
+    AUDIO_CACHE_DISK_MB: int = 1024  # 0 disables the disk tier
+    SENTENCE_CACHE_MB: int = 128  # 0 disables the sentence cache
+    TOKEN_CACHE_SIZE: int = 8192  # tokenized sentences kept in memory, 0 disables
+
+    # Text normalization and sentence segmentation
+    NORMALIZATION_CACHE_SIZE: int = 1024  # normalized texts kept in memory
+    SENTENCE_MAX_CHARS: int = 250  # longer sentences are cut at clause boundaries
+
+    # Per-request latency tracing
+    SERVER_TIMING_ENABLED: bool = True  # send each request's stage timings in a Server-Timing header
+    TRACE_LOG_FILE: str = ""  # JSON trace per request, one per line, e.g. traces.log; empty logs them to api.log
+
+    # Prometheus metrics; with several workers, a directory they all share
+    PROMETHEUS_MULTIPROC_DIR: str = ""
+
+    # Bulk synthesis endpoint
+    BULK_MAX_ITEMS: int = 1000
+    BULK_CHUNK_SIZE: int = 16  # items per batched inference call
+
+    # Background TTS jobs (per worker process)
+    JOBS_ENABLED: bool = True
+    JOB_CONCURRENCY: int = 1
+    JOB_POLL_SECONDS: float = 2
+    JOB_LEASE_SECONDS: int = 120  # a running job not heartbeating for this long is resumed elsewhere
+    JOB_RETENTION_HOURS: float = 24  # finished jobs and their audio are deleted this long after; 0 keeps them
+
     class Config:
         env_file = ".env"
 
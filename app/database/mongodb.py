@@ -1,12 +1,13 @@
 # app/database/mongodb.py
 from motor.motor_asyncio import AsyncIOMotorClient
 from ..config import settings
+from ..services.metrics import MongoCommandMetrics
 
 class Database:
     client: AsyncIOMotorClient = None
 
 async def connect_to_mongo():
-    Database.client = AsyncIOMotorClient(settings.MONGODB_URL)
+    Database.client = AsyncIOMotorClient(settings.MONGODB_URL, event_listeners=[MongoCommandMetrics()])
 
 async def close_mongo_connection():
     if Database.client:
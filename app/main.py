@@ -2,11 +2,18 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .database.mongodb import connect_to_mongo, close_mongo_connection
+from .services.inference_executor import inference_executor
+from .services.job_service import job_worker
+from .services.model_registry import model_registry, parse_model_list
+from .services.metrics import CONTENT_TYPE_LATEST, MetricsMiddleware, render_metrics
+from .services.request_trace import RequestTraceMiddleware, configure_trace_log
+from .config import settings
 import logging
 import time
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
 from starlette.responses import Response
+from starlette.concurrency import run_in_threadpool
 
 # Import route files
 from .routes.auth import router as auth_router
@@ -15,6 +22,7 @@ from .routes.texts import router as texts_router
 from .routes.tts import router as tts_router
 from .routes.utils import router as utils_router
 from .routes.admin import router as admin_router
+from .routes.jobs import router as jobs_router
 
 # Configure logging
 logging.basicConfig(
@@ -26,6 +34,14 @@ logging.basicConfig(
     ]
 )
 logger = logging.getLogger("swahili-voice-api")
+configure_trace_log(settings.TRACE_LOG_FILE)
+
+# Load voice models before gunicorn forks its workers (with --preload) so
+# every worker shares the same weight pages copy-on-write; otherwise every
+# process that imports the app serves it and loads them itself. With an
+# inference pool the models live in the pool's processes instead.
+if not settings.INFERENCE_POOL_SOCKET:
+    model_registry.preload(parse_model_list(settings.PRELOAD_MODELS), warm_up=settings.MODEL_WARMUP)
 
 app = FastAPI()
 
@@ -42,6 +58,12 @@ class TimingMiddleware(BaseHTTPMiddleware):
 # Add timing middleware
 app.add_middleware(TimingMiddleware)
 
+# Prometheus request metrics, inside the tracing middleware so they see each request's trace
+app.add_middleware(MetricsMiddleware)
+
+# Per-stage request traces: Server-Timing header and JSON trace log
+app.add_middleware(RequestTraceMiddleware, server_timing=settings.SERVER_TIMING_ENABLED)
+
 @app.middleware("http")
 async def set_scheme_https(request, call_next):
     if request.headers.get("x-forwarded-proto") == "https":
@@ -62,7 +84,10 @@ app.add_middleware(
 
 # Event handlers
 app.add_event_handler("startup", connect_to_mongo)
+app.add_event_handler("startup", job_worker.start)
+app.add_event_handler("shutdown", job_worker.stop)
 app.add_event_handler("shutdown", close_mongo_connection)
+app.add_event_handler("shutdown", inference_executor.shutdown)
 
 # Log startup event
 @app.on_event("startup")
@@ -71,12 +96,19 @@ async def startup_event():
 
 
 
+# Prometheus metrics, aggregated over all workers when PROMETHEUS_MULTIPROC_DIR is set
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(await run_in_threadpool(render_metrics), headers={"Content-Type": CONTENT_TYPE_LATEST})
+
+
 # Register routers
 app.include_router(auth_router)
 app.include_router(admin_router)
 app.include_router(user_texts_router)
 app.include_router(texts_router)
 app.include_router(tts_router)
+app.include_router(jobs_router)
 app.include_router(utils_router)
 
 
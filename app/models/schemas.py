@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, ConfigDict, EmailStr
-from typing import Optional, Annotated
+from typing import Optional, Annotated, List, Literal
 from datetime import datetime, timezone
 from enum import Enum
 from bson import ObjectId
@@ -61,6 +61,73 @@ class TrainingTextInDB(TrainingText):
 
 class TTSRequest(BaseModel):
     text: str
+    stream: bool = False  # send audio sentence by sentence as it is generated
+    format: str = "wav"  # wav, opus (in OGG), flac or mp3; see GET /tts/formats
+    sample_rate: Optional[int] = Field(default=None, ge=8000, le=48000)  # resample to this rate; None keeps the model's
+    sample_format: Literal["int16", "float32", "mulaw"] = "int16"  # WAV sample encoding; compressed formats use int16
+    speaking_rate: Optional[float] = Field(default=None, ge=0.5, le=2.0)  # >1 speaks faster; None keeps the model's
+    noise_scale: Optional[float] = Field(default=None, ge=0.0, le=1.5)  # prosody variation; None keeps the model's
+    sentence_silence_ms: int = Field(default=0, ge=0, le=5000)  # silence inserted between sentences
+    loudness_dbfs: Optional[float] = Field(default=None, ge=-40.0, le=-1.0)  # normalize each sentence to this RMS level
+
+# Voice catalog entry mapping a voice ID used in /tts/{voice} to a model repo
+class VoiceConfig(BaseModel):
+    voice_id: str
+    model_name: str
+    display_name: Optional[str] = None
+    max_concurrency: Optional[int] = None  # in-flight syntheses per worker, None for no limit
+    default_params: dict = Field(default_factory=dict)  # defaults for TTSRequest fields
+    quantized: bool = False  # run the dynamic int8 variant of the model
+    backend: Optional[str] = None  # "eager" or "torchscript"; None uses INFERENCE_BACKEND
+    enabled: bool = True
+
+    model_config = ConfigDict(protected_namespaces=())
+
+# Bulk synthesis of many items into one archive
+class BulkTTSItem(BaseModel):
+    id: str = Field(pattern=r"^[A-Za-z0-9_-][A-Za-z0-9_.-]*$", max_length=128)  # used as the file name
+    text: str
+    voice: str
+
+class BulkTTSRequest(BaseModel):
+    items: List[BulkTTSItem]
+    format: Literal["zip", "tar"] = "zip"
+
+# Background synthesis jobs for long texts
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+class TTSJobCreate(BaseModel):
+    voice: str
+    text: str
+    priority: int = 0  # higher runs first
+
+class TTSJobInDB(BaseModel):
+    id: PyObjectId = Field(alias="_id", default_factory=PyObjectId)
+    voice: str
+    model_name: str
+    status: JobStatus = JobStatus.QUEUED
+    priority: int = 0
+    total_sentences: int
+    done_sentences: int = 0
+    sample_rate: Optional[int] = None
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=lambda:datetime.now(timezone.utc))
+    updated_at: datetime = Field(default_factory=lambda:datetime.now(timezone.utc))
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None  # when the job and its audio are deleted
+
+    model_config = ConfigDict(
+        arbitrary_types_allowed=True,
+        json_encoders={ObjectId: str},
+        populate_by_name=True,
+        protected_namespaces=()
+    )
 
 # Updated User models with PyObjectId
 
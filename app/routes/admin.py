@@ -4,10 +4,13 @@ from typing import Annotated
 from jose import JWTError, jwt
 from app.services.user_service import UserService
 from app.services.user_text_service import UserTextService
+from app.services.model_registry import model_registry, resolve_model_key
+from app.services.voice_service import VoiceService
 from app.config import settings
 
 from app.models.schemas import (
-    UserUpdate
+    UserUpdate,
+    VoiceConfig
 )
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
@@ -33,6 +36,9 @@ async def get_user_text_service():
 async def get_user_service():
     return UserService()
 
+async def get_voice_service():
+    return VoiceService()
+
 
 # User texts router with authentication
 router = APIRouter(
@@ -79,5 +85,37 @@ async def delete_user_texts(
 ):
    
     return await service2.delete_texts_by_user(user_id)
-          
-   
\ No newline at end of file
+
+
+@router.put("/models/pin", description="pin or unpin a voice model so it is never evicted")
+async def pin_model(model_name: str, pinned: bool = True):
+    model_name = resolve_model_key(model_name)
+    if pinned:
+        model_registry.pin(model_name)
+    else:
+        model_registry.unpin(model_name)
+    return {"model_name": model_name, "pinned": pinned}
+
+@router.delete("/models", description="evict a voice model from this worker's memory")
+async def evict_model(model_name: str):
+    model_name = resolve_model_key(model_name)
+    if not model_registry.evict(model_name):
+        raise HTTPException(status_code=404, detail="Model not loaded")
+    return {"message": f"Model {model_name} evicted"}
+
+
+@router.put("/voices", response_model=VoiceConfig, description="add or update a voice in the voice catalog")
+async def upsert_voice(
+    voice: VoiceConfig,
+    service: VoiceService = Depends(get_voice_service)
+):
+    return await service.upsert_voice(voice)
+
+@router.delete("/voices/{voice_id}", description="remove a voice from the voice catalog")
+async def delete_voice(
+    voice_id: str,
+    service: VoiceService = Depends(get_voice_service)
+):
+    if not await service.delete_voice(voice_id):
+        raise HTTPException(status_code=404, detail="Voice not found")
+    return {"message": f"Voice {voice_id} deleted"}
@@ -0,0 +1,108 @@
+# app/routes/jobs.py
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from app.services.job_service import JobService
+from app.services.model_registry import model_key
+from app.services.tts_service import split_into_sentences
+from app.services.voice_service import voice_catalog
+from app.services.text_normalizer import normalize_text
+from app.models.schemas import JobStatus, TTSJobCreate, TTSJobInDB
+import logging
+
+logger = logging.getLogger("swahili-voice-api")
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+async def get_job_service():
+    return JobService()
+
+
+def job_status(job: TTSJobInDB) -> dict:
+    status = job.model_dump()
+    status["progress"] = job.done_sentences / job.total_sentences if job.total_sentences else 1.0
+    return status
+
+
+@router.post("/", status_code=202, description="""
+Queue a long text for background synthesis and get a job ID back right away. Use this instead of `POST /tts/{voice}` for texts that take longer than a request timeout to synthesize. Jobs with a higher `priority` run first.
+
+Example using curl:
+```bash
+curl -X POST "http://localhost:8000/jobs/" \\
+     -H "Content-Type: application/json" \\
+     -d '{"voice": "benny", "text": "Habari za asubuhi. Karibu sana.", "priority": 0}'
+```
+
+The API will:
+1. Normalize the text and split it into sentences
+2. Store the job in MongoDB with status `queued`
+3. Return the job, including its `id`, for polling `GET /jobs/{job_id}`
+""")
+async def create_job(request: TTSJobCreate, service: JobService = Depends(get_job_service)):
+    voice = await voice_catalog.get(request.voice)
+    if voice is None:
+        raise HTTPException(status_code=404, detail=f"Voice '{request.voice}' not found")
+
+    sentences = split_into_sentences(normalize_text(request.text))
+    if not sentences:
+        raise HTTPException(status_code=400, detail="Text is empty")
+
+    job = await service.create_job(
+        request.voice,
+        model_key(voice.model_name, quantized=voice.quantized, backend=voice.backend),
+        sentences,
+        request.priority,
+    )
+    logger.info(f"Queued job {job.id} for voice '{request.voice}' ({len(sentences)} sentences)")
+    return job_status(job)
+
+
+@router.get("/{job_id}", description="""
+Get a job's status and progress: `done_sentences` out of `total_sentences`, and `progress` as a fraction.
+
+Example using curl:
+```bash
+curl -X GET "http://localhost:8000/jobs/6650f1c2a1b2c3d4e5f60789"
+```
+""")
+async def get_job(job_id: str, service: JobService = Depends(get_job_service)):
+    job = await service.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_status(job)
+
+
+@router.get("/{job_id}/audio", description="""
+Download the audio of a completed job as a WAV file. Returns 409 while the job is still queued or running.
+
+Example using curl:
+```bash
+curl -X GET "http://localhost:8000/jobs/6650f1c2a1b2c3d4e5f60789/audio" --output job.wav
+```
+""")
+async def get_job_audio(job_id: str, service: JobService = Depends(get_job_service)):
+    job = await service.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status != JobStatus.COMPLETED:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status.value}")
+    return StreamingResponse(
+        service.iter_wav(job),
+        media_type="audio/wav",
+        headers={"Content-Disposition": f'attachment; filename="{job_id}.wav"'}
+    )
+
+
+@router.delete("/{job_id}", description="""
+Cancel a queued or running job and discard its audio.
+
+Example using curl:
+```bash
+curl -X DELETE "http://localhost:8000/jobs/6650f1c2a1b2c3d4e5f60789"
+```
+""")
+async def cancel_job(job_id: str, service: JobService = Depends(get_job_service)):
+    job = await service.cancel_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_status(job)
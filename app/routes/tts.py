@@ -1,52 +1,299 @@
 # app/main.py
 from fastapi import FastAPI, HTTPException, Depends, UploadFile, File,APIRouter
-from app.services.tts_service import generate_audio, is_swahili
+from app.services.tts_service import generate_segments, iter_audio, is_swahili, batching_stats as tts_batching_stats
+from app.services.text_normalizer import normalize_text, text_normalizer
+from app.services.inference_executor import inference_executor
+from app.services.inference_pool import inference_pool
+from app.services.audio_service import (
+    AudioEncoder,
+    OPUS_SAMPLE_RATES,
+    available_formats,
+    encode_segments,
+    media_type,
+    postprocess_segments,
+    postprocess_stream,
+    stream_audio,
+)
+from app.services.audio_cache import audio_cache, sentence_cache, token_cache
+from app.services.bulk_service import iter_bulk_archive, MEDIA_TYPES
+from app.services.model_registry import model_registry, model_key
+from app.services.voice_service import voice_catalog, VoiceLimiter, VoiceSlot
+from app.services.request_trace import record_stage, set_trace_attributes, traced
+from app.config import settings
+from starlette.concurrency import run_in_threadpool
+from pydantic import ValidationError
 from app.services.text_service import TextService
 from fastapi.responses import StreamingResponse, FileResponse, PlainTextResponse
+from starlette.background import BackgroundTask
 from app.models.schemas import (
     TrainingTextCreate, 
     TrainingTextUpdate, 
     TrainingTextInDB,
     TTSRequest,
+    VoiceConfig,
+    BulkTTSRequest,
 )
 
 import os
 from pathlib import Path
 from app.database.mongodb import connect_to_mongo, close_mongo_connection
-from tarakimu import num_to_words
-import io
-import scipy.io.wavfile
-import numpy as np
-import re
 import time
 import logging
+from typing import Optional
 
 logger = logging.getLogger("swahili-voice-api")
 
 router = APIRouter(prefix="/tts", tags=["tts"])
 
-# Models
-finetuned_model_name = "Benjamin-png/swahili-mms-tts-finetuned"
-bridget_model_name = "Benjamin-png/swahili-mms-tts-Briget_580_clips-finetuned"
-emanuela_model_name = "Benjamin-png/swahili-mms-tts-Emmanuela_700_clips-finetuned"
-def normalize_numbers(text: str) -> str:
+# Size of the slices a complete audio file is sent in
+RESPONSE_CHUNK_SIZE = 64 * 1024
+
+def audio_response(data, output_format: str, cache_status: str) -> StreamingResponse:
+    """
+    Send a complete audio file (bytes or the encoder's bytearray) in
+    fixed-size slices taken straight from its buffer, so the response never
+    holds a second full-length copy.
+    """
+    async def chunks():
+        view = memoryview(data)
+        for start in range(0, len(view), RESPONSE_CHUNK_SIZE):
+            yield bytes(view[start:start + RESPONSE_CHUNK_SIZE])
+    
+    return StreamingResponse(
+        chunks(),
+        media_type=media_type(output_format),
+        headers={"X-Cache": cache_status, "Content-Length": str(len(data))},
+    )
+
+async def cache_stream(chunks, encoder: AudioEncoder, cache_key: str):
+    """Pass streamed audio chunks through and cache the complete file once the stream ends."""
+    async for chunk in chunks:
+        yield chunk
+    if encoder.samples:
+        with traced("audio_cache"):
+            await run_in_threadpool(audio_cache.put, cache_key, encoder.getvalue())
+
+async def release_after(chunks, slot: VoiceSlot):
+    """Hold a voice concurrency slot until a streamed response has finished."""
+    try:
+        async for chunk in chunks:
+            yield chunk
+    finally:
+        slot.release()
+
+async def synthesize_response(
+    normalized_text: str,
+    model_name: str,
+    request: TTSRequest,
+    request_start: float,
+    limiter: Optional[VoiceLimiter] = None,
+) -> StreamingResponse:
     """
-    Convert any numbers in the text to their Swahili word equivalents.
+    Produce the audio response for normalized text: served from the audio cache
+    when possible, otherwise synthesized on the inference executor (streamed
+    sentence by sentence if requested), post-processed, resampled and encoded
+    as `request` asks, and stored in the cache. Cache hits don't count against
+    the voice's concurrency limit. With an inference pool configured, the
+    executor threads only relay requests to it.
     """
-    def replace_number(match):
-        number = match.group(0)
+    synthesize = inference_pool.generate_segments if inference_pool else generate_segments
+    synthesize_stream = inference_pool.iter_audio if inference_pool else iter_audio
+    output_format = request.format
+    sampling = {"speaking_rate": request.speaking_rate, "noise_scale": request.noise_scale}
+    
+    cache_key = None
+    if settings.AUDIO_CACHE_ENABLED:
+        # Every generation, post-processing and conversion parameter changes the audio
+        cache_key = audio_cache.make_key(
+            model_name, normalized_text, output_format,
+            params=request.model_dump(exclude={"text", "stream", "format"}),
+        )
+        with traced("audio_cache"):
+            cached = await run_in_threadpool(audio_cache.get, cache_key)
+        if cached is not None:
+            logger.info(f"Audio cache hit for {model_name} ({len(cached)} bytes {output_format})")
+            set_trace_attributes(cache="HIT")
+            return audio_response(cached, output_format, "HIT")
+    set_trace_attributes(cache="MISS")
+    
+    slot = limiter.acquire() if limiter else None
+    
+    if request.stream:
+        try:
+            # Inference is admitted here, so a full queue still returns 503 up front
+            segments = inference_executor.stream(synthesize_stream, normalized_text, model_name, **sampling)
+            segments = postprocess_stream(segments, request.sentence_silence_ms, request.loudness_dbfs)
+            # The complete file is only kept in memory when it is going to be cached
+            encoder = AudioEncoder(
+                output_format, target_rate=request.sample_rate, sample_format=request.sample_format, keep=bool(cache_key)
+            )
+            chunks = stream_audio(segments, encoder, request_start, model_name)
+            if cache_key:
+                chunks = cache_stream(chunks, encoder, cache_key)
+        except BaseException:
+            if slot:
+                slot.release()
+            raise
+        if slot is None:
+            return StreamingResponse(chunks, media_type=media_type(output_format), headers={"X-Cache": "MISS"})
+        # The slot is freed when the body finishes, or by the background task
+        # once the response is done if the body was never iterated (the client
+        # went away before the first chunk)
+        return StreamingResponse(
+            release_after(chunks, slot),
+            media_type=media_type(output_format),
+            headers={"X-Cache": "MISS"},
+            background=BackgroundTask(slot.release),
+        )
+    
+    # Generate audio
+    start_time = time.time()
+    try:
+        segments, sample_rate = await inference_executor.submit(synthesize, normalized_text, model_name, **sampling)
+    finally:
+        if slot:
+            slot.release()
+    generation_time = time.time() - start_time
+    logger.info(f"Audio generation completed in {generation_time:.4f} seconds")
+    
+    # Post-process and encode to the requested format, writing each sentence straight into the output
+    start_time = time.time()
+    with traced("postprocess"):
+        segments = await run_in_threadpool(
+            postprocess_segments, segments, sample_rate, request.sentence_silence_ms, request.loudness_dbfs
+        )
+    with traced("encode"):
+        data = await run_in_threadpool(
+            encode_segments, segments, sample_rate, output_format, model_name,
+            target_rate=request.sample_rate, sample_format=request.sample_format,
+        )
+    conversion_time = time.time() - start_time
+    logger.info(f"Audio conversion completed in {conversion_time:.4f} seconds")
+    
+    if cache_key:
+        with traced("audio_cache"):
+            await run_in_threadpool(audio_cache.put, cache_key, data)
+    
+    return audio_response(data, output_format, "MISS")
+
+
+@router.get("/cache/stats", description="""
+Hit, miss and eviction counters for the synthesized-audio cache, the sentence cache and the token cache of the worker that serves the request.
+
+Example using curl:
+```bash
+curl -X GET "http://localhost:8000/tts/cache/stats"
+```
+""")
+async def audio_cache_stats():
+    return {
+        "audio": audio_cache.stats(),
+        "sentences": sentence_cache.stats(),
+        "tokens": token_cache.stats(),
+    }
+
+
+@router.get("/batching/stats", description="""
+Batch counts, mean batch size, padding efficiency (real tokens / padded tokens) and mean queueing time per token-length bucket, for the cross-request scheduler of each model and for intra-request sentence batches, in the worker that serves the request.
+
+Example using curl:
+```bash
+curl -X GET "http://localhost:8000/tts/batching/stats"
+```
+""")
+async def batching_stats():
+    return tts_batching_stats()
+
+
+async def synthesize_for_voice(voice_id: str, request: TTSRequest) -> StreamingResponse:
+    """Look up a voice in the catalog, apply its default params and synthesize the request."""
+    voice = await voice_catalog.get(voice_id)
+    if voice is None:
+        raise HTTPException(status_code=404, detail=f"Voice '{voice_id}' not found")
+    
+    # Voice defaults apply to every field the client didn't set explicitly
+    if voice.default_params:
         try:
-            if '.' in number:
-                return num_to_words(float(number))
-            return num_to_words(number)
-        except ValueError:
-            return number
+            request = TTSRequest(**{**voice.default_params, **request.model_dump(exclude_unset=True)})
+        except ValidationError as e:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Invalid default params for voice '{voice_id}': {e.errors(include_url=False)}"
+            )
+    if request.format not in available_formats():
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported format '{request.format}', available: {', '.join(available_formats())}"
+        )
+    if request.format != "wav" and request.sample_format != "int16":
+        raise HTTPException(status_code=400, detail=f"Sample format '{request.sample_format}' is only available for WAV output")
+    if request.format == "opus" and request.sample_rate and request.sample_rate not in OPUS_SAMPLE_RATES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Opus supports sample rates {', '.join(map(str, OPUS_SAMPLE_RATES))}"
+        )
+    
+    logger.info(f"TTS request received for voice '{voice_id}': '{request.text[:30]}...' ({len(request.text)} chars)")
+    request_start = time.time()
+    set_trace_attributes(
+        voice=voice_id, model=voice.model_name, format=request.format, stream=request.stream, text_chars=len(request.text)
+    )
+    
+    # Expand numbers, currency, dates and other written forms into words
+    start_time = time.time()
+    normalized_text = normalize_text(request.text)
+    normalization_time = time.time() - start_time
+    record_stage("normalize", normalization_time)
+    logger.info(f"Text normalization completed in {normalization_time:.4f} seconds")
     
-    number_pattern = r'\b\d+(?:\.\d+)?\b'
-    return re.sub(number_pattern, replace_number, text)
+    return await synthesize_response(
+        normalized_text,
+        model_key(voice.model_name, quantized=voice.quantized, backend=voice.backend),
+        request,
+        request_start,
+        limiter=voice_catalog.limiter(voice),
+    )
+
+
+@router.get("/formats", description="""
+Output formats that can be requested with the `format` field, depending on the audio codecs available on the server.
+
+Example using curl:
+```bash
+curl -X GET "http://localhost:8000/tts/formats"
+```
+""")
+async def list_formats():
+    return {name: media_type(name) for name in available_formats()}
+
+
+@router.get("/voices", response_model=list[VoiceConfig], description="""
+List the voices available through `POST /tts/{voice}`.
+
+Example using curl:
+```bash
+curl -X GET "http://localhost:8000/tts/voices"
+```
+""")
+async def list_voices():
+    return [voice for voice in await voice_catalog.list() if voice.enabled]
+
+
+@router.get("/models", description="""
+Voice models loaded in the worker that serves the request (or, with an inference pool, in the inference process that answers), with load time, warm-up time, resident size, last-used time and pinning.
+
+Example using curl:
+```bash
+curl -X GET "http://localhost:8000/tts/models"
+```
+""")
+async def list_loaded_models():
+    if inference_pool:
+        return await run_in_threadpool(inference_pool.stats)
+    return model_registry.stats()
 
 
-# TTS endpoints with number normalization
+# Per-voice TTS endpoints, kept as aliases of POST /tts/{voice}
 @router.post("/benny", description="""
 Generate speech using Benny's voice model. The text will be automatically normalized, converting numbers to their Swahili word equivalents.
 
@@ -75,31 +322,11 @@ The API will:
 1. Convert any numbers to their Swahili word equivalents
 2. Generate speech using Benny's voice model
 3. Return a WAV audio file
+
+Set `"stream": true` to receive the audio sentence by sentence as it is generated.
 """)
 async def tts_finetuned(request: TTSRequest):
-    logger.info(f"TTS request received for Benny's voice: '{request.text[:30]}...' ({len(request.text)} chars)")
-    
-    # Normalize numbers in the text
-    start_time = time.time()
-    normalized_text = normalize_numbers(request.text)
-    normalization_time = time.time() - start_time
-    logger.info(f"Text normalization completed in {normalization_time:.4f} seconds")
-    
-    # Generate audio
-    start_time = time.time()
-    audio, sample_rate = generate_audio(normalized_text, finetuned_model_name)
-    generation_time = time.time() - start_time
-    logger.info(f"Audio generation completed in {generation_time:.4f} seconds")
-    
-    # Convert to WAV
-    start_time = time.time()
-    bytes_io = io.BytesIO()
-    scipy.io.wavfile.write(bytes_io, sample_rate, (audio * 32767).astype(np.int16))
-    bytes_io.seek(0)
-    conversion_time = time.time() - start_time
-    logger.info(f"Audio conversion completed in {conversion_time:.4f} seconds")
-    
-    return StreamingResponse(bytes_io, media_type="audio/wav")
+    return await synthesize_for_voice("benny", request)
 
 @router.post("/briget", description="""
 Generate speech using Briget's voice model. The text will be automatically normalized, converting numbers to their Swahili word equivalents.
@@ -129,31 +356,11 @@ The API will:
 1. Convert any numbers to their Swahili word equivalents
 2. Generate speech using Briget's voice model
 3. Return a WAV audio file
+
+Set `"stream": true` to receive the audio sentence by sentence as it is generated.
 """)
 async def tts_original(request: TTSRequest):
-    logger.info(f"TTS request received for Briget's voice: '{request.text[:30]}...' ({len(request.text)} chars)")
-    
-    # Normalize numbers in the text
-    start_time = time.time()
-    normalized_text = normalize_numbers(request.text)
-    normalization_time = time.time() - start_time
-    logger.info(f"Text normalization completed in {normalization_time:.4f} seconds")
-    
-    # Generate audio
-    start_time = time.time()
-    audio, sample_rate = generate_audio(normalized_text, bridget_model_name)
-    generation_time = time.time() - start_time
-    logger.info(f"Audio generation completed in {generation_time:.4f} seconds")
-    
-    # Convert to WAV
-    start_time = time.time()
-    bytes_io = io.BytesIO()
-    scipy.io.wavfile.write(bytes_io, sample_rate, (audio * 32767).astype(np.int16))
-    bytes_io.seek(0)
-    conversion_time = time.time() - start_time
-    logger.info(f"Audio conversion completed in {conversion_time:.4f} seconds")
-    
-    return StreamingResponse(bytes_io, media_type="audio/wav")
+    return await synthesize_for_voice("briget", request)
 
 @router.post("/emanuela", description="""
 Generate speech using Emanuela's voice model. The text will be automatically normalized, converting numbers to their Swahili word equivalents.
@@ -183,42 +390,22 @@ The API will:
 1. Convert any numbers to their Swahili word equivalents
 2. Generate speech using Emanuela's voice model
 3. Return a WAV audio file
+
+Set `"stream": true` to receive the audio sentence by sentence as it is generated.
 """)
 async def tts_original(request: TTSRequest):
-    logger.info(f"TTS request received for Emanuela's voice: '{request.text[:30]}...' ({len(request.text)} chars)")
-    
-    # Normalize numbers in the text
-    start_time = time.time()
-    normalized_text = normalize_numbers(request.text)
-    normalization_time = time.time() - start_time
-    logger.info(f"Text normalization completed in {normalization_time:.4f} seconds")
-    
-    # Generate audio
-    start_time = time.time()
-    audio, sample_rate = generate_audio(normalized_text, emanuela_model_name)
-    generation_time = time.time() - start_time
-    logger.info(f"Audio generation completed in {generation_time:.4f} seconds")
-    
-    # Convert to WAV
-    start_time = time.time()
-    bytes_io = io.BytesIO()
-    scipy.io.wavfile.write(bytes_io, sample_rate, (audio * 32767).astype(np.int16))
-    bytes_io.seek(0)
-    conversion_time = time.time() - start_time
-    logger.info(f"Audio conversion completed in {conversion_time:.4f} seconds")
-    
-    return StreamingResponse(bytes_io, media_type="audio/wav")
+    return await synthesize_for_voice("emanuela", request)
 
 
     # Add this new endpoint to your main.py
 @router.post("/debug/number-conversion", description="""
-Debug endpoint to test how numbers in Swahili text will be normalized before speech generation.
+Debug endpoint to test how Swahili text will be normalized before speech generation: numbers, currency (TSh, KSh, $), percentages, dates, times, ordinals, phone numbers, abbreviations and symbols are expanded into words.
 
 Example using curl:
 ```bash
 curl -X POST "http://localhost:8000/tts/debug/number-conversion" \\
      -H "Content-Type: application/json" \\
-     -d '{"text":"Nina umri wa miaka 25 na shilingi 100.50"}'
+     -d '{"text":"Bw. Juma alilipa TSh 5,000 tarehe 12/03/2024 saa 14:30"}'
 ```
 
 Example using Python:
@@ -227,31 +414,128 @@ import requests
 
 response = requests.post(
     "http://localhost:8000/tts/debug/number-conversion",
-    json={"text": "Nina umri wa miaka 25 na shilingi 100.50"}
+    json={"text": "Bw. Juma alilipa TSh 5,000 tarehe 12/03/2024 saa 14:30"}
 )
 print(response.json())
 ```
 
 The API will:
-1. Convert any numbers to their Swahili word equivalents
-2. Return both the original and normalized text
+1. Run each normalization rule in order on the text
+2. Return the original and normalized text, plus every rule's output, match count and time in `rules`
 """)
 async def debug_number_conversion(request: TTSRequest):
     """
-    Debug endpoint to test number normalization.
-    Returns both original and normalized text for comparison.
+    Debug endpoint to test text normalization.
+    Returns the original and normalized text and the output of each rule.
     """
     logger.info(f"Number conversion debug request received: '{request.text[:30]}...'")
     
     original_text = request.text
     
     start_time = time.time()
-    normalized_text = normalize_numbers(request.text)
+    steps = text_normalizer.trace(request.text)
+    normalized_text = normalize_text(request.text)
     normalization_time = time.time() - start_time
-    logger.info(f"Number normalization completed in {normalization_time:.4f} seconds")
+    logger.info(f"Text normalization completed in {normalization_time:.4f} seconds")
     
     return {
         "original_text": original_text,
         "normalized_text": normalized_text,
+        "rules": steps,
         "process_time_seconds": normalization_time
     }
+
+
+@router.get("/normalization/stats", description="""
+Calls, matches and total time of each text normalization rule, and the hit ratio of the normalized-text cache, for the worker that serves the request.
+
+Example using curl:
+```bash
+curl -X GET "http://localhost:8000/tts/normalization/stats"
+```
+""")
+async def normalization_stats():
+    return text_normalizer.stats()
+
+
+@router.post("/batch", description="""
+Synthesize many items in one request. Each item has an `id` (used as the file name), a `text` and a `voice`. The response is a zip (default) or tar archive streamed as items finish: one `<id>.wav` per item, then `manifest.json` with each item's file, duration and sample rate, or the error if it failed.
+
+Example using curl:
+```bash
+curl -X POST "http://localhost:8000/tts/batch" \\
+     -H "Content-Type: application/json" \\
+     -d '{
+           "format": "zip",
+           "items": [
+             {"id": "prompt-001", "text": "Habari za asubuhi.", "voice": "benny"},
+             {"id": "prompt-002", "text": "Karibu sana.", "voice": "briget"}
+           ]
+         }' \\
+     --output batch.zip
+```
+
+The API will:
+1. Check that every voice exists and every id is unique
+2. Normalize the texts and synthesize them in batches, grouped by voice
+3. Stream each WAV into the archive as soon as its batch is done
+""")
+async def tts_batch(request: BulkTTSRequest):
+    if len(request.items) > settings.BULK_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.BULK_MAX_ITEMS} items per batch")
+    ids = [item.id for item in request.items]
+    if len(set(ids)) != len(ids):
+        raise HTTPException(status_code=400, detail="Item ids must be unique")
+    
+    models = {}
+    for voice_id in dict.fromkeys(item.voice for item in request.items):
+        voice = await voice_catalog.get(voice_id)
+        if voice is None:
+            raise HTTPException(status_code=404, detail=f"Voice '{voice_id}' not found")
+        models[voice_id] = model_key(voice.model_name, quantized=voice.quantized, backend=voice.backend)
+    
+    items = [item.model_copy(update={"text": normalize_text(item.text)}) for item in request.items]
+    logger.info(f"Bulk TTS request received: {len(items)} items, {len(models)} voices, {request.format}")
+    return StreamingResponse(
+        iter_bulk_archive(items, models, request.format),
+        media_type=MEDIA_TYPES[request.format],
+        headers={"Content-Disposition": f'attachment; filename="tts_batch.{request.format}"'},
+    )
+
+
+# Generic voice endpoint. Keep this last: it matches any single path segment,
+# so POST routes declared after it in this router would be shadowed.
+@router.post("/{voice}", description="""
+Generate speech with any voice from the voice catalog (see `GET /tts/voices`). The text will be automatically normalized, converting numbers to their Swahili word equivalents.
+
+Example using curl:
+```bash
+curl -X POST "http://localhost:8000/tts/benny" \\
+     -H "Content-Type: application/json" \\
+     -d '{"text":"Nina umri wa miaka 25"}' \\
+     --output speech.wav
+```
+
+Example using Python:
+```python
+import requests
+
+response = requests.post(
+    "http://localhost:8000/tts/benny",
+    json={"text": "Nina umri wa miaka 25"}
+)
+
+with open("speech.wav", "wb") as f:
+    f.write(response.content)
+```
+
+The API will:
+1. Look up the voice in the catalog and apply its default parameters
+2. Convert any numbers to their Swahili word equivalents
+3. Generate speech using the voice's model
+4. Return a WAV audio file
+
+Set `"stream": true` to receive the audio sentence by sentence as it is generated.
+""")
+async def tts_voice(voice: str, request: TTSRequest):
+    return await synthesize_for_voice(voice, request)
@@ -0,0 +1,302 @@
+# app/services/audio_cache.py
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from ..config import settings
+from .metrics import CACHE_LOOKUPS
+
+logger = logging.getLogger("swahili-voice-api")
+
+# Looked up per sentence, so the labelled counters are bound once
+SENTENCE_CACHE_HITS = CACHE_LOOKUPS.labels(cache="sentence", result="hit")
+SENTENCE_CACHE_MISSES = CACHE_LOOKUPS.labels(cache="sentence", result="miss")
+TOKEN_CACHE_HITS = CACHE_LOOKUPS.labels(cache="token", result="hit")
+TOKEN_CACHE_MISSES = CACHE_LOOKUPS.labels(cache="token", result="miss")
+
+
+class AudioCache:
+    """
+    Two-tier cache for synthesized audio, keyed by a content hash.
+
+    The memory tier is an LRU bounded by total bytes and is private to each
+    worker process. The disk tier lives under `disk_dir`, is shared by all
+    workers on the host and is evicted oldest-first (by mtime, refreshed on
+    every hit) once it grows past `disk_max_bytes`.
+    """
+
+    def __init__(self, memory_max_bytes: int, disk_dir: Optional[str], disk_max_bytes: int):
+        self.memory_max_bytes = memory_max_bytes
+        self.disk_dir = disk_dir if disk_dir and disk_max_bytes > 0 else None
+        self.disk_max_bytes = disk_max_bytes
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes: Optional[int] = None
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.memory_evictions = 0
+        self.disk_evictions = 0
+
+    @staticmethod
+    def make_key(model_name: str, text: str, output_format: str, params: Optional[dict] = None) -> str:
+        payload = json.dumps([model_name, text, output_format, params or {}], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], f"{key}.bin")
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                CACHE_LOOKUPS.labels(cache="audio", result="memory_hit").inc()
+                return data
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+                os.utime(path)
+            except FileNotFoundError:
+                data = None
+            except OSError as e:
+                logger.warning(f"Audio cache read failed for {path}: {e}")
+                data = None
+            if data is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                CACHE_LOOKUPS.labels(cache="audio", result="disk_hit").inc()
+                self._put_memory(key, data)
+                return data
+
+        with self._lock:
+            self.misses += 1
+        CACHE_LOOKUPS.labels(cache="audio", result="miss").inc()
+        return None
+
+    def put(self, key: str, data: bytes) -> None:
+        self._put_memory(key, data)
+        if self.disk_dir:
+            self._put_disk(key, data)
+
+    def _put_memory(self, key: str, data: bytes) -> None:
+        if len(data) > self.memory_max_bytes:
+            return
+        with self._lock:
+            previous = self._memory.pop(key, None)
+            if previous is not None:
+                self._memory_bytes -= len(previous)
+            self._memory[key] = data
+            self._memory_bytes += len(data)
+            while self._memory_bytes > self.memory_max_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+                self.memory_evictions += 1
+
+    def _put_disk(self, key: str, data: bytes) -> None:
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temp file and rename so other workers never read a partial entry
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Audio cache write failed for {path}: {e}")
+            return
+
+        with self._lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes += len(data)
+            needs_eviction = self._disk_bytes is None or self._disk_bytes > self.disk_max_bytes
+        if needs_eviction:
+            self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        # Rescan rather than trust the running total: other workers write here too
+        entries = []
+        for root, _, files in os.walk(self.disk_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        if total > self.disk_max_bytes:
+            for _, size, path in sorted(entries):
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                evicted += 1
+                if total <= self.disk_max_bytes:
+                    break
+            logger.info(f"Evicted {evicted} entries from the audio disk cache")
+
+        with self._lock:
+            self._disk_bytes = total
+            self.disk_evictions += evicted
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_evictions": self.memory_evictions,
+                "disk_evictions": self.disk_evictions,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_bytes": self._disk_bytes,
+            }
+
+
+class SentenceCache:
+    """
+    LRU cache of synthesized waveforms per (model, sentence), bounded by the
+    total float32 bytes held. Lets texts that repeat most of their sentences
+    skip inference for everything but the new ones.
+
+    Cached arrays are stored read-only; callers must copy before modifying.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, model_name: str, sentence: str) -> Optional[np.ndarray]:
+        if self.max_bytes <= 0:
+            return None
+        key = (model_name, sentence)
+        with self._lock:
+            waveform = self._entries.get(key)
+            if waveform is None:
+                self.misses += 1
+                SENTENCE_CACHE_MISSES.inc()
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            SENTENCE_CACHE_HITS.inc()
+            return waveform
+
+    def put(self, model_name: str, sentence: str, waveform: np.ndarray) -> None:
+        # Copy so a slice of a padded batch output doesn't keep the whole batch alive
+        waveform = np.array(waveform, dtype=np.float32, copy=True)
+        if waveform.nbytes > self.max_bytes:
+            return
+        waveform.setflags(write=False)
+        key = (model_name, sentence)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.nbytes
+            self._entries[key] = waveform
+            self._bytes += waveform.nbytes
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+
+class TokenCache:
+    """
+    LRU cache of tokenizer input ids per (model, sentence), bounded by the
+    number of entries. Saves re-tokenizing sentences that come back, e.g.
+    with other sampling settings or after falling out of the sentence cache.
+
+    Cached id lists are shared; callers must not modify them.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], List[int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, model_name: str, sentence: str) -> Optional[List[int]]:
+        if self.max_entries <= 0:
+            return None
+        key = (model_name, sentence)
+        with self._lock:
+            input_ids = self._entries.get(key)
+            if input_ids is None:
+                self.misses += 1
+                TOKEN_CACHE_MISSES.inc()
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            TOKEN_CACHE_HITS.inc()
+            return input_ids
+
+    def put(self, model_name: str, sentence: str, input_ids: List[int]) -> None:
+        if self.max_entries <= 0:
+            return
+        key = (model_name, sentence)
+        with self._lock:
+            self._entries[key] = input_ids
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+            }
+
+
+audio_cache = AudioCache(
+    memory_max_bytes=settings.AUDIO_CACHE_MEMORY_MB * 1024 * 1024,
+    disk_dir=settings.AUDIO_CACHE_DIR,
+    disk_max_bytes=settings.AUDIO_CACHE_DISK_MB * 1024 * 1024,
+)
+sentence_cache = SentenceCache(max_bytes=settings.SENTENCE_CACHE_MB * 1024 * 1024)
+token_cache = TokenCache(max_entries=settings.TOKEN_CACHE_SIZE)
@@ -0,0 +1,536 @@
+# app/services/audio_service.py
+import io
+import logging
+import math
+import struct
+import time
+from functools import lru_cache
+from typing import AsyncIterator, List, Optional, Tuple
+
+import numpy as np
+from scipy import signal
+from starlette.concurrency import run_in_threadpool
+
+from .request_trace import record_stage
+
+try:
+    import soundfile
+except ImportError:  # compressed output formats are unavailable without libsndfile
+    soundfile = None
+
+logger = logging.getLogger("swahili-voice-api")
+
+# Size value used in the RIFF and data chunk headers when the total length is
+# not known up front; players treat it as "read until the end of the stream".
+STREAMING_SIZE = 0xFFFFFFFF
+
+
+# WAV sample formats: WAVE format tag and bits per sample
+SAMPLE_FORMATS = {
+    "int16": (1, 16),  # PCM
+    "float32": (3, 32),  # IEEE float
+    "mulaw": (7, 8),  # G.711 mu-law
+}
+
+
+def wav_header(
+    sample_rate: int,
+    num_channels: int = 1,
+    bits_per_sample: int = 16,
+    data_size: Optional[int] = None,
+    audio_format: int = 1,
+) -> bytes:
+    """
+    Build a 44-byte WAV header, PCM unless another WAVE `audio_format` tag is
+    given. Leave `data_size` as None for streamed output, which fills both
+    size fields with STREAMING_SIZE.
+    """
+    block_align = num_channels * bits_per_sample // 8
+    byte_rate = sample_rate * block_align
+    if data_size is None:
+        riff_size = data_size = STREAMING_SIZE
+    else:
+        riff_size = 36 + data_size
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", riff_size, b"WAVE",
+        b"fmt ", 16, audio_format, num_channels, sample_rate, byte_rate, block_align, bits_per_sample,
+        b"data", data_size,
+    )
+
+
+# Samples converted per step by to_pcm16; bounds its float scratch space
+PCM_BLOCK_SAMPLES = 1 << 16
+
+
+def to_pcm16(audio: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Scale float audio in [-1, 1] to 16-bit PCM samples, clipping anything
+    outside that range. Converts a block at a time through one small scratch
+    array, so the output is the only full-length allocation; pass `out` to
+    write into an existing int16 array instead.
+    """
+    if out is None:
+        out = np.empty(len(audio), dtype=np.int16)
+    scratch = np.empty(min(len(audio), PCM_BLOCK_SAMPLES), dtype=np.float32)
+    for start in range(0, len(audio), PCM_BLOCK_SAMPLES):
+        block = audio[start:start + PCM_BLOCK_SAMPLES]
+        scaled = scratch[:len(block)]
+        np.multiply(block, 32767, out=scaled, casting="same_kind")
+        np.clip(scaled, -32767, 32767, out=scaled)
+        np.copyto(out[start:start + len(block)], scaled, casting="unsafe")
+    return out
+
+
+def to_mulaw(audio: np.ndarray) -> np.ndarray:
+    """Encode float audio in [-1, 1] as 8-bit G.711 mu-law samples."""
+    pcm = to_pcm16(audio).astype(np.int32)
+    sign = np.where(pcm < 0, 0x80, 0)
+    magnitude = np.minimum(np.abs(pcm), 32635) + 132
+    # Segment number: position of the highest set bit, counted from bit 7
+    exponent = np.frexp(magnitude)[1] - 8
+    mantissa = (magnitude >> (exponent + 3)) & 0x0F
+    return (~(sign | (exponent << 4) | mantissa) & 0xFF).astype(np.uint8)
+
+
+class WavBuffer:
+    """
+    A WAV file under construction in one growable bytearray: a 44-byte
+    header followed by the samples. `append` converts float segments straight
+    into the buffer's tail in the requested sample format, without
+    intermediate byte strings, and `finish` patches the final sizes into the
+    header in place and hands back the buffer itself. Give `capacity` (in
+    samples) when the length is known to avoid regrowing. With `keep` off,
+    `take` drops the bytes it hands out, so a stream holds only one segment
+    at a time and there is no complete file to `finish`.
+    """
+
+    HEADER_SIZE = 44
+
+    def __init__(self, sample_rate: int, sample_format: str = "int16", capacity: int = 0, keep: bool = True):
+        audio_format, bits_per_sample = SAMPLE_FORMATS[sample_format]
+        self.sample_format = sample_format
+        self.sample_size = bits_per_sample // 8
+        self.samples = 0
+        self.keep = keep
+        self._sent = 0
+        self._offset = 0  # file position of the first byte still in the buffer
+        self._data = bytearray(self.HEADER_SIZE + capacity * self.sample_size)
+        self._data[:self.HEADER_SIZE] = wav_header(
+            sample_rate, bits_per_sample=bits_per_sample, audio_format=audio_format
+        )
+
+    @property
+    def size(self) -> int:
+        return self.HEADER_SIZE + self.samples * self.sample_size
+
+    def _reserve(self, samples: int) -> None:
+        needed = self.size - self._offset + samples * self.sample_size
+        if needed > len(self._data):
+            # Grow geometrically so a long stream of appends stays linear
+            self._data.extend(bytes(max(needed, len(self._data) * 3 // 2) - len(self._data)))
+
+    def append(self, audio: np.ndarray) -> None:
+        start = self.size - self._offset
+        self._reserve(len(audio))
+        if self.sample_format == "float32":
+            out = np.frombuffer(self._data, dtype="<f4", count=len(audio), offset=start)
+            np.clip(audio, -1.0, 1.0, out=out, casting="same_kind")
+        elif self.sample_format == "mulaw":
+            out = np.frombuffer(self._data, dtype=np.uint8, count=len(audio), offset=start)
+            out[:] = to_mulaw(audio)
+        else:
+            out = np.frombuffer(self._data, dtype="<i2", count=len(audio), offset=start)
+            to_pcm16(audio, out=out)
+        # Drop the array view, or the bytearray could not grow on the next append
+        del out
+        self.samples += len(audio)
+
+    def take(self) -> bytes:
+        """The bytes appended since the last call, header included the first time."""
+        data = bytes(memoryview(self._data)[self._sent - self._offset:self.size - self._offset])
+        self._sent = self.size
+        if not self.keep:
+            del self._data[:self._sent - self._offset]
+            self._offset = self._sent
+        return data
+
+    def finish(self) -> bytearray:
+        if not self.keep:
+            raise RuntimeError("The WAV buffer was not kept")
+        data_size = self.samples * self.sample_size
+        del self._data[self.size:]
+        struct.pack_into("<I", self._data, 4, 36 + data_size)
+        struct.pack_into("<I", self._data, 40, data_size)
+        return self._data
+
+
+@lru_cache(maxsize=32)
+def _resample_filter(up: int, down: int) -> np.ndarray:
+    # The anti-aliasing low-pass filter resample_poly would design itself;
+    # designing it once per rate pair keeps it off the per-segment path
+    # (in float32, so resample_poly's output stays float32 as well)
+    max_rate = max(up, down)
+    return signal.firwin(2 * 10 * max_rate + 1, 1.0 / max_rate, window=("kaiser", 5.0)).astype(np.float32)
+
+
+def resample(audio: np.ndarray, sample_rate: int, target_rate: int) -> np.ndarray:
+    """Resample audio with a polyphase filter, e.g. 16 kHz model output to 8 kHz for telephony."""
+    if target_rate == sample_rate:
+        return audio
+    factor = math.gcd(sample_rate, target_rate)
+    up, down = target_rate // factor, sample_rate // factor
+    return signal.resample_poly(audio, up, down, window=_resample_filter(up, down)).astype(np.float32, copy=False)
+
+
+# Frames more than this far below the loudest one are left out of the
+# loudness measurement, so pauses inside a sentence don't pull it down
+LOUDNESS_GATE_DB = -40.0
+# Normalized peaks stay 1 dB below full scale
+LOUDNESS_PEAK_LIMIT = 10 ** (-1.0 / 20)
+
+
+def normalize_loudness(audio: np.ndarray, sample_rate: int, target_dbfs: float) -> np.ndarray:
+    """
+    Scale a segment so the RMS level of its non-silent 20 ms frames is
+    `target_dbfs`, with the gain limited so the peak stays below full scale.
+    Returns a new array; the input may be shared with the sentence cache.
+    """
+    if not len(audio):
+        return audio
+    frame = max(1, sample_rate // 50)
+    count = max(1, len(audio) // frame)
+    frames = audio[:count * frame] if len(audio) >= frame else audio
+    energy = np.square(frames, dtype=np.float64).reshape(count, -1).mean(axis=1)
+    if not energy.max():
+        return audio
+    loud = energy[energy >= energy.max() * 10 ** (LOUDNESS_GATE_DB / 10)]
+    gain = min(10 ** (target_dbfs / 20) / np.sqrt(loud.mean()), LOUDNESS_PEAK_LIMIT / np.abs(audio).max())
+    return np.multiply(audio, gain, dtype=np.float32)
+
+
+def postprocess_segments(
+    segments: List[np.ndarray],
+    sample_rate: int,
+    sentence_silence_ms: int = 0,
+    loudness_dbfs: Optional[float] = None,
+) -> List[np.ndarray]:
+    """
+    Apply the per-request post-processing stages to a request's sentence
+    waveforms: loudness normalization of each sentence, then
+    `sentence_silence_ms` of silence between sentences. The silence is one
+    shared zero array placed between the segments, so nothing is
+    concatenated.
+    """
+    if loudness_dbfs is not None:
+        segments = [normalize_loudness(segment, sample_rate, loudness_dbfs) for segment in segments]
+    silence_samples = sample_rate * sentence_silence_ms // 1000
+    if silence_samples and len(segments) > 1:
+        silence = np.zeros(silence_samples, dtype=np.float32)
+        segments = [part for i, segment in enumerate(segments) for part in ((silence, segment) if i else (segment,))]
+    return segments
+
+
+async def postprocess_stream(
+    segments: AsyncIterator[Tuple[np.ndarray, int]],
+    sentence_silence_ms: int = 0,
+    loudness_dbfs: Optional[float] = None,
+) -> AsyncIterator[Tuple[np.ndarray, int]]:
+    """`postprocess_segments` for streamed (audio_segment, sample_rate) pairs; produces the same audio."""
+    first = True
+    async for audio, sample_rate in segments:
+        if not first and sentence_silence_ms:
+            yield np.zeros(sample_rate * sentence_silence_ms // 1000, dtype=np.float32), sample_rate
+        first = False
+        if loudness_dbfs is not None:
+            audio = normalize_loudness(audio, sample_rate, loudness_dbfs)
+        yield audio, sample_rate
+
+
+# Output formats: libsndfile (major format, subtype) and response media type.
+# WAV is always available; the others need soundfile with a libsndfile build
+# that has the codec (MP3 needs libsndfile 1.1 or newer).
+OUTPUT_FORMATS = {
+    "wav": (None, None, "audio/wav"),
+    "opus": ("OGG", "OPUS", "audio/ogg"),
+    "flac": ("FLAC", "PCM_16", "audio/flac"),
+    "mp3": ("MP3", "MPEG_LAYER_III", "audio/mpeg"),
+}
+
+# Sample rates the Opus encoder accepts
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+
+
+def available_formats() -> List[str]:
+    formats = ["wav"]
+    if soundfile is not None:
+        for name, (major, subtype, _) in OUTPUT_FORMATS.items():
+            if major and subtype in soundfile.available_subtypes(major):
+                formats.append(name)
+    return formats
+
+
+def media_type(output_format: str) -> str:
+    return OUTPUT_FORMATS[output_format][2]
+
+
+class _EncoderSink(io.RawIOBase):
+    """
+    In-memory file that libsndfile writes into. `take` returns the bytes
+    appended since the last call. Encoders that seek back to patch headers
+    on close (FLAC, MP3) only patch the complete file kept for `getvalue`;
+    the already streamed copy keeps the placeholder header, which decoders
+    accept as "length unknown". With `keep` off, `take` drops the bytes it
+    hands out and header patches to them are discarded.
+    """
+
+    def __init__(self, keep: bool = True):
+        self.keep = keep
+        self._buffer = io.BytesIO()
+        self._offset = 0  # file position of the first byte still in the buffer
+        self._position = 0
+        self._sent = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        if self._position < self._offset:
+            return b""
+        self._buffer.seek(self._position - self._offset)
+        data = self._buffer.read(size)
+        self._position += len(data)
+        return data
+
+    def write(self, data) -> int:
+        size = len(data)
+        skip = self._offset - self._position
+        if skip < size:
+            self._buffer.seek(max(0, -skip))
+            self._buffer.write(data[skip:] if skip > 0 else data)
+        self._position += size
+        return size
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        self._position = offset
+        return offset
+
+    def tell(self) -> int:
+        return self._position
+
+    def take(self) -> bytes:
+        data = self._buffer.getbuffer()[self._sent - self._offset:].tobytes()
+        self._sent += len(data)
+        if not self.keep:
+            self._buffer = io.BytesIO()
+            self._offset = self._sent
+        return data
+
+    def getvalue(self) -> bytes:
+        return self._buffer.getvalue()
+
+    @property
+    def size(self) -> int:
+        return self._offset + self._buffer.getbuffer().nbytes
+
+
+class AudioEncoder:
+    """
+    Incremental encoder: feed it one segment at a time with `encode`, which
+    returns the encoded bytes ready to send, then call `close` for the rest.
+    `getvalue` returns the complete, finalized file afterwards, suitable
+    for caching. To build a complete file without sending anything on the
+    way, use `write` instead of `encode`; for WAV, `capacity` (in output
+    samples) then lets the buffer be allocated once at its final size.
+
+    With `target_rate` set, each segment is resampled to it before encoding.
+    Segments are resampled independently; they are whole sentences that start
+    and end in near silence, so the filter edges don't produce audible seams.
+    `sample_format` selects the WAV sample encoding; compressed formats
+    always take int16. Pass `keep=False` when only streaming: the bytes
+    returned by `encode` are then dropped from memory and `getvalue` is not
+    available.
+    """
+
+    def __init__(
+        self,
+        output_format: str = "wav",
+        target_rate: Optional[int] = None,
+        sample_format: str = "int16",
+        capacity: int = 0,
+        keep: bool = True,
+    ):
+        if output_format not in available_formats():
+            raise ValueError(f"Output format '{output_format}' is not available")
+        if sample_format not in SAMPLE_FORMATS:
+            raise ValueError(f"Unknown sample format '{sample_format}'")
+        if output_format != "wav" and sample_format != "int16":
+            raise ValueError(f"Sample format '{sample_format}' is only available for WAV output")
+        self.output_format = output_format
+        self.target_rate = target_rate
+        self.sample_format = sample_format
+        self.capacity = capacity
+        self.keep = keep
+        self.sample_rate: Optional[int] = None
+        self.encode_time = 0.0
+        self.samples = 0
+        self._wav: Optional[WavBuffer] = None
+        self._sink: Optional[_EncoderSink] = None
+        self._file = None
+
+    @property
+    def bytes_out(self) -> int:
+        if self._wav is not None:
+            return self._wav.size
+        return self._sink.size if self._sink else 0
+
+    def _open(self, sample_rate: int) -> None:
+        self.sample_rate = sample_rate
+        if self.output_format == "wav":
+            self._wav = WavBuffer(sample_rate, self.sample_format, self.capacity, self.keep)
+            return
+        if self.output_format == "opus" and sample_rate not in OPUS_SAMPLE_RATES:
+            raise ValueError(f"Opus does not support {sample_rate} Hz audio")
+        major, subtype, _ = OUTPUT_FORMATS[self.output_format]
+        self._sink = _EncoderSink(self.keep)
+        self._file = soundfile.SoundFile(
+            self._sink, mode="w", samplerate=sample_rate, channels=1, format=major, subtype=subtype
+        )
+
+    def write(self, audio: np.ndarray, sample_rate: int) -> None:
+        start_time = time.time()
+        if self.sample_rate is None:
+            self._open(self.target_rate or sample_rate)
+        audio = resample(audio, sample_rate, self.sample_rate)
+        if self._wav is not None:
+            self._wav.append(audio)
+        else:
+            self._file.write(np.clip(audio, -1.0, 1.0).astype(np.float32))
+        self.samples += len(audio)
+        self.encode_time += time.time() - start_time
+
+    def take(self) -> bytes:
+        """Encoded bytes produced since the last call."""
+        if self._wav is not None:
+            return self._wav.take()
+        return self._sink.take() if self._sink else b""
+
+    def encode(self, audio: np.ndarray, sample_rate: int) -> bytes:
+        self.write(audio, sample_rate)
+        return self.take()
+
+    def close(self) -> bytes:
+        if self._file is None:
+            return b""
+        start_time = time.time()
+        self._file.close()
+        self._file = None
+        self.encode_time += time.time() - start_time
+        return self._sink.take()
+
+    def getvalue(self):
+        """
+        The complete encoded file, with final sizes in the header. Call after
+        `close`. For WAV this is the encoder's own buffer (a bytearray), not a
+        copy.
+        """
+        if self._wav is not None:
+            return self._wav.finish()
+        return self._sink.getvalue() if self._sink else b""
+
+    def log_stats(self, label: str = "") -> None:
+        pcm_bytes = self.samples * 2
+        ratio = pcm_bytes / self.bytes_out if self.bytes_out else 0.0
+        logger.info(
+            f"Encoded {self.samples} samples at {self.sample_rate} Hz to {self.output_format} "
+            f"({self.sample_format if self.output_format == 'wav' else 'int16'}) for {label}: {self.bytes_out} bytes "
+            f"({ratio:.1f}x smaller than 16-bit PCM) in {self.encode_time:.4f} seconds"
+        )
+
+
+def encode_segments(
+    segments: List[np.ndarray],
+    sample_rate: int,
+    output_format: str = "wav",
+    label: str = "",
+    target_rate: Optional[int] = None,
+    sample_format: str = "int16",
+):
+    """
+    Encode consecutive sentence segments into one file of the given format.
+    Each segment is converted straight into the output, so the waveform is
+    never concatenated in float; WAV output is allocated once at its final
+    size and returned as a bytearray.
+    """
+    output_rate = target_rate or sample_rate
+    # resample_poly returns ceil(n * output_rate / sample_rate) samples
+    capacity = sum(-(-len(segment) * output_rate // sample_rate) for segment in segments)
+    encoder = AudioEncoder(output_format, target_rate=target_rate, sample_format=sample_format, capacity=capacity)
+    # An empty text still produces a valid, empty file
+    for segment in segments or [np.zeros(0, dtype=np.float32)]:
+        encoder.write(segment, sample_rate)
+    encoder.close()
+    encoder.log_stats(label)
+    return encoder.getvalue()
+
+
+def encode_audio(
+    audio: np.ndarray,
+    sample_rate: int,
+    output_format: str = "wav",
+    label: str = "",
+    target_rate: Optional[int] = None,
+    sample_format: str = "int16",
+):
+    """Encode a complete waveform into a file of the given format."""
+    return encode_segments([audio], sample_rate, output_format, label, target_rate, sample_format)
+
+
+async def stream_audio(
+    segments: AsyncIterator[Tuple[np.ndarray, int]],
+    encoder: AudioEncoder,
+    request_start: float,
+    label: str = "",
+) -> AsyncIterator[bytes]:
+    """
+    Turn an async iterator of (audio_segment, sample_rate) into encoded
+    audio bytes, one chunk per segment as the encoder produces them. For WAV
+    the streaming header goes out together with the first segment so
+    time-to-first-byte measures when playable audio actually reaches the
+    client. Segments are encoded, and resampled, off the event loop. The time to
+    the first chunk and the total encoding time go into the request trace.
+    """
+    total_bytes = 0
+    chunks = 0
+    async for audio, sample_rate in segments:
+        chunk = await run_in_threadpool(encoder.encode, audio, sample_rate)
+        if not chunk:
+            continue  # the codec is still buffering
+        if chunks == 0:
+            ttfb = time.time() - request_start
+            record_stage("first_chunk", ttfb)
+            logger.info(f"Time to first byte for {label} stream: {ttfb:.4f} seconds")
+        chunks += 1
+        total_bytes += len(chunk)
+        yield chunk
+
+    chunk = encoder.close()
+    if chunk:
+        chunks += 1
+        total_bytes += len(chunk)
+        yield chunk
+
+    total_time = time.time() - request_start
+    record_stage("encode", encoder.encode_time)
+    encoder.log_stats(label)
+    logger.info(f"Streamed {total_bytes} bytes in {chunks} chunks for {label} in {total_time:.4f} seconds")
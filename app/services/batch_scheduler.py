@@ -0,0 +1,241 @@
+# app/services/batch_scheduler.py
+import bisect
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Deque, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("swahili-voice-api")
+
+
+def parse_bucket_edges(value: str) -> List[int]:
+    """Parse comma-separated token-length bucket edges from a setting, e.g. "64,128,256"."""
+    return sorted(int(edge) for edge in value.split(",") if edge.strip())
+
+
+def bucket_index(length: int, edges: Sequence[int]) -> int:
+    """Index of the bucket for a token length: bucket i holds lengths in [edges[i-1], edges[i])."""
+    return bisect.bisect_right(edges, length)
+
+
+def batch_fits(count: int, longest: int, max_batch_size: int, max_tokens: int) -> bool:
+    """Whether `count` inputs padded to `longest` tokens stay within the batch size and token budget."""
+    return count <= max_batch_size and (count == 1 or not max_tokens or count * longest <= max_tokens)
+
+
+def plan_batches(lengths: Sequence[int], edges: Sequence[int], max_batch_size: int, max_tokens: int = 0) -> List[List[int]]:
+    """
+    Group inputs into batches of similar length: bucket them by token
+    length, sort each bucket and cut it into batches that respect the batch
+    size and padded-token budget. Returns lists of input indices.
+    """
+    buckets: Dict[int, List[int]] = {}
+    for i, length in enumerate(lengths):
+        buckets.setdefault(bucket_index(length, edges), []).append(i)
+    batches = []
+    for bucket in sorted(buckets):
+        batch: List[int] = []
+        for i in sorted(buckets[bucket], key=lambda i: lengths[i]):
+            # Sorted ascending, so the newest input is the longest
+            if batch and not batch_fits(len(batch) + 1, lengths[i], max_batch_size, max_tokens):
+                batches.append(batch)
+                batch = []
+            batch.append(i)
+        batches.append(batch)
+    return batches
+
+
+class PaddingStats:
+    """Batch, token and padding counters for one length bucket."""
+
+    __slots__ = ("batches", "sentences", "tokens", "padded_tokens", "wait_time")
+
+    def __init__(self):
+        self.batches = 0
+        self.sentences = 0
+        self.tokens = 0
+        self.padded_tokens = 0
+        self.wait_time = 0.0
+
+    def record(self, lengths: Sequence[int], wait_time: float = 0.0) -> None:
+        self.batches += 1
+        self.sentences += len(lengths)
+        self.tokens += sum(lengths)
+        self.padded_tokens += len(lengths) * max(lengths)
+        self.wait_time += wait_time
+
+    def to_dict(self) -> dict:
+        return {
+            "batches": self.batches,
+            "sentences": self.sentences,
+            "mean_batch_size": self.sentences / self.batches if self.batches else 0.0,
+            "padding_efficiency": self.tokens / self.padded_tokens if self.padded_tokens else 1.0,
+            "mean_wait_seconds": self.wait_time / self.sentences if self.sentences else 0.0,
+        }
+
+
+def padding_report(buckets: Dict[int, PaddingStats], edges: Sequence[int]) -> dict:
+    """Overall and per-bucket padding statistics, buckets labelled by their token range."""
+    tokens = sum(stats.tokens for stats in buckets.values())
+    padded_tokens = sum(stats.padded_tokens for stats in buckets.values())
+    bounds = [0, *edges]
+    labels = [f"{low}-{high - 1}" for low, high in zip(bounds, edges)] + [f"{bounds[-1]}+"]
+    return {
+        "padding_efficiency": tokens / padded_tokens if padded_tokens else 1.0,
+        "buckets": {labels[i]: buckets[i].to_dict() for i in sorted(buckets)},
+    }
+
+
+class _PendingSentence:
+    __slots__ = ("sentence", "length", "options", "future", "enqueued_at")
+
+    def __init__(self, sentence, length: int, options: Hashable = None):
+        self.sentence = sentence
+        self.length = length
+        self.options = options
+        self.future: Future = Future()
+        self.enqueued_at = time.time()
+
+
+class BatchScheduler:
+    """
+    Length-bucketed micro-batching scheduler for one model.
+
+    Inputs submitted from concurrent requests (tokenized sentences) are
+    queued by token-length bucket (`bucket_edges`) and sampling `options`,
+    so a batch only pads to the longest of similar-length inputs. A queue
+    runs as a batch once it holds `max_batch_size` inputs or `max_tokens`
+    padded tokens, or once its oldest input has waited `max_wait_ms`. When
+    several queues are ready, shorter buckets go first, each bucket further
+    up deferring by another `max_wait_ms` of waiting, so short interactive
+    requests don't queue behind long batches and long ones can't starve.
+    The waveforms `run_batch` returns are delivered back through
+    per-input futures.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        run_batch: Callable[[List, Hashable], List[np.ndarray]],
+        max_batch_size: int,
+        max_wait_ms: float,
+        bucket_edges: Sequence[int] = (),
+        max_tokens: int = 0,
+    ):
+        self.name = name
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.bucket_edges = sorted(bucket_edges)
+        self.max_tokens = max(0, max_tokens)
+        self._pending: Dict[Tuple[Hashable, int], Deque[_PendingSentence]] = {}
+        self._ready = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        self.busy_time = 0.0
+        self.buckets: Dict[int, PaddingStats] = {}
+
+    def _ensure_started(self) -> None:
+        # Started on first use so the thread lives in the process that
+        # actually serves requests (not in a gunicorn master before fork)
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._loop,
+                    name=f"tts-batcher-{self.name}",
+                    daemon=True,
+                )
+                self._thread.start()
+
+    def submit(self, sentences: List, options: Hashable = None, lengths: Optional[List[int]] = None) -> List[Future]:
+        """
+        Queue inputs for batched inference; returns one future per input.
+        `lengths` are their token counts, by default `len()` of each input.
+        """
+        self._ensure_started()
+        lengths = lengths if lengths is not None else [len(sentence) for sentence in sentences]
+        pending = [_PendingSentence(sentence, length, options) for sentence, length in zip(sentences, lengths)]
+        with self._ready:
+            for item in pending:
+                key = (options, bucket_index(item.length, self.bucket_edges))
+                self._pending.setdefault(key, deque()).append(item)
+            self._ready.notify()
+        return [item.future for item in pending]
+
+    def _batch_size(self, items: Deque[_PendingSentence]) -> int:
+        """How many of the oldest queued inputs fit in one batch."""
+        longest = 0
+        for count, item in enumerate(items, 1):
+            longest = max(longest, item.length)
+            if not batch_fits(count, longest, self.max_batch_size, self.max_tokens):
+                return count - 1
+        return len(items)
+
+    def _next_batch(self) -> Tuple[List[_PendingSentence], Hashable, int]:
+        with self._ready:
+            while True:
+                now = time.time()
+                chosen, chosen_priority, chosen_size, wake_at = None, None, 0, None
+                for key, items in self._pending.items():
+                    oldest = items[0].enqueued_at
+                    size = self._batch_size(items)
+                    if size < len(items) or size == self.max_batch_size or now >= oldest + self.max_wait:
+                        priority = oldest + key[1] * self.max_wait
+                        if chosen is None or priority < chosen_priority:
+                            chosen, chosen_priority, chosen_size = key, priority, size
+                    elif wake_at is None or oldest + self.max_wait < wake_at:
+                        wake_at = oldest + self.max_wait
+                if chosen is not None:
+                    items = self._pending[chosen]
+                    batch = [items.popleft() for _ in range(chosen_size)]
+                    if not items:
+                        del self._pending[chosen]
+                    return batch, chosen[0], chosen[1]
+                self._ready.wait(None if wake_at is None else max(0.0, wake_at - now))
+
+    def _loop(self) -> None:
+        while True:
+            self._run(*self._next_batch())
+
+    def _run(self, batch: List[_PendingSentence], options: Hashable, bucket: int) -> None:
+        start_time = time.time()
+        try:
+            waveforms = self.run_batch([item.sentence for item in batch], options)
+            for item, waveform in zip(batch, waveforms):
+                item.future.set_result(waveform)
+        except Exception as e:
+            logger.exception(f"Batched inference failed for {self.name}")
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(e)
+        batch_time = time.time() - start_time
+
+        lengths = [item.length for item in batch]
+        self.busy_time += batch_time
+        self.buckets.setdefault(bucket, PaddingStats()).record(
+            lengths, sum(start_time - item.enqueued_at for item in batch)
+        )
+        logger.debug(
+            f"Ran batch of {len(batch)} sentences ({min(lengths)}-{max(lengths)} tokens, "
+            f"{sum(lengths) / (len(batch) * max(lengths)):.0%} padding efficiency) for {self.name} "
+            f"in {batch_time:.4f} seconds (waited {start_time - batch[0].enqueued_at:.4f} seconds)"
+        )
+
+    def stats(self) -> dict:
+        batches = sum(stats.batches for stats in self.buckets.values())
+        sentences = sum(stats.sentences for stats in self.buckets.values())
+        with self._ready:
+            queued = sum(len(items) for items in self._pending.values())
+        return {
+            "batches": batches,
+            "sentences": sentences,
+            "mean_batch_size": sentences / batches if batches else 0.0,
+            "sentences_per_second": sentences / self.busy_time if self.busy_time else 0.0,
+            "queued": queued,
+            **padding_report(self.buckets, self.bucket_edges),
+        }
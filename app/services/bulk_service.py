@@ -0,0 +1,154 @@
+# app/services/bulk_service.py
+import asyncio
+import io
+import json
+import logging
+import tarfile
+import time
+import zipfile
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from ..config import settings
+from ..models.schemas import BulkTTSItem
+from .audio_service import to_pcm16, wav_header
+from .inference_executor import inference_executor
+from .inference_pool import inference_pool
+from .tts_service import generate_audio_batch
+
+logger = logging.getLogger("swahili-voice-api")
+
+MEDIA_TYPES = {"zip": "application/zip", "tar": "application/x-tar"}
+
+
+class _ChunkWriter:
+    """Write-only, unseekable file object that collects what an archive writer emits."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class ArchiveWriter:
+    """
+    Builds a zip or tar archive incrementally: `add` and `close` return the
+    bytes produced so far, so entries can be sent as soon as they are written
+    and nothing but the current entry is held in memory. WAV data barely
+    compresses, so zip entries are stored uncompressed.
+    """
+
+    def __init__(self, archive_format: str):
+        self.archive_format = archive_format
+        self._out = _ChunkWriter()
+        if archive_format == "zip":
+            self._archive = zipfile.ZipFile(self._out, mode="w", compression=zipfile.ZIP_STORED)
+        else:
+            self._archive = tarfile.open(fileobj=self._out, mode="w|")
+
+    def add(self, name: str, data: bytes) -> bytes:
+        if self.archive_format == "zip":
+            info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+            self._archive.writestr(info, data)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = int(time.time())
+            self._archive.addfile(info, io.BytesIO(data))
+        return self._out.take()
+
+    def close(self) -> bytes:
+        self._archive.close()
+        return self._out.take()
+
+
+def _chunks(items: List[BulkTTSItem], models: Dict[str, str], chunk_size: int) -> List[Tuple[str, List[BulkTTSItem]]]:
+    """Group items by model and cut each group into chunks of at most `chunk_size` items."""
+    groups: Dict[str, List[BulkTTSItem]] = {}
+    for item in items:
+        groups.setdefault(models[item.voice], []).append(item)
+    return [
+        (model_name, group[start:start + chunk_size])
+        for model_name, group in groups.items()
+        for start in range(0, len(group), max(1, chunk_size))
+    ]
+
+
+async def iter_bulk_archive(
+    items: List[BulkTTSItem],
+    models: Dict[str, str],
+    archive_format: str,
+    chunk_size: Optional[int] = None,
+) -> AsyncIterator[bytes]:
+    """
+    Synthesize bulk items and stream them as an archive of `<id>.wav` files
+    followed by `manifest.json`.
+
+    Items are grouped by model (`models` maps voice to model key) and sent to
+    the inference executor a chunk at a time as one batched call; the next
+    chunk is already synthesizing while the current one is written out. A
+    chunk that fails is recorded in the manifest instead of aborting the
+    archive.
+    """
+    synthesize_batch = inference_pool.generate_audio_batch if inference_pool else generate_audio_batch
+    chunks = _chunks(items, models, chunk_size or settings.BULK_CHUNK_SIZE)
+    archive = ArchiveWriter(archive_format)
+    manifest = []
+    total_bytes = 0
+    start_time = time.time()
+
+    def start(index: int) -> Optional[asyncio.Future]:
+        if index >= len(chunks):
+            return None
+        model_name, chunk = chunks[index]
+        return asyncio.ensure_future(
+            inference_executor.submit_when_available(synthesize_batch, [item.text for item in chunk], model_name)
+        )
+
+    next_task = start(0)
+    try:
+        for index, (model_name, chunk) in enumerate(chunks):
+            task, next_task = next_task, start(index + 1)
+            try:
+                audios, sample_rate = await task
+            except Exception as e:
+                logger.exception(f"Bulk chunk of {len(chunk)} items for {model_name} failed")
+                manifest.extend({"id": item.id, "voice": item.voice, "error": str(e)} for item in chunk)
+                continue
+
+            for item, audio in zip(chunk, audios):
+                pcm = to_pcm16(audio).tobytes()
+                file_name = f"{item.id}.wav"
+                data = archive.add(file_name, wav_header(sample_rate, data_size=len(pcm)) + pcm)
+                total_bytes += len(data)
+                manifest.append({
+                    "id": item.id,
+                    "voice": item.voice,
+                    "file": file_name,
+                    "sample_rate": sample_rate,
+                    "duration_seconds": len(audio) / sample_rate,
+                    "bytes": len(pcm) + 44,
+                })
+                yield data
+
+        manifest_json = json.dumps({"items": manifest}, ensure_ascii=False, indent=2).encode("utf-8")
+        data = archive.add("manifest.json", manifest_json) + archive.close()
+        total_bytes += len(data)
+        yield data
+        logger.info(
+            f"Streamed bulk {archive_format} of {len(items)} items ({total_bytes} bytes) "
+            f"in {time.time() - start_time:.4f} seconds"
+        )
+    finally:
+        # Client went away mid-archive: don't leave the next chunk queued
+        if next_task is not None:
+            next_task.cancel()
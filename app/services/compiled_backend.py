@@ -0,0 +1,173 @@
+# app/services/compiled_backend.py
+import logging
+import os
+import re
+import tempfile
+import time
+from typing import Any, Callable, Iterable, Optional
+
+import torch
+from transformers import VitsConfig
+
+from ..config import settings
+
+logger = logging.getLogger("swahili-voice-api")
+
+# Inputs of different lengths, plus a padded batch, used to check that an
+# exported graph did not bake in shapes from the tracing example
+VALIDATION_TEXTS = [
+    ["Ndio."],
+    ["Habari za asubuhi, karibu sana."],
+    ["Mwalimu aliwaambia wanafunzi wasome kitabu kizima kabla ya mtihani wa wiki ijayo."],
+    ["Asante.", "Leo ni siku nzuri sana ya kufanya kazi shambani."],
+]
+
+
+class _VitsForward(torch.nn.Module):
+    """
+    Tracing wrapper around VitsModel. The sampling controls are graph inputs
+    rather than attributes, so the exported graph still honours them.
+    """
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask, speaking_rate, noise_scale, noise_scale_duration):
+        self.model.speaking_rate = speaking_rate
+        self.model.noise_scale = noise_scale
+        self.model.noise_scale_duration = noise_scale_duration
+        outputs = self.model(input_ids=input_ids, attention_mask=attention_mask, return_dict=False)
+        return outputs[0], outputs[1]
+
+
+class CompiledVitsOutput:
+    def __init__(self, waveform: torch.Tensor, sequence_lengths: torch.Tensor):
+        self.waveform = waveform
+        self.sequence_lengths = sequence_lengths
+
+
+class CompiledVitsModel:
+    """
+    Stand-in for VitsModel at inference time, backed by a TorchScript graph.
+    Exposes the attributes the service reads (`config`, `speaking_rate`,
+    `noise_scale`, `noise_scale_duration`) and returns an object with
+    `waveform` and `sequence_lengths` like VitsModel's output.
+    """
+
+    def __init__(self, module: torch.jit.ScriptModule, config):
+        self.module = module
+        self.config = config
+        self.speaking_rate = config.speaking_rate
+        self.noise_scale = config.noise_scale
+        self.noise_scale_duration = config.noise_scale_duration
+
+    def __call__(self, input_ids: torch.Tensor, attention_mask: Optional[torch.Tensor] = None, **kwargs) -> CompiledVitsOutput:
+        if attention_mask is None:
+            attention_mask = torch.ones_like(input_ids)
+        waveform, sequence_lengths = self.module(
+            input_ids,
+            attention_mask,
+            torch.tensor(float(self.speaking_rate)),
+            torch.tensor(float(self.noise_scale)),
+            torch.tensor(float(self.noise_scale_duration)),
+        )
+        return CompiledVitsOutput(waveform, sequence_lengths)
+
+    def eval(self) -> "CompiledVitsModel":
+        return self
+
+    def state_dict(self) -> dict:
+        return self.module.state_dict()
+
+
+def compiled_model_path(model_name: str, variants: Iterable[str]) -> str:
+    safe_name = re.sub(r"[^A-Za-z0-9_.-]+", "--", model_name)
+    return os.path.join(settings.MODEL_CACHE_DIR, "compiled", f"{safe_name}-{'-'.join(sorted(variants))}.pt")
+
+
+def _trace(model, example_inputs: dict) -> torch.jit.ScriptModule:
+    saved = (model.speaking_rate, model.noise_scale, model.noise_scale_duration)
+    wrapper = _VitsForward(model).eval()
+    scalars = tuple(torch.tensor(float(value)) for value in saved)
+    try:
+        with torch.no_grad():
+            return torch.jit.trace(
+                wrapper,
+                (example_inputs["input_ids"], example_inputs["attention_mask"]) + scalars,
+                check_trace=False,
+            )
+    finally:
+        # The wrapper swapped tensors into the eager model's attributes
+        model.speaking_rate, model.noise_scale, model.noise_scale_duration = saved
+
+
+def _validate(compiled: CompiledVitsModel, model, tokenizer) -> None:
+    """
+    Compare the compiled graph against eager with sampling noise disabled.
+    Raises ValueError when lengths or waveforms diverge.
+    """
+    compiled.noise_scale = compiled.noise_scale_duration = 0.0
+    saved = (model.noise_scale, model.noise_scale_duration)
+    model.noise_scale = model.noise_scale_duration = 0.0
+    try:
+        for texts in VALIDATION_TEXTS:
+            inputs = tokenizer(texts, padding=True, return_tensors="pt")
+            with torch.no_grad():
+                expected = model(**inputs)
+                actual = compiled(**inputs)
+            if not torch.equal(expected.sequence_lengths, actual.sequence_lengths):
+                raise ValueError(f"sequence lengths differ for {texts}")
+            error = (expected.waveform - actual.waveform).abs().max().item()
+            if error > 1e-3:
+                raise ValueError(f"waveform differs by {error:.5f} for {texts}")
+    finally:
+        model.noise_scale, model.noise_scale_duration = saved
+        compiled.noise_scale = compiled.config.noise_scale
+        compiled.noise_scale_duration = compiled.config.noise_scale_duration
+
+
+def export_torchscript(model, tokenizer, path: str) -> CompiledVitsModel:
+    """Trace `model` to TorchScript, validate it against eager and save it to `path`."""
+    start_time = time.time()
+    example = tokenizer(VALIDATION_TEXTS[1], return_tensors="pt")
+    compiled = CompiledVitsModel(_trace(model, example), model.config)
+    _validate(compiled, model, tokenizer)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    os.close(fd)
+    torch.jit.save(compiled.module, tmp_path)
+    os.replace(tmp_path, path)
+    logger.info(f"Exported TorchScript graph to {path} in {time.time() - start_time:.4f} seconds")
+    return compiled
+
+
+def load_torchscript(path: str, config) -> CompiledVitsModel:
+    return CompiledVitsModel(torch.jit.load(path, map_location="cpu"), config)
+
+
+def load_compiled_model(
+    model_name: str,
+    variants: Iterable[str],
+    load_eager: Callable[[], Any],
+    tokenizer,
+) -> Optional[CompiledVitsModel]:
+    """
+    Load the TorchScript graph for a model variant, exporting it from the
+    eager model on first use. Returns None if export or loading fails so the
+    caller can fall back to eager inference.
+    """
+    path = compiled_model_path(model_name, variants)
+    try:
+        if os.path.exists(path):
+            config = VitsConfig.from_pretrained(
+                model_name,
+                token=settings.HF_TOKEN,
+                cache_dir=settings.MODEL_CACHE_DIR
+            )
+            return load_torchscript(path, config)
+        return export_torchscript(load_eager(), tokenizer, path)
+    except Exception:
+        logger.exception(f"Could not load a TorchScript graph for {model_name}")
+        return None
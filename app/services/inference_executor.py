@@ -0,0 +1,198 @@
+# app/services/inference_executor.py
+import asyncio
+import contextvars
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Iterator, Optional
+
+import torch
+from fastapi import HTTPException
+
+from ..config import settings
+from .metrics import INFERENCE_PENDING, INFERENCE_QUEUE_DEPTH, INFERENCE_REJECTED
+from .request_trace import record_stage
+
+logger = logging.getLogger("swahili-voice-api")
+
+_DONE = object()
+
+
+class InferenceExecutor:
+    """
+    Bounded thread pool that runs blocking TTS inference off the event loop.
+
+    Admission control counts every submitted job (running + queued). Once
+    `max_workers + max_queue` jobs are pending, new submissions are rejected
+    with a 503 and a Retry-After header instead of piling up behind the pool.
+
+    Jobs run in a copy of the submitting context, so the request trace (and
+    any other context variable) follows them into the pool thread; the time
+    a job waited for a free thread is recorded as its `queue` stage.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, torch_threads: int, retry_after: int):
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.torch_threads = torch_threads
+        self.retry_after = retry_after
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Created lazily so a gunicorn master importing the app (--preload)
+        # never owns the pool; each worker builds its own after fork.
+        if self._executor is None:
+            if self.torch_threads > 0:
+                torch.set_num_threads(self.torch_threads)
+            logger.info(
+                f"Starting inference executor with {self.max_workers} workers, "
+                f"queue limit {self.max_queue}, torch threads {torch.get_num_threads()}"
+            )
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="tts-inference",
+            )
+        return self._executor
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self._pending - self.max_workers)
+
+    def _release(self, _future) -> None:
+        with self._lock:
+            self._pending -= 1
+            self._update_gauges()
+
+    def _update_gauges(self) -> None:
+        INFERENCE_PENDING.set(self._pending)
+        INFERENCE_QUEUE_DEPTH.set(self.queue_depth)
+
+    def _try_admit(self) -> bool:
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                return False
+            self._pending += 1
+            self._update_gauges()
+            return True
+
+    def _admit(self) -> None:
+        if not self._try_admit():
+            logger.warning(f"Inference queue full ({self._pending} pending), rejecting request")
+            INFERENCE_REJECTED.inc()
+            raise HTTPException(
+                status_code=503,
+                detail="TTS service is busy, please retry later",
+                headers={"Retry-After": str(self.retry_after)},
+            )
+
+    @staticmethod
+    def _in_context(fn: Callable[..., Any], *args, **kwargs) -> Callable[[], Any]:
+        """Bind `fn` to a copy of the caller's context, recording how long it queues before it starts."""
+        context = contextvars.copy_context()
+        submitted_at = time.time()
+
+        def run():
+            record_stage("queue", time.time() - submitted_at)
+            return fn(*args, **kwargs)
+
+        return functools.partial(context.run, run)
+
+    async def _run_admitted(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        try:
+            future = self._get_executor().submit(self._in_context(fn, *args, **kwargs))
+        except BaseException:
+            self._release(None)
+            raise
+        # Release on completion of the pool job rather than of the awaiting
+        # coroutine, so a disconnected client can't free a slot that is still busy.
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    async def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run `fn(*args, **kwargs)` on the inference pool and await its result."""
+        self._admit()
+        return await self._run_admitted(fn, *args, **kwargs)
+
+    async def submit_when_available(self, fn: Callable[..., Any], *args, poll_seconds: float = 0.1, **kwargs) -> Any:
+        """
+        Like `submit`, but wait for queue space instead of raising a 503.
+        Meant for background work (jobs, bulk batches) that should wait
+        behind interactive requests rather than fail.
+        """
+        while not self._try_admit():
+            await asyncio.sleep(poll_seconds)
+        return await self._run_admitted(fn, *args, **kwargs)
+
+    def stream(self, gen_fn: Callable[..., Iterator[Any]], *args, **kwargs) -> AsyncIterator[Any]:
+        """
+        Run the generator `gen_fn(*args, **kwargs)` on the inference pool and
+        return an async iterator over the items it yields.
+
+        Admission happens when this is called, not on first iteration, so a
+        full queue surfaces as a 503 before a streaming response has started.
+        """
+        self._admit()
+        loop = asyncio.get_running_loop()
+        items: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+
+        def put(item, error=None):
+            try:
+                loop.call_soon_threadsafe(items.put_nowait, (item, error))
+            except RuntimeError:
+                # Event loop already closed (worker shutting down)
+                stop.set()
+
+        def produce():
+            try:
+                for item in gen_fn(*args, **kwargs):
+                    if stop.is_set():
+                        return
+                    put(item)
+            except BaseException as e:
+                put(_DONE, e)
+                return
+            put(_DONE)
+
+        try:
+            future = self._get_executor().submit(self._in_context(produce))
+        except BaseException:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+
+        async def consume():
+            try:
+                while True:
+                    item, error = await items.get()
+                    if error is not None:
+                        raise error
+                    if item is _DONE:
+                        return
+                    yield item
+            finally:
+                # Stop generating once the consumer goes away (e.g. client disconnect)
+                stop.set()
+
+        return consume()
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+inference_executor = InferenceExecutor(
+    max_workers=settings.INFERENCE_WORKERS,
+    max_queue=settings.INFERENCE_MAX_QUEUE,
+    torch_threads=settings.TORCH_NUM_THREADS,
+    retry_after=settings.INFERENCE_RETRY_AFTER,
+)
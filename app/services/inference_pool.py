@@ -0,0 +1,237 @@
+# app/services/inference_pool.py
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Connection, Listener, wait
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+from fastapi import HTTPException
+
+from ..config import settings
+from .metrics import mark_process_dead
+from .request_trace import current_trace, start_trace
+
+logger = logging.getLogger("swahili-voice-api")
+
+
+def pool_authkey() -> bytes:
+    """
+    Key both ends of a pool connection must prove they hold before any
+    message is unpickled, so other local processes can't send requests.
+    """
+    return (settings.INFERENCE_POOL_AUTHKEY or settings.SECRET_KEY).encode()
+
+
+def _handle(conn: Connection) -> None:
+    """
+    Serve one request read from `conn`, replying with result/segment/error
+    messages. The stages timed while serving it are sent back in a trace
+    message just before the final result, for the HTTP worker's request trace.
+    """
+    from .model_registry import model_registry
+    from .tts_service import generate_audio, generate_audio_batch, generate_segments, iter_audio
+
+    request = conn.recv()
+    op = request["op"]
+    trace = start_trace()
+    sampling = {"speaking_rate": request.get("speaking_rate"), "noise_scale": request.get("noise_scale")}
+    try:
+        if op == "generate":
+            audio, sample_rate = generate_audio(request["text"], request["model_name"], **sampling)
+            conn.send(("trace", (trace.stages, trace.attributes)))
+            conn.send(("result", (audio, sample_rate)))
+        elif op == "generate_segments":
+            result = generate_segments(request["text"], request["model_name"], **sampling)
+            conn.send(("trace", (trace.stages, trace.attributes)))
+            conn.send(("result", result))
+        elif op == "generate_batch":
+            result = generate_audio_batch(request["texts"], request["model_name"], **sampling)
+            conn.send(("trace", (trace.stages, trace.attributes)))
+            conn.send(("result", result))
+        elif op == "stream":
+            for segment, sample_rate in iter_audio(request["text"], request["model_name"], **sampling):
+                conn.send(("segment", (segment, sample_rate)))
+            conn.send(("trace", (trace.stages, trace.attributes)))
+            conn.send(("done", None))
+        elif op == "stats":
+            conn.send(("result", {"pid": os.getpid(), **model_registry.stats()}))
+        else:
+            conn.send(("error", f"Unknown operation '{op}'"))
+    except (BrokenPipeError, ConnectionResetError):
+        # The HTTP worker went away, e.g. a streaming client disconnected
+        logger.debug(f"Inference pool client disconnected during '{op}'")
+    except Exception as e:
+        logger.exception(f"Inference pool request '{op}' failed")
+        try:
+            conn.send(("error", str(e)))
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def _serve(listener: Listener, torch_threads: int) -> None:
+    """Main loop of one inference process: accept a connection, serve it, repeat."""
+    import torch
+    from .model_registry import model_registry
+
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    torch.set_num_threads(torch_threads)
+    torch.set_num_interop_threads(1)
+    model_registry.publish_metrics()
+    logger.info(f"Inference process {os.getpid()} ready with {torch_threads} torch threads")
+    while True:
+        try:
+            conn = listener.accept()
+        except OSError as e:
+            logger.warning(f"Inference process {os.getpid()} failed to accept a connection: {e}")
+            continue
+        except AuthenticationError:
+            logger.warning(f"Inference process {os.getpid()} rejected a connection with a wrong authkey")
+            continue
+        with conn:
+            try:
+                _handle(conn)
+            except EOFError:
+                pass
+
+
+class InferencePoolServer:
+    """
+    A fixed pool of inference processes behind one Unix socket.
+
+    The parent loads (and warms up) the preloaded models, then forks the
+    inference processes, which share those weights copy-on-write and each
+    accept connections from the same listening socket, so the kernel hands
+    every request to an idle process. Each process runs one request at a time
+    with its own pinned torch thread count. Processes that die are replaced.
+    """
+
+    def __init__(self, address: str, processes: int, torch_threads: int):
+        self.address = address
+        self.processes = processes
+        self.torch_threads = torch_threads
+        self._context = multiprocessing.get_context("fork")
+        self._workers: List[multiprocessing.Process] = []
+        self._stopping = False
+
+    def _start_worker(self, listener: Listener) -> multiprocessing.Process:
+        worker = self._context.Process(target=_serve, args=(listener, self.torch_threads), daemon=True)
+        worker.start()
+        return worker
+
+    def _stop(self, signum, frame) -> None:
+        self._stopping = True
+
+    def serve_forever(self, preload: List[str], warm_up: bool = True) -> None:
+        from .model_registry import model_registry
+
+        model_registry.preload(preload, warm_up=warm_up)
+
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+        listener = Listener(self.address, family="AF_UNIX", backlog=128, authkey=pool_authkey())
+        os.chmod(self.address, 0o600)
+        logger.info(
+            f"Inference pool listening on {self.address} with {self.processes} processes, "
+            f"{self.torch_threads} torch threads each"
+        )
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        try:
+            self._workers = [self._start_worker(listener) for _ in range(self.processes)]
+            while not self._stopping:
+                wait([worker.sentinel for worker in self._workers], timeout=1.0)
+                for i, worker in enumerate(self._workers):
+                    if not worker.is_alive() and not self._stopping:
+                        logger.warning(f"Inference process {worker.pid} exited with {worker.exitcode}, restarting")
+                        mark_process_dead(worker.pid)
+                        self._workers[i] = self._start_worker(listener)
+        finally:
+            for worker in self._workers:
+                worker.terminate()
+            for worker in self._workers:
+                worker.join(timeout=10)
+            listener.close()
+            logger.info("Inference pool stopped")
+
+
+class InferencePoolClient:
+    """
+    Thin client used by the HTTP workers when INFERENCE_POOL_SOCKET is set.
+    Mirrors `generate_audio`, `generate_segments`, `generate_audio_batch`
+    and `iter_audio` from tts_service, including their sampling keyword
+    arguments; each call opens its own connection, so calls are safe from
+    any thread.
+    """
+
+    def __init__(self, address: str):
+        self.address = address
+
+    def _request(self, **request) -> Connection:
+        try:
+            conn = Client(self.address, family="AF_UNIX", authkey=pool_authkey())
+        except (FileNotFoundError, ConnectionRefusedError, AuthenticationError) as e:
+            logger.error(f"Inference pool at {self.address} is unavailable: {e}")
+            raise HTTPException(
+                status_code=503,
+                detail="Inference service unavailable, please retry later",
+                headers={"Retry-After": str(settings.INFERENCE_RETRY_AFTER)},
+            )
+        conn.send(request)
+        return conn
+
+    @staticmethod
+    def _receive(conn: Connection) -> Tuple[str, object]:
+        kind, payload = conn.recv()
+        while kind == "trace":
+            # Stages timed in the inference process join this request's trace
+            trace = current_trace()
+            if trace is not None:
+                stages, attributes = payload
+                trace.merge(stages)
+                trace.set(**attributes)
+            kind, payload = conn.recv()
+        if kind == "error":
+            raise RuntimeError(f"Inference pool error: {payload}")
+        return kind, payload
+
+    def generate_audio(self, text: str, model_name: str, **sampling) -> Tuple[np.ndarray, int]:
+        start_time = time.time()
+        with self._request(op="generate", text=text, model_name=model_name, **sampling) as conn:
+            _, (audio, sample_rate) = self._receive(conn)
+        logger.debug(f"Inference pool round trip took {time.time() - start_time:.4f} seconds")
+        return audio, sample_rate
+
+    def generate_segments(self, text: str, model_name: str, **sampling) -> Tuple[List[np.ndarray], int]:
+        with self._request(op="generate_segments", text=text, model_name=model_name, **sampling) as conn:
+            _, (segments, sample_rate) = self._receive(conn)
+        return segments, sample_rate
+
+    def generate_audio_batch(self, texts: List[str], model_name: str, **sampling) -> Tuple[List[np.ndarray], int]:
+        with self._request(op="generate_batch", texts=texts, model_name=model_name, **sampling) as conn:
+            _, (audios, sample_rate) = self._receive(conn)
+        return audios, sample_rate
+
+    def iter_audio(self, text: str, model_name: str, **sampling) -> Iterator[Tuple[np.ndarray, int]]:
+        # Closing the generator closes the connection, which stops the
+        # inference process at its next segment
+        with self._request(op="stream", text=text, model_name=model_name, **sampling) as conn:
+            while True:
+                kind, payload = self._receive(conn)
+                if kind == "done":
+                    return
+                yield payload
+
+    def stats(self) -> dict:
+        with self._request(op="stats") as conn:
+            _, stats = self._receive(conn)
+        return stats
+
+
+inference_pool: Optional[InferencePoolClient] = (
+    InferencePoolClient(settings.INFERENCE_POOL_SOCKET) if settings.INFERENCE_POOL_SOCKET else None
+)
@@ -0,0 +1,304 @@
+# app/services/job_service.py
+from ..database.mongodb import Database
+from ..models.schemas import JobStatus, TTSJobInDB
+from .audio_service import to_pcm16, wav_header
+from .inference_executor import inference_executor
+from .inference_pool import inference_pool
+from .tts_service import generate_audio
+from app.config import settings
+from bson import ObjectId
+from datetime import datetime, timedelta, timezone
+from fastapi import HTTPException
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from typing import AsyncIterator, List, Optional
+import asyncio
+import logging
+import os
+import socket
+import time
+
+logger = logging.getLogger("swahili-voice-api")
+
+# The sentence list is only needed by the worker, not in status responses
+_STATUS_PROJECTION = {"sentences": 0, "owner": 0, "lease_until": 0}
+
+
+class JobService:
+    """
+    Jobs live in the `tts_jobs` collection; the PCM audio of every finished
+    sentence is stored in `tts_job_segments`, keyed by (job_id, index), so a
+    job can resume from its first missing sentence. Once a job finishes, it
+    and its segments get an `expires_at` JOB_RETENTION_HOURS later, and a
+    TTL index on it lets MongoDB delete them.
+    """
+
+    def __init__(self):
+        self.db = Database.client[settings.DB_NAME]
+        self.collection = self.db.tts_jobs
+        self.segments = self.db.tts_job_segments
+
+    async def ensure_indexes(self) -> None:
+        await self.collection.create_index([("status", ASCENDING), ("priority", DESCENDING), ("created_at", ASCENDING)])
+        await self.segments.create_index([("job_id", ASCENDING), ("index", ASCENDING)], unique=True)
+        # Documents without `expires_at` (unfinished jobs, or retention 0) never expire
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+        await self.segments.create_index("expires_at", expireAfterSeconds=0)
+
+    async def _expire(self, job_id: ObjectId, now: datetime) -> None:
+        """Schedule a finished job and its audio for deletion after the retention period."""
+        if settings.JOB_RETENTION_HOURS <= 0:
+            return
+        expires_at = {"$set": {"expires_at": now + timedelta(hours=settings.JOB_RETENTION_HOURS)}}
+        await self.collection.update_one({"_id": job_id}, expires_at)
+        await self.segments.update_many({"job_id": job_id}, expires_at)
+
+    async def create_job(self, voice: str, model_name: str, sentences: List[str], priority: int) -> TTSJobInDB:
+        try:
+            now = datetime.now(timezone.utc)
+            job = {
+                "voice": voice,
+                "model_name": model_name,
+                "sentences": sentences,
+                "status": JobStatus.QUEUED.value,
+                "priority": priority,
+                "total_sentences": len(sentences),
+                "done_sentences": 0,
+                "created_at": now,
+                "updated_at": now,
+            }
+            result = await self.collection.insert_one(job)
+            return await self.get_job(str(result.inserted_id))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    async def get_job(self, job_id: str) -> Optional[TTSJobInDB]:
+        if not ObjectId.is_valid(job_id):
+            return None
+        job = await self.collection.find_one({"_id": ObjectId(job_id)}, _STATUS_PROJECTION)
+        if job is None:
+            return None
+        job["_id"] = str(job["_id"])
+        return TTSJobInDB(**job)
+
+    async def cancel_job(self, job_id: str) -> Optional[TTSJobInDB]:
+        """Cancel a queued or running job and drop its audio. Finished jobs are left as they are."""
+        if not ObjectId.is_valid(job_id):
+            return None
+        now = datetime.now(timezone.utc)
+        result = await self.collection.update_one(
+            {"_id": ObjectId(job_id), "status": {"$in": [JobStatus.QUEUED.value, JobStatus.RUNNING.value]}},
+            {"$set": {
+                "status": JobStatus.CANCELLED.value,
+                "updated_at": now,
+                "finished_at": now,
+            }}
+        )
+        if result.modified_count:
+            await self.segments.delete_many({"job_id": ObjectId(job_id)})
+            await self._expire(ObjectId(job_id), now)
+        return await self.get_job(job_id)
+
+    async def iter_wav(self, job: TTSJobInDB) -> AsyncIterator[bytes]:
+        """Stream the finished job as a WAV file, one sentence at a time."""
+        job_id = ObjectId(job.id)
+        totals = await self.segments.aggregate([
+            {"$match": {"job_id": job_id}},
+            {"$group": {"_id": None, "size": {"$sum": "$size"}}},
+        ]).to_list(1)
+        yield wav_header(job.sample_rate, data_size=totals[0]["size"] if totals else 0)
+        cursor = self.segments.find({"job_id": job_id}, {"audio": 1}).sort("index", ASCENDING).batch_size(8)
+        async for segment in cursor:
+            yield segment["audio"]
+
+    async def claim_job(self, owner: str, lease_seconds: float) -> Optional[dict]:
+        """
+        Atomically take the highest-priority queued job, or a running job
+        whose owner stopped renewing its lease (e.g. after a restart).
+        """
+        now = datetime.now(timezone.utc)
+        return await self.collection.find_one_and_update(
+            {"$or": [
+                {"status": JobStatus.QUEUED.value},
+                {"status": JobStatus.RUNNING.value, "lease_until": {"$lt": now}},
+            ]},
+            {"$set": {
+                "status": JobStatus.RUNNING.value,
+                "owner": owner,
+                "lease_until": now + timedelta(seconds=lease_seconds),
+                "updated_at": now,
+            }},
+            sort=[("priority", DESCENDING), ("created_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def renew_lease(self, job: dict, owner: str, lease_seconds: float) -> bool:
+        """Extend the lease of a job `owner` is running. Returns False if it was cancelled or taken over."""
+        now = datetime.now(timezone.utc)
+        result = await self.collection.update_one(
+            {"_id": job["_id"], "owner": owner, "status": JobStatus.RUNNING.value},
+            {"$set": {"lease_until": now + timedelta(seconds=lease_seconds), "updated_at": now}}
+        )
+        return result.matched_count > 0
+
+    async def save_segment(self, job: dict, index: int, audio: bytes, sample_rate: int, owner: str, lease_seconds: float) -> bool:
+        """
+        Store one sentence's audio and advance the job's progress. Returns
+        False if the job was cancelled or taken over by another worker.
+
+        Ownership is checked before the segment is written, and the segment
+        is removed again if the job changed hands in between, so a cancelled
+        job keeps no audio and a new owner's segments are never mixed with ours.
+        """
+        if not await self.renew_lease(job, owner, lease_seconds):
+            return False
+        await self.segments.update_one(
+            {"job_id": job["_id"], "index": index},
+            {"$set": {"audio": audio, "size": len(audio), "owner": owner}},
+            upsert=True
+        )
+        now = datetime.now(timezone.utc)
+        update = {
+            "done_sentences": index + 1,
+            "sample_rate": sample_rate,
+            "lease_until": now + timedelta(seconds=lease_seconds),
+            "updated_at": now,
+        }
+        if job.get("started_at") is None:
+            update["started_at"] = job["started_at"] = now
+        result = await self.collection.update_one(
+            {"_id": job["_id"], "owner": owner, "status": JobStatus.RUNNING.value},
+            {"$set": update}
+        )
+        if result.matched_count == 0:
+            await self.segments.delete_one({"job_id": job["_id"], "index": index, "owner": owner})
+            return False
+        return True
+
+    async def finish_job(self, job: dict, owner: str, status: JobStatus, error: Optional[str] = None) -> None:
+        now = datetime.now(timezone.utc)
+        result = await self.collection.update_one(
+            {"_id": job["_id"], "owner": owner, "status": JobStatus.RUNNING.value},
+            {"$set": {"status": status.value, "error": error, "finished_at": now, "updated_at": now}}
+        )
+        if result.matched_count:
+            await self._expire(job["_id"], now)
+
+    async def release_jobs(self, owner: str) -> int:
+        """Put the running jobs of `owner` back in the queue so they resume right away elsewhere."""
+        result = await self.collection.update_many(
+            {"owner": owner, "status": JobStatus.RUNNING.value},
+            {"$set": {"status": JobStatus.QUEUED.value, "updated_at": datetime.now(timezone.utc)}}
+        )
+        return result.modified_count
+
+
+class JobWorker:
+    """
+    Runs background jobs in each worker process: `concurrency` loops claim
+    jobs from Mongo in priority order and synthesize them sentence by
+    sentence on the inference executor, saving each sentence as it finishes.
+    While a job runs its lease is renewed every third of `lease_seconds`,
+    including while it waits for queue space; if a process dies, the job is
+    picked up again once the lease expires and resumes where it stopped.
+    """
+
+    def __init__(self, enabled: bool, concurrency: int, poll_seconds: float, lease_seconds: float):
+        self.enabled = enabled
+        self.concurrency = concurrency
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self.owner: Optional[str] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        if not self.enabled or self.concurrency <= 0:
+            return
+        # Set here rather than at import, so each forked worker gets its own
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        try:
+            await JobService().ensure_indexes()
+        except Exception as e:
+            logger.warning(f"Could not create job indexes: {e}")
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.concurrency)]
+        logger.info(f"Job worker {self.owner} started with concurrency {self.concurrency}")
+
+    async def stop(self) -> None:
+        if not self._tasks:
+            return
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        try:
+            released = await JobService().release_jobs(self.owner)
+            if released:
+                logger.info(f"Returned {released} unfinished jobs to the queue")
+        except Exception as e:
+            logger.warning(f"Could not release running jobs, they resume after their lease expires: {e}")
+
+    async def _run(self) -> None:
+        service = JobService()
+        while True:
+            try:
+                job = await service.claim_job(self.owner, self.lease_seconds)
+            except Exception as e:
+                logger.warning(f"Could not claim a job: {e}")
+                job = None
+            if job is None:
+                await asyncio.sleep(self.poll_seconds)
+                continue
+            try:
+                await self._process(service, job)
+            except Exception:
+                logger.exception(f"Job {job['_id']} was interrupted, it resumes once its lease expires")
+
+    async def _synthesize(self, sentence: str, model_name: str):
+        synthesize = inference_pool.generate_audio if inference_pool else generate_audio
+        return await inference_executor.submit_when_available(synthesize, sentence, model_name)
+
+    async def _heartbeat(self, service: JobService, job: dict) -> None:
+        """Keep renewing the job's lease, so a long wait for inference doesn't let another worker claim it."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                if not await service.renew_lease(job, self.owner, self.lease_seconds):
+                    return
+            except Exception as e:
+                logger.warning(f"Could not renew the lease of job {job['_id']}: {e}")
+
+    async def _process(self, service: JobService, job: dict) -> None:
+        job_id = job["_id"]
+        sentences = job["sentences"]
+        start = job["done_sentences"]
+        if start:
+            logger.info(f"Resuming job {job_id} at sentence {start + 1}/{len(sentences)}")
+        else:
+            logger.info(f"Starting job {job_id} ({len(sentences)} sentences, priority {job['priority']})")
+        start_time = time.time()
+        heartbeat = asyncio.create_task(self._heartbeat(service, job))
+        try:
+            for index in range(start, len(sentences)):
+                audio, sample_rate = await self._synthesize(sentences[index], job["model_name"])
+                saved = await service.save_segment(
+                    job, index, to_pcm16(audio).tobytes(), sample_rate, self.owner, self.lease_seconds
+                )
+                if not saved:
+                    logger.info(f"Job {job_id} was cancelled or taken over, stopping")
+                    return
+            await service.finish_job(job, self.owner, JobStatus.COMPLETED)
+            logger.info(f"Job {job_id} completed in {time.time() - start_time:.4f} seconds")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception(f"Job {job_id} failed")
+            await service.finish_job(job, self.owner, JobStatus.FAILED, str(e))
+        finally:
+            heartbeat.cancel()
+
+
+job_worker = JobWorker(
+    enabled=settings.JOBS_ENABLED,
+    concurrency=settings.JOB_CONCURRENCY,
+    poll_seconds=settings.JOB_POLL_SECONDS,
+    lease_seconds=settings.JOB_LEASE_SECONDS,
+)
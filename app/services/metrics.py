@@ -0,0 +1,181 @@
+# app/services/metrics.py
+import glob
+import logging
+import os
+import time
+
+from ..config import settings
+
+# prometheus_client chooses between in-process and multiprocess (mmap file)
+# storage when it is imported, so a directory set in .env has to reach the
+# environment first
+if settings.PROMETHEUS_MULTIPROC_DIR:
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", settings.PROMETHEUS_MULTIPROC_DIR)
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from pymongo import monitoring
+
+from .request_trace import current_trace
+
+logger = logging.getLogger("swahili-voice-api")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+RTF_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 5)
+
+# HTTP
+REQUESTS = Counter("http_requests_total", "HTTP requests by route and status", ["method", "route", "status"])
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route, until the last body chunk is sent",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests being served", multiprocess_mode="livesum")
+
+# Inference executor
+INFERENCE_PENDING = Gauge(
+    "tts_inference_pending", "Inference jobs admitted, running or queued", multiprocess_mode="livesum"
+)
+INFERENCE_QUEUE_DEPTH = Gauge(
+    "tts_inference_queue_depth", "Inference jobs waiting for a free thread", multiprocess_mode="livesum"
+)
+INFERENCE_REJECTED = Counter("tts_inference_rejected_total", "Requests rejected with 503 because the inference queue was full")
+
+# Synthesis, from the request traces of TTS requests
+STAGE_SECONDS = Histogram(
+    "tts_stage_duration_seconds",
+    "Time spent in each stage of a TTS request (normalize, queue, inference, encode...) by voice",
+    ["voice", "stage"],
+    buckets=LATENCY_BUCKETS,
+)
+AUDIO_SECONDS = Counter("tts_audio_seconds_total", "Seconds of audio generated by voice", ["voice"])
+REAL_TIME_FACTOR = Histogram(
+    "tts_real_time_factor",
+    "Inference time divided by the duration of the audio produced, per synthesized request",
+    ["voice"],
+    buckets=RTF_BUCKETS,
+)
+
+# Caches
+CACHE_LOOKUPS = Counter("tts_cache_lookups_total", "Cache lookups by cache and result", ["cache", "result"])
+
+# MongoDB
+MONGO_LATENCY = Histogram(
+    "mongodb_command_duration_seconds",
+    "MongoDB command latency by command and outcome",
+    ["command", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+
+# Models
+MODEL_MEMORY = Gauge(
+    "tts_model_memory_bytes", "Size of a loaded voice model's weights", ["model"], multiprocess_mode="livemax"
+)
+
+
+def reset_multiprocess_dir() -> None:
+    """
+    Remove the metric files of a previous run. Call once in the parent
+    before workers start (see gunicorn.conf.py), never from a worker.
+    """
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if not directory:
+        return
+    for path in glob.glob(os.path.join(directory, "*.db")):
+        os.remove(path)
+
+
+def mark_process_dead(pid: int) -> None:
+    """Drop the live gauges of an exited worker process."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid)
+
+
+def render_metrics() -> bytes:
+    """
+    All metrics in the Prometheus text format. In multiprocess mode they
+    are aggregated from the files of every worker, so any worker can answer.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def observe_trace(trace) -> None:
+    """Record the stage timings and audio produced by a traced TTS request."""
+    voice = trace.attributes.get("voice")
+    if voice is None:
+        return
+    for stage, seconds in trace.stages.items():
+        STAGE_SECONDS.labels(voice=voice, stage=stage).observe(seconds)
+    audio_seconds = trace.attributes.get("audio_seconds")
+    if audio_seconds:
+        AUDIO_SECONDS.labels(voice=voice).inc(audio_seconds)
+        inference_seconds = trace.stages.get("inference")
+        if inference_seconds:
+            REAL_TIME_FACTOR.labels(voice=voice).observe(inference_seconds / audio_seconds)
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """pymongo command listener recording the latency of every MongoDB command."""
+
+    def started(self, event) -> None:
+        pass
+
+    def succeeded(self, event) -> None:
+        MONGO_LATENCY.labels(command=event.command_name, outcome="succeeded").observe(event.duration_micros / 1e6)
+
+    def failed(self, event) -> None:
+        MONGO_LATENCY.labels(command=event.command_name, outcome="failed").observe(event.duration_micros / 1e6)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware counting requests and in-flight requests and timing
+    them per route template (e.g. `/tts/{voice}`), so paths with ids
+    don't each become a series. Added inside `RequestTraceMiddleware`, it
+    also feeds the finished request's trace into the TTS metrics.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.time()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            IN_FLIGHT.dec()
+            route = scope.get("route")
+            route = getattr(route, "path", "unmatched")
+            method = scope.get("method", "")
+            REQUESTS.labels(method=method, route=route, status=str(status)).inc()
+            REQUEST_LATENCY.labels(method=method, route=route).observe(time.time() - start_time)
+            trace = current_trace()
+            if trace is not None:
+                observe_trace(trace)
@@ -0,0 +1,306 @@
+# app/services/model_registry.py
+import gc
+import logging
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import torch
+from transformers import AutoTokenizer, VitsModel
+
+from ..config import settings
+from .quantization import load_quantized_model
+from .compiled_backend import load_compiled_model
+from .shared_weights import load_shared_model, process_memory
+from .metrics import MODEL_MEMORY
+
+logger = logging.getLogger("swahili-voice-api")
+
+WARMUP_TEXT = "Habari za asubuhi, karibu sana."
+
+
+def model_key(model_name: str, quantized: bool = False, backend: Optional[str] = None) -> str:
+    """
+    Registry key for a variant of a model, e.g. "org/model@int8+torchscript".
+    The key is what callers pass around as the model name, so caches and
+    batch schedulers keep variants apart.
+    """
+    backend = backend or settings.INFERENCE_BACKEND
+    variants = []
+    if quantized:
+        variants.append("int8")
+    if backend != "eager":
+        variants.append(backend)
+    return f"{model_name}@{'+'.join(variants)}" if variants else model_name
+
+
+def resolve_model_key(name: str) -> str:
+    """
+    Registry key for a model named in a setting or an admin call: a bare
+    repository name is the INFERENCE_BACKEND variant that requests resolve
+    to, an explicit key such as "org/model@int8" is kept as it is.
+    """
+    return name if "@" in name else model_key(name)
+
+
+def parse_model_list(value: str) -> List[str]:
+    """Parse a comma-separated list of models from a setting into registry keys."""
+    return [resolve_model_key(name.strip()) for name in value.split(",") if name.strip()]
+
+
+def parse_model_key(key: str) -> Tuple[str, Set[str]]:
+    """Split a registry key into the model repository and its set of variants."""
+    model_name, _, variants = key.partition("@")
+    return model_name, {variant for variant in variants.split("+") if variant}
+
+
+def model_size_bytes(model: torch.nn.Module) -> int:
+    """Bytes held by a model's weights, including packed int8 weights of quantized layers."""
+    def tensor_bytes(value) -> int:
+        if isinstance(value, torch.Tensor):
+            return value.numel() * value.element_size()
+        if isinstance(value, (tuple, list)):
+            return sum(tensor_bytes(item) for item in value)
+        return 0
+
+    return sum(tensor_bytes(value) for value in model.state_dict().values())
+
+
+class ModelEntry:
+    """A loaded voice model together with its bookkeeping."""
+
+    def __init__(self, name: str, model, tokenizer, device: str, load_time: float, backend: str = "eager", shared: bool = False):
+        self.name = name
+        self.backend = backend
+        self.shared = shared
+        self.model = model
+        self.tokenizer = tokenizer
+        self.device = device
+        self.load_time = load_time
+        self.loaded_at = time.time()
+        self.last_used = self.loaded_at
+        self.uses = 0
+        self.resident_bytes = model_size_bytes(model)
+        self.warmup_time: Optional[float] = None
+        # Growth of this process's RSS/PSS across the load, where measurable
+        self.rss_growth_bytes: Optional[int] = None
+        self.pss_growth_bytes: Optional[int] = None
+
+    def stats(self, pinned: bool) -> dict:
+        return {
+            "model_name": self.name,
+            "backend": self.backend,
+            "shared_weights": self.shared,
+            "pinned": pinned,
+            "load_time_seconds": self.load_time,
+            "warmup_time_seconds": self.warmup_time,
+            "resident_bytes": self.resident_bytes,
+            "rss_growth_bytes": self.rss_growth_bytes,
+            "pss_growth_bytes": self.pss_growth_bytes,
+            "loaded_at": self.loaded_at,
+            "last_used": self.last_used,
+            "uses": self.uses,
+        }
+
+
+class ModelRegistry:
+    """
+    Keeps voice models resident, loading them on first use.
+
+    Pinned models are never evicted. When the combined size of the loaded
+    models exceeds `memory_budget_bytes` (0 means unlimited), the least
+    recently used unpinned models are dropped until it fits again.
+    """
+
+    def __init__(self, memory_budget_bytes: int, pinned: Iterable[str] = ()):
+        self.memory_budget_bytes = memory_budget_bytes
+        self.pinned = set(pinned)
+        self._entries: Dict[str, ModelEntry] = {}
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+
+    def _load_eager(self, model_name: str, variants: Set[str]):
+        if "int8" in variants:
+            return load_quantized_model(model_name)
+        if settings.SHARED_WEIGHTS:
+            return load_shared_model(model_name)
+        return VitsModel.from_pretrained(
+            model_name,
+            token=settings.HF_TOKEN,
+            cache_dir=settings.MODEL_CACHE_DIR
+        )
+
+    def _load(self, key: str) -> ModelEntry:
+        logger.info(f"Loading model: {key}")
+        start_time = time.time()
+        memory_before = process_memory()
+        model_name, variants = parse_model_key(key)
+
+        device = "cpu"
+        tokenizer = AutoTokenizer.from_pretrained(
+            model_name,
+            token=settings.HF_TOKEN,
+            cache_dir=settings.MODEL_CACHE_DIR
+        )
+
+        # Loaded at most once, whether for export or as the fallback
+        eager_models = []
+        def load_eager():
+            if not eager_models:
+                eager_models.append(self._load_eager(model_name, variants).to(device).eval())
+            return eager_models[0]
+
+        model = None
+        backend = "eager"
+        if "torchscript" in variants:
+            model = load_compiled_model(model_name, variants, load_eager, tokenizer)
+            if model is not None:
+                backend = "torchscript"
+            else:
+                logger.warning(f"Falling back to eager inference for {key}")
+        if model is None:
+            model = load_eager()
+
+        load_time = time.time() - start_time
+        # Only fp32 eager weights are mapped; int8 packed weights and
+        # TorchScript graphs are always private to the process
+        shared = settings.SHARED_WEIGHTS and backend == "eager" and "int8" not in variants
+        entry = ModelEntry(key, model, tokenizer, device, load_time, backend=backend, shared=shared)
+        memory_after = process_memory()
+        if memory_before and memory_after:
+            entry.rss_growth_bytes = memory_after["rss_bytes"] - memory_before["rss_bytes"]
+            entry.pss_growth_bytes = memory_after["pss_bytes"] - memory_before["pss_bytes"]
+        logger.info(
+            f"Model {key} loaded in {load_time:.4f} seconds "
+            f"({entry.resident_bytes / 1024 / 1024:.1f} MB weights, {backend} backend"
+            + (", shared" if shared else "")
+            + (f", RSS +{entry.rss_growth_bytes / 1024 / 1024:.1f} MB" if entry.rss_growth_bytes is not None else "")
+            + ")"
+        )
+        return entry
+
+    def get(self, model_name: str) -> ModelEntry:
+        """Return the loaded model, loading it (once, even under concurrency) if needed."""
+        with self._lock:
+            entry = self._entries.get(model_name)
+            if entry is None:
+                load_lock = self._load_locks.setdefault(model_name, threading.Lock())
+
+        if entry is None:
+            with load_lock:
+                with self._lock:
+                    entry = self._entries.get(model_name)
+                if entry is None:
+                    entry = self._load(model_name)
+                    with self._lock:
+                        self._entries[model_name] = entry
+                    MODEL_MEMORY.labels(model=model_name).set(entry.resident_bytes)
+                    self._enforce_budget(keep=model_name)
+
+        entry.last_used = time.time()
+        entry.uses += 1
+        return entry
+
+    def warm_up(self, model_name: str) -> None:
+        """Run one synthesis so first-request costs (allocations, lazy init) are paid up front."""
+        entry = self.get(model_name)
+        start_time = time.time()
+        inputs = entry.tokenizer(WARMUP_TEXT, return_tensors="pt").to(entry.device)
+        with torch.no_grad():
+            entry.model(**inputs)
+        entry.warmup_time = time.time() - start_time
+        logger.info(f"Model {model_name} warmed up in {entry.warmup_time:.4f} seconds")
+
+    def preload(self, model_names: Iterable[str], warm_up: bool = True) -> None:
+        """
+        Load (and optionally warm up) models ahead of the first request.
+
+        Called at import time so that with gunicorn --preload the weights are
+        loaded once in the master and shared copy-on-write with the workers.
+        Warm-up runs single-threaded: starting torch's OpenMP pool in the
+        master before fork can hang the workers.
+        """
+        model_names = list(model_names)
+        if not model_names:
+            return
+        num_threads = torch.get_num_threads()
+        torch.set_num_threads(1)
+        try:
+            for model_name in model_names:
+                try:
+                    self.get(model_name)
+                    if warm_up:
+                        self.warm_up(model_name)
+                except Exception:
+                    logger.exception(f"Failed to preload model {model_name}")
+        finally:
+            torch.set_num_threads(num_threads)
+
+    def pin(self, model_name: str) -> None:
+        with self._lock:
+            self.pinned.add(model_name)
+
+    def unpin(self, model_name: str) -> None:
+        with self._lock:
+            self.pinned.discard(model_name)
+        self._enforce_budget()
+
+    def evict(self, model_name: str) -> bool:
+        with self._lock:
+            entry = self._entries.pop(model_name, None)
+        if entry is None:
+            return False
+        logger.info(f"Evicted model {model_name} ({entry.resident_bytes / 1024 / 1024:.1f} MB)")
+        MODEL_MEMORY.labels(model=model_name).set(0)
+        del entry
+        gc.collect()
+        return True
+
+    def _enforce_budget(self, keep: Optional[str] = None) -> None:
+        if self.memory_budget_bytes <= 0:
+            return
+        while True:
+            with self._lock:
+                total = sum(entry.resident_bytes for entry in self._entries.values())
+                if total <= self.memory_budget_bytes:
+                    return
+                candidates = [
+                    entry for name, entry in self._entries.items()
+                    if name not in self.pinned and name != keep
+                ]
+                if not candidates:
+                    logger.warning(
+                        f"Loaded models use {total / 1024 / 1024:.1f} MB, over the "
+                        f"{self.memory_budget_bytes / 1024 / 1024:.1f} MB budget, but none can be evicted"
+                    )
+                    return
+                victim = min(candidates, key=lambda entry: entry.last_used).name
+            self.evict(victim)
+
+    def publish_metrics(self) -> None:
+        """
+        Set the model memory gauge for every loaded model. Metric values
+        start empty in a forked worker, so workers that inherit preloaded
+        models call this once after fork.
+        """
+        with self._lock:
+            entries = list(self._entries.values())
+        for entry in entries:
+            MODEL_MEMORY.labels(model=entry.name).set(entry.resident_bytes)
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = list(self._entries.values())
+            pinned = set(self.pinned)
+        return {
+            "memory_budget_bytes": self.memory_budget_bytes,
+            "resident_bytes": sum(entry.resident_bytes for entry in entries),
+            "process_memory": process_memory(),
+            "models": [entry.stats(entry.name in pinned) for entry in entries],
+        }
+
+
+model_registry = ModelRegistry(
+    memory_budget_bytes=settings.MODEL_MEMORY_BUDGET_MB * 1024 * 1024,
+    pinned=parse_model_list(settings.PINNED_MODELS),
+)
@@ -0,0 +1,109 @@
+# app/services/quantization.py
+import logging
+import os
+import re
+import tempfile
+import time
+
+import torch
+from transformers import VitsConfig, VitsModel
+
+from ..config import settings
+
+logger = logging.getLogger("swahili-voice-api")
+
+
+class PointwiseConv1d(torch.nn.Module):
+    """
+    A kernel-size-1 Conv1d expressed as a Linear over the channel axis.
+
+    PyTorch's dynamic quantization only has kernels for Linear (and RNN)
+    layers, so rewriting pointwise convolutions this way lets them run in
+    int8 too. Wider convolutions stay in fp32.
+    """
+
+    def __init__(self, conv: torch.nn.Conv1d):
+        super().__init__()
+        self.linear = torch.nn.Linear(conv.in_channels, conv.out_channels, bias=conv.bias is not None)
+        with torch.no_grad():
+            self.linear.weight.copy_(conv.weight.squeeze(-1))
+            if conv.bias is not None:
+                self.linear.bias.copy_(conv.bias)
+
+    def forward(self, hidden_states: torch.Tensor) -> torch.Tensor:
+        return self.linear(hidden_states.transpose(1, 2)).transpose(1, 2)
+
+
+def _is_pointwise(module: torch.nn.Module) -> bool:
+    return (
+        type(module) is torch.nn.Conv1d
+        and module.kernel_size == (1,)
+        and module.stride == (1,)
+        and module.padding == (0,)
+        and module.dilation == (1,)
+        and module.groups == 1
+    )
+
+
+def replace_pointwise_convs(model: torch.nn.Module) -> int:
+    """Swap every plain pointwise Conv1d in `model` for a PointwiseConv1d; returns how many were replaced."""
+    replaced = 0
+    for parent in list(model.modules()):
+        for name, child in list(parent.named_children()):
+            if _is_pointwise(child):
+                setattr(parent, name, PointwiseConv1d(child))
+                replaced += 1
+    return replaced
+
+
+def quantize_model(model: VitsModel) -> VitsModel:
+    """Apply dynamic int8 quantization to the Linear and pointwise conv layers of a VITS model."""
+    model.eval()
+    replaced = replace_pointwise_convs(model)
+    quantized = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    logger.debug(f"Quantized model to int8 ({replaced} pointwise convs rewritten as linear)")
+    return quantized
+
+
+def quantized_weights_path(model_name: str) -> str:
+    safe_name = re.sub(r"[^A-Za-z0-9_.-]+", "--", model_name)
+    return os.path.join(settings.MODEL_CACHE_DIR, "quantized", f"{safe_name}-int8.pt")
+
+
+def load_quantized_model(model_name: str) -> VitsModel:
+    """
+    Load the int8 variant of a model. The quantized weights are cached next
+    to the HF cache on first use; later loads build the quantized module
+    structure from the config and read those weights instead of the fp32
+    checkpoint.
+    """
+    path = quantized_weights_path(model_name)
+    start_time = time.time()
+
+    if os.path.exists(path):
+        config = VitsConfig.from_pretrained(
+            model_name,
+            token=settings.HF_TOKEN,
+            cache_dir=settings.MODEL_CACHE_DIR
+        )
+        model = quantize_model(VitsModel(config))
+        model.load_state_dict(torch.load(path, map_location="cpu"))
+        logger.info(f"Loaded cached int8 weights for {model_name} in {time.time() - start_time:.4f} seconds")
+        return model
+
+    model = VitsModel.from_pretrained(
+        model_name,
+        token=settings.HF_TOKEN,
+        cache_dir=settings.MODEL_CACHE_DIR
+    )
+    model = quantize_model(model)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            torch.save(model.state_dict(), f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"Could not cache int8 weights for {model_name} at {path}: {e}")
+    logger.info(f"Quantized {model_name} to int8 in {time.time() - start_time:.4f} seconds")
+    return model
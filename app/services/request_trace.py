@@ -0,0 +1,165 @@
+# app/services/request_trace.py
+import contextvars
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+logger = logging.getLogger("swahili-voice-api")
+
+# JSON trace records go to their own logger so they can be written to a
+# separate file, one object per line, and aggregated without parsing api.log
+trace_logger = logging.getLogger("swahili-voice-api.trace")
+
+_current: contextvars.ContextVar[Optional["RequestTrace"]] = contextvars.ContextVar("request_trace", default=None)
+
+
+class RequestTrace:
+    """
+    Per-request latency breakdown.
+
+    Stages (normalization, model load, splitting, tokenization, inference,
+    encoding...) add their durations under a name; a stage recorded several
+    times, e.g. once per streamed sentence, accumulates. Attributes describe
+    the request (voice, model, format, cache status) so traces can be
+    grouped. Stages may be recorded from executor threads, which see the
+    trace through the copied context, so recording is locked.
+    """
+
+    __slots__ = ("method", "path", "start", "stages", "counts", "attributes", "_lock")
+
+    def __init__(self, method: str = "", path: str = ""):
+        self.method = method
+        self.path = path
+        self.start = time.time()
+        self.stages: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self.attributes: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+            self.counts[stage] = self.counts.get(stage, 0) + 1
+
+    def merge(self, stages: Dict[str, float]) -> None:
+        """Add stages measured elsewhere, e.g. in an inference pool process."""
+        for stage, seconds in stages.items():
+            self.record(stage, seconds)
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def server_timing(self, total: Optional[float] = None) -> str:
+        """The stages as a Server-Timing header value, durations in milliseconds."""
+        with self._lock:
+            stages = list(self.stages.items())
+        if total is not None:
+            stages.append(("total", total))
+        return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in stages)
+
+    def to_dict(self, status: Optional[int] = None) -> dict:
+        with self._lock:
+            stages = {stage: round(seconds * 1000, 3) for stage, seconds in self.stages.items()}
+            counts = {stage: count for stage, count in self.counts.items() if count > 1}
+        return {
+            "method": self.method,
+            "path": self.path,
+            "status": status,
+            **self.attributes,
+            "total_ms": round((time.time() - self.start) * 1000, 3),
+            "stages_ms": stages,
+            "stage_counts": counts,
+        }
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return _current.get()
+
+
+def start_trace(method: str = "", path: str = "") -> RequestTrace:
+    """Start a trace for the current context; code running in it, or in contexts copied from it, records into it."""
+    trace = RequestTrace(method, path)
+    _current.set(trace)
+    return trace
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    """Record a stage duration on the current request's trace; a no-op outside a traced request."""
+    trace = _current.get()
+    if trace is not None:
+        trace.record(stage, seconds)
+
+
+def set_trace_attributes(**attributes) -> None:
+    trace = _current.get()
+    if trace is not None:
+        trace.set(**attributes)
+
+
+@contextmanager
+def traced(stage: str) -> Iterator[None]:
+    """Time the enclosed block as `stage` of the current request's trace."""
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start_time)
+
+
+def log_trace(trace: RequestTrace, status: Optional[int] = None) -> None:
+    trace_logger.info(json.dumps(trace.to_dict(status), default=str))
+
+
+def configure_trace_log(path: str) -> None:
+    """Write JSON trace records, one per line, to `path` instead of the main log."""
+    if not path:
+        return
+    handler = logging.FileHandler(path)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    trace_logger.addHandler(handler)
+    trace_logger.setLevel(logging.INFO)
+    trace_logger.propagate = False
+
+
+class RequestTraceMiddleware:
+    """
+    ASGI middleware that traces every HTTP request. The stages finished by
+    the time the response starts are sent in a `Server-Timing` header (for
+    streamed audio that is everything before the first chunk); the full
+    trace is logged as JSON once the last body chunk has been sent.
+    """
+
+    def __init__(self, app, server_timing: bool = True):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = start_trace(scope.get("method", ""), scope.get("path", ""))
+        status = None
+        logged = False
+
+        async def send_with_trace(message):
+            nonlocal status, logged
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    header = trace.server_timing(time.time() - trace.start)
+                    message["headers"] = [*message.get("headers", []), (b"server-timing", header.encode("latin-1"))]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False) and not logged:
+                logged = True
+                log_trace(trace, status)
+
+        try:
+            await self.app(scope, receive, send_with_trace)
+        finally:
+            if not logged:
+                # The client went away or the app failed before the body finished
+                log_trace(trace, status)
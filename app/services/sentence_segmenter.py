@@ -0,0 +1,103 @@
+# app/services/sentence_segmenter.py
+import logging
+import math
+import re
+from typing import List
+
+from ..config import settings
+from .text_normalizer import ABBREVIATIONS, SENTENCE_FINAL_ABBREVIATIONS
+
+logger = logging.getLogger("swahili-voice-api")
+
+# A sentence end: terminal punctuation (or an ellipsis), any closing quotes
+# or brackets, then whitespace; line breaks always end a sentence
+SENTENCE_END = re.compile(r"(?P<end>\.{3}|…|[.!?]+)(?P<close>[\"'”’»)\]]*)\s+|\s*\n\s*")
+ELLIPSES = ("...", "…")
+
+# Abbreviations that never end a sentence, and ones that only do when no number follows
+TITLE_ABBREVIATIONS = {key for key in ABBREVIATIONS if key not in SENTENCE_FINAL_ABBREVIATIONS}
+NUMBER_ABBREVIATIONS = {"Na.", "No."}
+
+# Where an over-long sentence is cut, most natural first; each level is only
+# used for the parts the previous ones left too long
+CLAUSE_BOUNDARIES = [
+    re.compile(r"(?<=[:;])\s+|\s+(?=[–—]\s)"),
+    re.compile(r"(?<=,)\s+"),
+    re.compile(r"\s+(?=(?:lakini|ila|kisha|halafu|ambapo|ingawa|kwa sababu|hivyo|ili)\b)", re.IGNORECASE),
+    re.compile(r"\s+"),
+]
+
+
+class SentenceSegmenter:
+    """
+    Split text into sentences for synthesis, then cut any sentence longer
+    than `max_chars` at clause boundaries (colons and semicolons, commas,
+    conjunctions, then spaces) into chunks of similar length.
+
+    A sentence ends at `.`, `!`, `?`, an ellipsis or a line break, unless
+    the period belongs to a title abbreviation (`Bw.`, `Dkt.`...) or an
+    initial, or an ellipsis or quoted sentence continues in lowercase. The
+    MMS VITS tokenizers are character-level, so `max_chars` bounds the input
+    tokens, and with them the attention cost, of every forward pass.
+    """
+
+    def __init__(self, max_chars: int = 250):
+        self.max_chars = max_chars
+
+    def split(self, text: str) -> List[str]:
+        sentences = []
+        start = 0
+        for match in SENTENCE_END.finditer(text):
+            if self._is_boundary(text, match):
+                sentences.append(text[start:match.start() + len(match.group(0).rstrip())].strip())
+                start = match.end()
+        sentences.append(text[start:].strip())
+        return [chunk for sentence in sentences if sentence for chunk in self.chunk(sentence)]
+
+    @staticmethod
+    def _is_boundary(text: str, match: re.Match) -> bool:
+        end = match.group("end")
+        if end is None or match.end() == len(text):
+            return True
+        next_char = text[match.end()]
+        if end in ELLIPSES:
+            return not next_char.islower()
+        if end == ".":
+            words = text[:match.start()].rsplit(None, 1)
+            word = (words[-1] if words else "").lstrip("\"'“‘«([") + "."
+            if word in TITLE_ABBREVIATIONS:
+                return False
+            if word in NUMBER_ABBREVIATIONS:
+                return not next_char.isdigit()
+            if word in SENTENCE_FINAL_ABBREVIATIONS:
+                return next_char.isupper()
+            if len(word) == 2 and word[0].isupper():
+                # An initial, e.g. "J. K. Nyerere"
+                return False
+        # A quoted sentence followed by lowercase continues: "Njoo!" alisema.
+        return not (match.group("close") and next_char.islower())
+
+    def chunk(self, sentence: str, level: int = 0) -> List[str]:
+        """Cut `sentence` into chunks of at most `max_chars`, at the most natural boundaries that suffice."""
+        if len(sentence) <= self.max_chars:
+            return [sentence]
+        if level == len(CLAUSE_BOUNDARIES):
+            # A single word longer than the limit
+            return [sentence[i:i + self.max_chars] for i in range(0, len(sentence), self.max_chars)]
+
+        # Aim for equal chunks rather than full ones followed by a short tail
+        target = len(sentence) / math.ceil(len(sentence) / self.max_chars)
+        chunks = []
+        current = ""
+        for piece in CLAUSE_BOUNDARIES[level].split(sentence):
+            if current and len(current) < target and len(current) + 1 + len(piece) <= self.max_chars:
+                current += " " + piece
+                continue
+            if current:
+                chunks.append(current)
+            current = piece
+        chunks.append(current)
+        return [part for chunk in chunks for part in self.chunk(chunk, level + 1)]
+
+
+sentence_segmenter = SentenceSegmenter(max_chars=settings.SENTENCE_MAX_CHARS)
@@ -0,0 +1,93 @@
+# app/services/shared_weights.py
+import logging
+import os
+import re
+import tempfile
+import time
+from typing import Dict
+
+import torch
+from transformers import VitsConfig, VitsModel
+
+from ..config import settings
+
+logger = logging.getLogger("swahili-voice-api")
+
+# Fields of /proc/<pid>/smaps_rollup reported by process_memory()
+_MEMORY_FIELDS = {
+    "Rss": "rss_bytes",
+    "Pss": "pss_bytes",
+    "Shared_Clean": "shared_clean_bytes",
+    "Private_Clean": "private_clean_bytes",
+    "Private_Dirty": "private_dirty_bytes",
+}
+
+
+def shared_weights_path(model_name: str) -> str:
+    safe_name = re.sub(r"[^A-Za-z0-9_.-]+", "--", model_name)
+    return os.path.join(settings.MODEL_CACHE_DIR, "shared", f"{safe_name}.pt")
+
+
+def _export_weights(model_name: str, path: str) -> None:
+    start_time = time.time()
+    model = VitsModel.from_pretrained(
+        model_name,
+        token=settings.HF_TOKEN,
+        cache_dir=settings.MODEL_CACHE_DIR
+    )
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        torch.save(model.state_dict(), f)
+    os.replace(tmp_path, path)
+    logger.info(f"Wrote shared weights for {model_name} to {path} in {time.time() - start_time:.4f} seconds")
+
+
+def load_shared_model(model_name: str) -> VitsModel:
+    """
+    Load a model whose weights are memory-mapped read-only from a file under
+    MODEL_CACHE_DIR/shared/, written from the HF checkpoint on first use.
+
+    Every process that loads the same model maps the same page-cache pages,
+    so each worker only pays for its own activations and bookkeeping rather
+    than a private copy of the weights. The module is built on the meta
+    device and the mapped tensors are assigned in place, so no throwaway
+    initialization is allocated either.
+    """
+    path = shared_weights_path(model_name)
+    if not os.path.exists(path):
+        _export_weights(model_name, path)
+
+    start_time = time.time()
+    config = VitsConfig.from_pretrained(
+        model_name,
+        token=settings.HF_TOKEN,
+        cache_dir=settings.MODEL_CACHE_DIR
+    )
+    with torch.device("meta"):
+        model = VitsModel(config)
+    state_dict = torch.load(path, map_location="cpu", mmap=True, weights_only=True)
+    model.load_state_dict(state_dict, assign=True)
+    logger.info(f"Mapped shared weights for {model_name} in {time.time() - start_time:.4f} seconds")
+    return model
+
+
+def process_memory() -> Dict[str, int]:
+    """
+    Memory of the current process from /proc/self/smaps_rollup, in bytes.
+
+    RSS counts shared pages in full in every process; PSS divides them
+    between the processes mapping them, so summing PSS across workers gives
+    the real footprint. Returns an empty dict where smaps_rollup is missing.
+    """
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            lines = f.readlines()
+    except OSError:
+        return {}
+    memory = {}
+    for line in lines:
+        field, _, value = line.partition(":")
+        if field in _MEMORY_FIELDS:
+            memory[_MEMORY_FIELDS[field]] = int(value.split()[0]) * 1024
+    return memory
@@ -0,0 +1,426 @@
+# app/services/text_normalizer.py
+import calendar
+import logging
+import re
+import threading
+import time
+from functools import lru_cache
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from tarakimu import num_to_words
+
+from ..config import settings
+
+logger = logging.getLogger("swahili-voice-api")
+
+DIGIT = re.compile(r"[0-9]")
+WHITESPACE_RUN = re.compile(r"[ \t]{2,}")
+
+# A number as written in running text: 1250, 1,250, 3.5 or 1,250.75
+NUMBER = r"\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?"
+
+DIGITS = ["sifuri", "moja", "mbili", "tatu", "nne", "tano", "sita", "saba", "nane", "tisa"]
+
+MONTHS = [
+    "Januari", "Februari", "Machi", "Aprili", "Mei", "Juni",
+    "Julai", "Agosti", "Septemba", "Oktoba", "Novemba", "Desemba",
+]
+
+ABBREVIATIONS = {
+    "Bw.": "Bwana",
+    "Bi.": "Bibi",
+    "Dkt.": "Daktari",
+    "Dk.": "Daktari",
+    "Prof.": "Profesa",
+    "Mhe.": "Mheshimiwa",
+    "Mh.": "Mheshimiwa",
+    "Mt.": "Mtakatifu",
+    "S.L.P.": "Sanduku la Posta",
+    "n.k.": "na kadhalika",
+    "k.m.": "kwa mfano",
+    "K.K.": "Kabla ya Kristo",
+    "B.K.": "Baada ya Kristo",
+}
+# Abbreviations that can end a sentence; their period is kept when it does
+SENTENCE_FINAL_ABBREVIATIONS = {"n.k.", "K.K.", "B.K."}
+
+# Currency symbols and codes: (name read before the amount, qualifier read after it)
+CURRENCIES = {
+    "tsh": ("shilingi", ""),
+    "tzs": ("shilingi", ""),
+    "ksh": ("shilingi", "za Kenya"),
+    "kes": ("shilingi", "za Kenya"),
+    "$": ("dola", ""),
+    "us$": ("dola", "za Kimarekani"),
+    "usd": ("dola", "za Kimarekani"),
+    "€": ("yuro", ""),
+    "eur": ("yuro", ""),
+    "£": ("pauni", ""),
+    "gbp": ("pauni", ""),
+}
+CURRENCY_WORDS = ("shilingi", "dola", "yuro", "pauni")
+
+# Units are read before the amount in Swahili: "5 km" -> "kilomita tano"
+UNITS = {
+    "km/h": ("kilomita", "kwa saa"),
+    "km": ("kilomita", ""),
+    "kg": ("kilo", ""),
+    "cm": ("sentimita", ""),
+    "mm": ("milimita", ""),
+    "m": ("mita", ""),
+    "g": ("gramu", ""),
+    "ml": ("mililita", ""),
+    "l": ("lita", ""),
+    "°C": ("nyuzi joto", ""),
+    "°F": ("nyuzi", "za Farenhaiti"),
+    "°": ("nyuzi", ""),
+}
+
+DAY_PERIODS = ("usiku", "alfajiri", "asubuhi", "mchana", "jioni")
+
+SYMBOLS = {"&": "na", "=": "ni sawa na", "@": "et", "×": "mara"}
+
+ORDINAL_WORDS = {1: "kwanza", 2: "pili"}
+
+
+@lru_cache(maxsize=4096)
+def number_words(number: str) -> str:
+    """Swahili words for a number written with digits, e.g. "1,250" or "3.5"; memoized."""
+    digits = number.replace(",", "")
+    try:
+        if "." in digits:
+            return num_to_words(float(digits))
+        return num_to_words(int(digits))
+    except (ValueError, KeyError, IndexError):
+        return number
+
+
+def digit_words(digits: str) -> str:
+    return " ".join(DIGITS[int(digit)] for digit in digits)
+
+
+def ordinal_words(number: int) -> str:
+    return ORDINAL_WORDS.get(number) or number_words(str(number))
+
+
+def _preceded_by(match: re.Match, word: str) -> bool:
+    return match.string[:match.start()].rstrip().lower().endswith(word)
+
+
+class NormalizationRule:
+    """
+    One normalization stage: every match of the precompiled `pattern` is
+    replaced with `replace(match)`. Rules with `digits=True` only match text
+    containing digits and are skipped for text without any. Keeps its own
+    call, match and time totals.
+    """
+
+    __slots__ = ("name", "pattern", "replace", "digits", "calls", "matches", "seconds")
+
+    def __init__(
+        self, name: str, pattern: str, replace: Callable[[re.Match], str], flags: int = 0, digits: bool = False
+    ):
+        self.name = name
+        self.pattern = re.compile(pattern, flags)
+        self.replace = replace
+        self.digits = digits
+        self.calls = 0
+        self.matches = 0
+        self.seconds = 0.0
+
+    def apply(self, text: str) -> "tuple[str, int, float]":
+        start_time = time.perf_counter()
+        text, count = self.pattern.subn(self.replace, text)
+        return text, count, time.perf_counter() - start_time
+
+
+def _abbreviation(match: re.Match) -> str:
+    abbreviation = match.group(0)
+    expansion = ABBREVIATIONS[abbreviation]
+    if abbreviation in SENTENCE_FINAL_ABBREVIATIONS and re.match(r"\s*(?:$|[A-Z])", match.string[match.end():]):
+        return expansion + "."
+    return expansion
+
+
+def _amount(number: str) -> str:
+    """An amount of money: the fractional part is read as cents ("senti")."""
+    whole, _, fraction = number.partition(".")
+    words = number_words(whole)
+    cents = int(fraction[:2].ljust(2, "0")) if fraction else 0
+    return f"{words} na senti {number_words(str(cents))}" if cents else words
+
+
+def _currency(match: re.Match) -> str:
+    symbol = (match.group("prefix") or match.group("suffix") or "tsh").lower()
+    name, qualifier = CURRENCIES[symbol]
+    amount = _amount(match.group("amount") or match.group("suffix_amount"))
+    return " ".join(part for part in (name, amount, qualifier) if part)
+
+
+def _currency_word(match: re.Match) -> str:
+    return f"{match.group(1)} {_amount(match.group(2))}"
+
+
+def _percent(match: re.Match) -> str:
+    return f"asilimia {number_words(match.group(1))}"
+
+
+def _date(day: int, month: int, year: Optional[str], match: re.Match) -> str:
+    if not 1 <= month <= 12:
+        return match.group(0)
+    # February has 29 days when the year is unknown
+    if not 1 <= day <= calendar.monthrange(int(year) if year else 2000, month)[1]:
+        return match.group(0)
+    words = f"{number_words(str(day))} {MONTHS[month - 1]}"
+    if year:
+        words += f" mwaka {number_words(year)}"
+    return words if _preceded_by(match, "tarehe") else f"tarehe {words}"
+
+
+def _numeric_date(match: re.Match) -> str:
+    if match.group("iso_year"):
+        return _date(int(match.group("iso_day")), int(match.group("iso_month")), match.group("iso_year"), match)
+    return _date(int(match.group("day")), int(match.group("month")), match.group("year"), match)
+
+
+def _written_date(match: re.Match) -> str:
+    month = [name.lower() for name in MONTHS].index(match.group(2).lower()) + 1
+    return _date(int(match.group(1)), month, match.group(3), match)
+
+
+def _day_period(hour: int) -> str:
+    if hour < 4:
+        return "usiku"
+    if hour < 6:
+        return "alfajiri"
+    if hour < 12:
+        return "asubuhi"
+    if hour < 16:
+        return "mchana"
+    if hour < 19:
+        return "jioni"
+    return "usiku"
+
+
+def swahili_time(hour: int, minute: int) -> str:
+    """
+    Read a 24-hour clock time the Swahili way, where hours count from 6
+    o'clock: 07:00 is "saa moja asubuhi", 14:30 "saa nane na nusu mchana".
+    """
+    if minute == 45:
+        # Quarter to the next hour
+        hour, minute_words = (hour + 1) % 24, " kasorobo"
+    elif minute == 30:
+        minute_words = " na nusu"
+    elif minute == 15:
+        minute_words = " na robo"
+    elif minute:
+        minute_words = f" na dakika {number_words(str(minute))}"
+    else:
+        minute_words = ""
+    swahili_hour = (hour + 6) % 12 or 12
+    return f"saa {number_words(str(swahili_hour))}{minute_words} {_day_period(hour)}"
+
+
+def _time(match: re.Match) -> str:
+    hour, minute = int(match.group(1)), int(match.group(2))
+    meridiem = (match.group(3) or "").lower()
+    if meridiem and hour <= 12:
+        hour = hour % 12 + (12 if meridiem == "p" else 0)
+    words = swahili_time(hour, minute)
+    if match.string[match.end():].lstrip().lower().startswith(DAY_PERIODS):
+        # "7:00 asubuhi": the text already names the part of the day
+        words = words.rsplit(" ", 1)[0]
+    return words[len("saa "):] if _preceded_by(match, "saa") else words
+
+
+def _phone(match: re.Match) -> str:
+    number = match.group(0)
+    groups = [digit_words(group) for group in re.split(r"[\s-]+", number.lstrip("+")) if group]
+    words = ", ".join(groups)
+    return f"jumlisha {words}" if number.startswith("+") else words
+
+
+def _ordinal_suffix(match: re.Match) -> str:
+    return f"wa {ordinal_words(int(match.group(1)))}"
+
+
+def _ordinal_concord(match: re.Match) -> str:
+    return f"{match.group(1)} {ordinal_words(int(match.group(2)))}"
+
+
+def _unit(match: re.Match) -> str:
+    name, qualifier = UNITS[match.group(2)]
+    return " ".join(part for part in (name, number_words(match.group(1)), qualifier) if part)
+
+
+def _range(match: re.Match) -> str:
+    return f"{number_words(match.group(1))} hadi {number_words(match.group(2))}"
+
+
+def _number(match: re.Match) -> str:
+    words = number_words(match.group(2))
+    return f"hasi {words}" if match.group(1) else words
+
+
+def default_rules() -> List[NormalizationRule]:
+    """The built-in rules, most specific first; the plain number rule runs last."""
+    abbreviations = "|".join(re.escape(key) for key in sorted(ABBREVIATIONS, key=len, reverse=True))
+    currency_prefix = "|".join(re.escape(key) for key in sorted(CURRENCIES, key=len, reverse=True))
+    months = "|".join(MONTHS)
+    units = "|".join(re.escape(key) for key in sorted(UNITS, key=len, reverse=True))
+    return [
+        NormalizationRule("abbreviations", rf"(?<!\w)(?:{abbreviations})", _abbreviation),
+        NormalizationRule("number_sign", r"(?<!\w)(?:Na\.|No\.|#)\s*(?=\d)", lambda match: "namba ", digits=True),
+        NormalizationRule(
+            "currency",
+            rf"(?<![\w$€£])(?:(?P<prefix>{currency_prefix})\.?\s?(?P<amount>{NUMBER})(?:\s?/=)?"
+            rf"|(?P<suffix_amount>{NUMBER})\s?(?:/=|(?P<suffix>TZS|KES|USD|EUR|GBP)\b))",
+            _currency,
+            re.IGNORECASE,
+            digits=True,
+        ),
+        NormalizationRule(
+            "currency_words",
+            rf"\b({'|'.join(CURRENCY_WORDS)})\s+({NUMBER})(?![\w:/%])",
+            _currency_word,
+            re.IGNORECASE,
+            digits=True,
+        ),
+        NormalizationRule("percent", rf"(?<![\w.,])({NUMBER})\s?%", _percent, digits=True),
+        NormalizationRule(
+            "dates",
+            r"\b(?:(?P<day>\d{1,2})[/.-](?P<month>\d{1,2})[/.-](?P<year>\d{4})"
+            r"|(?P<iso_year>\d{4})-(?P<iso_month>\d{2})-(?P<iso_day>\d{2}))\b",
+            _numeric_date,
+            digits=True,
+        ),
+        NormalizationRule(
+            "written_dates",
+            rf"\b(\d{{1,2}})\s+({months})(?:,?\s+(\d{{4}}))?\b",
+            _written_date,
+            re.IGNORECASE,
+            digits=True,
+        ),
+        NormalizationRule(
+            "times",
+            r"\b([01]?\d|2[0-3]):([0-5]\d)(?:\s?([ap])\.?m\.?)?(?![\d:])",
+            _time,
+            re.IGNORECASE,
+            digits=True,
+        ),
+        NormalizationRule(
+            "phone_numbers",
+            r"(?<![\w+])(?:\+\d{3}(?:[\s-]?\d{3}){3}|0\d{3}(?:[\s-]?\d{3}){2})(?![\w])",
+            _phone,
+            digits=True,
+        ),
+        NormalizationRule("ordinal_suffixes", r"\b(\d+)(?:st|nd|rd|th)\b", _ordinal_suffix, digits=True),
+        NormalizationRule("ordinals", r"\b(wa|ya|la|cha|vya|za)\s+(\d+)\b(?![.,:]\d)", _ordinal_concord, digits=True),
+        NormalizationRule("units", rf"(?<![\w.,])({NUMBER})\s?({units})(?![\w])", _unit, digits=True),
+        NormalizationRule("ranges", rf"(?<![\w.,])({NUMBER})\s?[-–]\s?({NUMBER})(?![\w.])", _range, digits=True),
+        NormalizationRule(
+            "symbols",
+            r"([&=@×])|(?<=\d)\s*\+\s*(?=\d)",
+            lambda match: f" {SYMBOLS[match.group(1)]} " if match.group(1) else " jumlisha ",
+        ),
+        NormalizationRule("numbers", rf"(?<![\w.,])(-?)({NUMBER})(?![\w])", _number, digits=True),
+    ]
+
+
+class TextNormalizer:
+    """
+    Rule-based Swahili text normalizer: an ordered list of precompiled regex
+    rules, each expanding one kind of token (currency, dates, times, phone
+    numbers...) into words. Rules run in order, so the specific ones see the
+    text before the generic number rule does. Normalized texts are memoized
+    in an LRU of `cache_size` entries, and number expansions in
+    `number_words`. Add rules with `add_rule`.
+    """
+
+    def __init__(self, rules: List[NormalizationRule], cache_size: int = 1024):
+        self.rules = list(rules)
+        self.cache_size = cache_size
+        self.texts = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+        self._cached = lru_cache(maxsize=cache_size)(self._normalize)
+
+    def add_rule(self, rule: NormalizationRule, before: Optional[str] = None) -> None:
+        """Add a rule at the end, or before the rule named `before`."""
+        index = len(self.rules)
+        if before is not None:
+            index = next(i for i, existing in enumerate(self.rules) if existing.name == before)
+        self.rules.insert(index, rule)
+        self._cached.cache_clear()
+
+    def normalize(self, text: str) -> str:
+        return self._cached(text)
+
+    def _apply_rules(self, text: str) -> Iterator[Tuple[NormalizationRule, str, int, Optional[float]]]:
+        """Yield each rule with the text after it, its match count and time (None when skipped)."""
+        digits = DIGIT.search(text) is not None
+        for rule in self.rules:
+            if rule.digits and not digits:
+                yield rule, text, 0, None
+                continue
+            text, count, seconds = rule.apply(text)
+            if count:
+                # Expansions normally remove digits; check again only when the text changed
+                digits = DIGIT.search(text) is not None
+            yield rule, text, count, seconds
+
+    def _normalize(self, text: str) -> str:
+        start_time = time.perf_counter()
+        timings = []
+        for rule, text, count, seconds in self._apply_rules(text):
+            if seconds is not None:
+                timings.append((rule, count, seconds))
+        text = WHITESPACE_RUN.sub(" ", text).strip()
+        with self._lock:
+            self.texts += 1
+            self.seconds += time.perf_counter() - start_time
+            for rule, count, seconds in timings:
+                rule.calls += 1
+                rule.matches += count
+                rule.seconds += seconds
+        return text
+
+    def trace(self, text: str) -> List[Dict]:
+        """
+        Run the rules on `text` without the cache and report each one's
+        output; rules skipped because no digits were left have `skipped` set.
+        """
+        return [
+            {"rule": rule.name, "matches": count, "output": text, "seconds": seconds or 0.0, "skipped": seconds is None}
+            for rule, text, count, seconds in self._apply_rules(text)
+        ]
+
+    def stats(self) -> dict:
+        cache = self._cached.cache_info()
+        number_cache = number_words.cache_info()
+        lookups = cache.hits + cache.misses
+        return {
+            "texts_normalized": self.texts,
+            "seconds": self.seconds,
+            "cache": {
+                "hits": cache.hits,
+                "misses": cache.misses,
+                "hit_ratio": cache.hits / lookups if lookups else 0.0,
+                "entries": cache.currsize,
+                "max_entries": cache.maxsize,
+            },
+            "number_cache": {"hits": number_cache.hits, "misses": number_cache.misses, "entries": number_cache.currsize},
+            "rules": {
+                rule.name: {"calls": rule.calls, "matches": rule.matches, "seconds": rule.seconds}
+                for rule in self.rules
+            },
+        }
+
+
+text_normalizer = TextNormalizer(default_rules(), cache_size=settings.NORMALIZATION_CACHE_SIZE)
+
+
+def normalize_text(text: str) -> str:
+    """Expand numbers, currency, dates, times and other written forms in Swahili text into words."""
+    return text_normalizer.normalize(text)
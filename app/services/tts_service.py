@@ -1,44 +1,66 @@
 # app/services/tts_service.py
-from transformers import pipeline, AutoTokenizer, VitsModel
 import torch
 import numpy as np
-from functools import lru_cache
 from ..config import settings
-import re
+import copy
 import time
 import logging
-from typing import List, Tuple
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+from .batch_scheduler import (
+    BatchScheduler,
+    PaddingStats,
+    bucket_index,
+    padding_report,
+    parse_bucket_edges,
+    plan_batches,
+)
+from .audio_cache import sentence_cache, token_cache
+from .sentence_segmenter import sentence_segmenter
+from .model_registry import model_registry
+from .request_trace import record_stage, set_trace_attributes
 
 logger = logging.getLogger("swahili-voice-api")
 
-@lru_cache()
 def load_model(model_name):
-    logger.info(f"Loading model: {model_name}")
-    start_time = time.time()
-    
-    device = "cpu"
-    model = VitsModel.from_pretrained(
-        model_name, 
-        token=settings.HF_TOKEN,
-        cache_dir=settings.MODEL_CACHE_DIR
-    ).to(device)
-    tokenizer = AutoTokenizer.from_pretrained(
-        model_name, 
-        token=settings.HF_TOKEN,
-        cache_dir=settings.MODEL_CACHE_DIR
-    )
-    
-    load_time = time.time() - start_time
-    logger.info(f"Model {model_name} loaded in {load_time:.4f} seconds")
-    
-    return model, tokenizer, device
+    """Return (model, tokenizer, device) for a voice from the model registry."""
+    entry = model_registry.get(model_name)
+    return entry.model, entry.tokenizer, entry.device
+
+def sampling_options(speaking_rate: Optional[float] = None, noise_scale: Optional[float] = None) -> Optional[Tuple]:
+    """Per-request sampling settings as a hashable value, None when the model's defaults apply."""
+    if speaking_rate is None and noise_scale is None:
+        return None
+    return (speaking_rate, noise_scale)
+
+def with_sampling(model, options: Optional[Tuple]):
+    """
+    Return the model with per-request sampling settings applied. VITS reads
+    `speaking_rate` and `noise_scale` from model attributes, so instead of
+    changing the model every thread shares, this returns a shallow copy that
+    shares its weights and submodules and carries its own settings.
+    """
+    if options is None:
+        return model
+    speaking_rate, noise_scale = options
+    variant = copy.copy(model)
+    if speaking_rate is not None:
+        variant.speaking_rate = speaking_rate
+    if noise_scale is not None:
+        variant.noise_scale = noise_scale
+    return variant
+
+def sentence_cache_name(model_name: str, options: Optional[Tuple]) -> str:
+    """Sentence cache namespace: audio synthesized with other sampling settings is cached apart."""
+    if options is None:
+        return model_name
+    speaking_rate, noise_scale = options
+    return f"{model_name}|speaking_rate={speaking_rate}|noise_scale={noise_scale}"
 
 def split_into_sentences(text: str) -> List[str]:
-    """Split text into sentences using regex patterns specific to Swahili."""
+    """Split text into sentences of at most SENTENCE_MAX_CHARS characters (see sentence_segmenter)."""
     start_time = time.time()
-    text = text.strip()
-    sentences = re.split(r'(?<=[.!?])\s+(?=[A-Z])', text)
-    result = [s.strip() for s in sentences if s.strip()]
+    result = sentence_segmenter.split(text)
     
     process_time = time.time() - start_time
     logger.debug(f"Split text into {len(result)} sentences in {process_time:.4f} seconds")
@@ -52,54 +74,341 @@ def is_swahili(text: str) -> bool:
     """
     return True
 
-def generate_audio(text: str, model_name: str) -> Tuple[np.ndarray, int]:
-    """Generate audio for text, handling it sentence by sentence."""
+def synthesize_sentence(model, input_ids: List[int], device: str, index: int = 0, total: int = 1) -> np.ndarray:
+    """Run a single tokenized sentence through the model."""
+    inference_start = time.time()
+    inputs = {
+        "input_ids": torch.tensor([input_ids], device=device),
+        "attention_mask": torch.ones((1, len(input_ids)), dtype=torch.long, device=device),
+    }
+    with torch.no_grad():
+        output = model(**inputs).waveform
+    inference_time = time.time() - inference_start
+    logger.debug(f"Inference for sentence {index+1}/{total} took {inference_time:.4f} seconds")
+    
+    return output.squeeze().cpu().numpy()
+
+def tokenize(tokenizer, sentences: List[str], model_name: Optional[str] = None) -> List[List[int]]:
+    """
+    Token ids of each sentence, unpadded, so they can be bucketed by length
+    before batching. With `model_name`, ids come from the token cache where
+    possible and the remaining sentences are tokenized together in one call.
+    """
+    if model_name is None:
+        return tokenizer(sentences)["input_ids"] if sentences else []
+    input_ids = [token_cache.get(model_name, sentence) for sentence in sentences]
+    missing = [i for i, ids in enumerate(input_ids) if ids is None]
+    if missing:
+        for i, ids in zip(missing, tokenizer([sentences[i] for i in missing])["input_ids"]):
+            token_cache.put(model_name, sentences[i], ids)
+            input_ids[i] = ids
+    return input_ids
+
+def synthesize_tokens(model, tokenizer, input_ids: List[List[int]], device: str) -> List[np.ndarray]:
+    """
+    Run tokenized sentences through the model in a single padded forward
+    pass. Each waveform is trimmed back to its own length using the model's
+    predicted `sequence_lengths`, so padding never leaks into the audio.
+    """
+    inputs = tokenizer.pad({"input_ids": input_ids}, return_tensors="pt").to(device)
+    with torch.no_grad():
+        output = model(**inputs)
+    waveforms = output.waveform.cpu().numpy()
+    lengths = output.sequence_lengths.tolist()
+    return [waveforms[i, :lengths[i]] for i in range(len(input_ids))]
+
+def synthesize_batch(model, tokenizer, sentences: List[str], device: str) -> List[np.ndarray]:
+    """Run several sentences through the model in a single padded forward pass."""
+    return synthesize_tokens(model, tokenizer, tokenize(tokenizer, sentences), device)
+
+# Token-length buckets shared by cross-request and intra-request batching
+BUCKET_EDGES = parse_bucket_edges(settings.BATCH_BUCKET_EDGES)
+
+# Padding statistics of intra-request (SENTENCE_BATCHING_ENABLED) batches, per bucket
+_sentence_batch_stats: Dict[int, PaddingStats] = {}
+_sentence_batch_stats_lock = threading.Lock()
+
+def synthesize_sentences(model, tokenizer, input_ids: List[List[int]], device: str, max_batch_size: int) -> List[np.ndarray]:
+    """
+    Synthesize all tokenized sentences of a request in a few length-bucketed
+    batches. Sentences are bucketed by token length (BATCH_BUCKET_EDGES),
+    sorted and cut into batches of at most `max_batch_size` sentences and
+    BATCH_MAX_TOKENS padded tokens, so each forward pass pads only to the
+    longest of similar-length neighbours. Waveforms are returned in the
+    original sentence order.
+    """
+    lengths = [len(ids) for ids in input_ids]
+    waveforms: List[np.ndarray] = [None] * len(input_ids)
+    for batch in plan_batches(lengths, BUCKET_EDGES, max_batch_size, settings.BATCH_MAX_TOKENS):
+        batch_start = time.time()
+        outputs = synthesize_tokens(model, tokenizer, [input_ids[i] for i in batch], device)
+        for i, waveform in zip(batch, outputs):
+            waveforms[i] = waveform
+        batch_lengths = [lengths[i] for i in batch]
+        with _sentence_batch_stats_lock:
+            bucket = _sentence_batch_stats.setdefault(bucket_index(batch_lengths[0], BUCKET_EDGES), PaddingStats())
+            bucket.record(batch_lengths)
+        logger.debug(f"Batch of {len(batch)} sentences took {time.time() - batch_start:.4f} seconds")
+    return waveforms
+
+_schedulers: Dict[str, BatchScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+def get_scheduler(model_name: str) -> BatchScheduler:
+    """Return the cross-request batch scheduler for a model, creating it on first use."""
+    with _schedulers_lock:
+        scheduler = _schedulers.get(model_name)
+        if scheduler is None:
+            def run_batch(input_ids: List[List[int]], options: Optional[Tuple]) -> List[np.ndarray]:
+                model, tokenizer, device = load_model(model_name)
+                return synthesize_tokens(with_sampling(model, options), tokenizer, input_ids, device)
+
+            scheduler = BatchScheduler(
+                model_name,
+                run_batch,
+                max_batch_size=settings.BATCH_MAX_SIZE,
+                max_wait_ms=settings.BATCH_MAX_WAIT_MS,
+                bucket_edges=BUCKET_EDGES,
+                max_tokens=settings.BATCH_MAX_TOKENS,
+            )
+            _schedulers[model_name] = scheduler
+        return scheduler
+
+def batching_stats() -> dict:
+    """Batch sizes and padding efficiency per length bucket, for each scheduler and for intra-request batches."""
+    with _schedulers_lock:
+        schedulers = dict(_schedulers)
+    with _sentence_batch_stats_lock:
+        sentence_batches = padding_report(_sentence_batch_stats, BUCKET_EDGES)
+    return {
+        "bucket_edges": BUCKET_EDGES,
+        "schedulers": {name: scheduler.stats() for name, scheduler in schedulers.items()},
+        "sentence_batches": sentence_batches,
+    }
+
+def generate_segments(
+    text: str,
+    model_name: str,
+    speaking_rate: Optional[float] = None,
+    noise_scale: Optional[float] = None,
+) -> Tuple[List[np.ndarray], int]:
+    """
+    Generate audio for text, handling it sentence by sentence. Returns the
+    sentence waveforms in order, unconcatenated, so encoders can write them
+    straight into their output. `speaking_rate` and `noise_scale` override
+    the model's sampling settings for this call.
+    """
     logger.info(f"Generating audio for text of length {len(text)} using model {model_name}")
     start_time = time.time()
+    options = sampling_options(speaking_rate, noise_scale)
+    cache_name = sentence_cache_name(model_name, options)
     
     # Load model
     model_load_start = time.time()
     model, tokenizer, device = load_model(model_name)
+    model = with_sampling(model, options)
     model_load_time = time.time() - model_load_start
+    record_stage("model_load", model_load_time)
     logger.debug(f"Model loading took {model_load_time:.4f} seconds")
     
     # Split into sentences
     sentence_split_start = time.time()
     sentences = split_into_sentences(text)
     sentence_split_time = time.time() - sentence_split_start
+    record_stage("split", sentence_split_time)
     logger.debug(f"Sentence splitting took {sentence_split_time:.4f} seconds")
     
+    # Reuse cached sentences and only synthesize the misses
+    audio_segments = [sentence_cache.get(cache_name, sentence) for sentence in sentences]
+    missing = [i for i, segment in enumerate(audio_segments) if segment is None]
+    pending = [sentences[i] for i in missing]
+    logger.debug(f"Sentence cache hits: {len(sentences) - len(missing)}/{len(sentences)}")
+    set_trace_attributes(sentences=len(sentences), sentence_cache_hits=len(sentences) - len(missing))
+    
+    # Tokenize all misses in one call, reusing cached token ids
+    tokenization_start = time.time()
+    input_ids = tokenize(tokenizer, pending, model_name) if pending else []
+    tokenization_time = time.time() - tokenization_start
+    record_stage("tokenize", tokenization_time)
+    logger.debug(f"Tokenization of {len(pending)} sentences took {tokenization_time:.4f} seconds")
+    
     # Process each sentence
-    audio_segments = []
-    for i, sentence in enumerate(sentences):
-        if not sentence.strip():
-            continue
-        
-        sentence_start = time.time()
-        inputs = tokenizer(sentence, return_tensors="pt").to(device)
-        
-        tokenization_time = time.time() - sentence_start
-        logger.debug(f"Tokenization for sentence {i+1}/{len(sentences)} took {tokenization_time:.4f} seconds")
-        
-        inference_start = time.time()
-        with torch.no_grad():
-            output = model(**inputs).waveform
-        inference_time = time.time() - inference_start
-        logger.debug(f"Inference for sentence {i+1}/{len(sentences)} took {inference_time:.4f} seconds")
-        
-        audio_segment = output.squeeze().cpu().numpy()
-        audio_segments.append(audio_segment)
-        
-        sentence_time = time.time() - sentence_start
-        logger.debug(f"Processing sentence {i+1}/{len(sentences)} took {sentence_time:.4f} seconds")
+    inference_start = time.time()
+    new_segments = []
+    if not pending:
+        pass
+    elif settings.BATCHING_ENABLED:
+        # Sentences are batched together with those of other concurrent requests
+        batch_start = time.time()
+        futures = get_scheduler(model_name).submit(input_ids, options)
+        new_segments = [future.result() for future in futures]
+        batch_time = time.time() - batch_start
+        logger.debug(f"Batched inference for {len(pending)} sentences took {batch_time:.4f} seconds")
+    elif settings.SENTENCE_BATCHING_ENABLED:
+        # All sentences of this request go through a few padded forward passes
+        batch_start = time.time()
+        new_segments = synthesize_sentences(model, tokenizer, input_ids, device, settings.SENTENCE_BATCH_SIZE)
+        batch_time = time.time() - batch_start
+        logger.debug(f"Batched inference for {len(pending)} sentences took {batch_time:.4f} seconds")
+    else:
+        for i, ids in enumerate(input_ids):
+            new_segments.append(synthesize_sentence(model, ids, device, i, len(pending)))
+    if pending:
+        record_stage("inference", time.time() - inference_start)
+    
+    for i, segment in zip(missing, new_segments):
+        sentence_cache.put(cache_name, sentences[i], segment)
+        audio_segments[i] = segment
+    
+    sample_rate = model.config.sampling_rate
+    set_trace_attributes(audio_seconds=sum(len(segment) for segment in audio_segments) / sample_rate)
+    
+    total_time = time.time() - start_time
+    logger.info(
+        f"Total audio generation took {total_time:.4f} seconds for {len(sentences)} sentences "
+        f"(tokenization {tokenization_time:.4f} seconds)"
+    )
+    
+    return audio_segments, sample_rate
+
+def generate_audio(
+    text: str,
+    model_name: str,
+    speaking_rate: Optional[float] = None,
+    noise_scale: Optional[float] = None,
+) -> Tuple[np.ndarray, int]:
+    """Generate audio for text as a single waveform."""
+    audio_segments, sample_rate = generate_segments(text, model_name, speaking_rate, noise_scale)
     
     # Concatenate audio segments
     concatenation_start = time.time()
     final_audio = np.concatenate(audio_segments)
     concatenation_time = time.time() - concatenation_start
+    record_stage("concatenate", concatenation_time)
     logger.debug(f"Audio concatenation took {concatenation_time:.4f} seconds")
     
-    total_time = time.time() - start_time
-    logger.info(f"Total audio generation took {total_time:.4f} seconds for {len(sentences)} sentences")
+    return final_audio, sample_rate
+
+def generate_audio_batch(
+    texts: List[str],
+    model_name: str,
+    speaking_rate: Optional[float] = None,
+    noise_scale: Optional[float] = None,
+) -> Tuple[List[np.ndarray], int]:
+    """
+    Generate audio for several texts with one model. The uncached sentences
+    of all texts are pooled (duplicates synthesized once) and run in batches,
+    through the cross-request scheduler when enabled, otherwise in
+    length-bucketed padded batches. Returns one waveform per text.
+    """
+    start_time = time.time()
+    options = sampling_options(speaking_rate, noise_scale)
+    cache_name = sentence_cache_name(model_name, options)
+    model, tokenizer, device = load_model(model_name)
+    model = with_sampling(model, options)
+    record_stage("model_load", time.time() - start_time)
+    split_start = time.time()
+    sentences_per_text = [split_into_sentences(text) for text in texts]
+    record_stage("split", time.time() - split_start)
+    
+    segments: Dict[str, np.ndarray] = {}
+    for sentences in sentences_per_text:
+        for sentence in sentences:
+            if sentence not in segments:
+                segment = sentence_cache.get(cache_name, sentence)
+                if segment is not None:
+                    segments[sentence] = segment
+    pending = list(dict.fromkeys(
+        sentence for sentences in sentences_per_text for sentence in sentences if sentence not in segments
+    ))
+    
+    tokenization_time = 0.0
+    if pending:
+        tokenization_start = time.time()
+        input_ids = tokenize(tokenizer, pending, model_name)
+        tokenization_time = time.time() - tokenization_start
+        record_stage("tokenize", tokenization_time)
+        inference_start = time.time()
+        if settings.BATCHING_ENABLED:
+            futures = get_scheduler(model_name).submit(input_ids, options)
+            new_segments = [future.result() for future in futures]
+        else:
+            new_segments = synthesize_sentences(model, tokenizer, input_ids, device, settings.SENTENCE_BATCH_SIZE)
+        record_stage("inference", time.time() - inference_start)
+        for sentence, segment in zip(pending, new_segments):
+            sentence_cache.put(cache_name, sentence, segment)
+            segments[sentence] = segment
     
-    return final_audio, model.config.sampling_rate
\ No newline at end of file
+    empty = np.zeros(0, dtype=np.float32)
+    audios = [
+        np.concatenate([segments[sentence] for sentence in sentences]) if sentences else empty
+        for sentences in sentences_per_text
+    ]
+    total_sentences = sum(len(sentences) for sentences in sentences_per_text)
+    set_trace_attributes(
+        sentences=total_sentences,
+        audio_seconds=sum(len(audio) for audio in audios) / model.config.sampling_rate,
+    )
+    logger.info(
+        f"Batch generation of {len(texts)} texts ({total_sentences} sentences, {len(pending)} synthesized) "
+        f"took {time.time() - start_time:.4f} seconds, {tokenization_time:.4f} of them tokenizing"
+    )
+    return audios, model.config.sampling_rate
+
+def iter_audio(
+    text: str,
+    model_name: str,
+    speaking_rate: Optional[float] = None,
+    noise_scale: Optional[float] = None,
+) -> Iterator[Tuple[np.ndarray, int]]:
+    """
+    Generate audio sentence by sentence, yielding each segment as soon as it
+    is ready so callers can stream it. Yields (audio_segment, sample_rate).
+    """
+    logger.info(f"Streaming audio for text of length {len(text)} using model {model_name}")
+    start_time = time.time()
+    options = sampling_options(speaking_rate, noise_scale)
+    cache_name = sentence_cache_name(model_name, options)
+    
+    model, tokenizer, device = load_model(model_name)
+    model = with_sampling(model, options)
+    sample_rate = model.config.sampling_rate
+    record_stage("model_load", time.time() - start_time)
+    split_start = time.time()
+    sentences = split_into_sentences(text)
+    record_stage("split", time.time() - split_start)
+    
+    cached = [sentence_cache.get(cache_name, sentence) for sentence in sentences]
+    set_trace_attributes(
+        sentences=len(sentences), sentence_cache_hits=sum(segment is not None for segment in cached)
+    )
+    tokenization_start = time.time()
+    pending = [sentence for sentence, segment in zip(sentences, cached) if segment is None]
+    input_ids = iter(tokenize(tokenizer, pending, model_name) if pending else [])
+    tokenization_time = time.time() - tokenization_start
+    record_stage("tokenize", tokenization_time)
+    logger.debug(f"Tokenization of {len(pending)} sentences took {tokenization_time:.4f} seconds")
+    if settings.BATCHING_ENABLED:
+        # Queue all misses at once but hand segments back in order as they finish
+        futures = iter(get_scheduler(model_name).submit(list(input_ids), options))
+    
+    audio_samples = 0
+    for i, sentence in enumerate(sentences):
+        segment = cached[i]
+        if segment is None:
+            inference_start = time.time()
+            if settings.BATCHING_ENABLED:
+                segment = next(futures).result()
+            else:
+                segment = synthesize_sentence(model, next(input_ids), device, i, len(sentences))
+            record_stage("inference", time.time() - inference_start)
+            sentence_cache.put(cache_name, sentence, segment)
+        audio_samples += len(segment)
+        set_trace_attributes(audio_seconds=audio_samples / sample_rate)
+        yield segment, sample_rate
+    
+    total_time = time.time() - start_time
+    logger.info(
+        f"Total streamed audio generation took {total_time:.4f} seconds for {len(sentences)} sentences "
+        f"(tokenization {tokenization_time:.4f} seconds)"
+    )
@@ -0,0 +1,161 @@
+# app/services/voice_service.py
+from ..database.mongodb import Database
+from ..models.schemas import VoiceConfig, TTSRequest
+from app.config import settings
+from fastapi import HTTPException
+from pydantic import ValidationError
+from typing import Dict, List, Optional
+import logging
+import time
+
+logger = logging.getLogger("swahili-voice-api")
+
+# Built-in voices; entries in the `voices` collection override or extend these
+DEFAULT_VOICES = [
+    VoiceConfig(voice_id="benny", model_name="Benjamin-png/swahili-mms-tts-finetuned", display_name="Benny"),
+    VoiceConfig(voice_id="briget", model_name="Benjamin-png/swahili-mms-tts-Briget_580_clips-finetuned", display_name="Briget"),
+    VoiceConfig(voice_id="emanuela", model_name="Benjamin-png/swahili-mms-tts-Emmanuela_700_clips-finetuned", display_name="Emanuela"),
+]
+
+
+class VoiceSlot:
+    """
+    One in-flight synthesis admitted by a `VoiceLimiter`. Releasing is
+    idempotent, so a streamed response can tie the release to every way
+    it can end.
+    """
+
+    __slots__ = ("limiter", "released")
+
+    def __init__(self, limiter: "VoiceLimiter"):
+        self.limiter = limiter
+        self.released = False
+
+    def release(self) -> None:
+        if not self.released:
+            self.released = True
+            self.limiter.release()
+
+
+class VoiceLimiter:
+    """Non-blocking per-voice limit on in-flight syntheses within one worker."""
+
+    def __init__(self, voice_id: str, max_concurrency: Optional[int]):
+        self.voice_id = voice_id
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+
+    def acquire(self) -> VoiceSlot:
+        if self.max_concurrency is not None and self.in_flight >= self.max_concurrency:
+            raise HTTPException(
+                status_code=503,
+                detail=f"Voice '{self.voice_id}' is busy, please retry later",
+                headers={"Retry-After": str(settings.INFERENCE_RETRY_AFTER)},
+            )
+        self.in_flight += 1
+        return VoiceSlot(self)
+
+    def release(self) -> None:
+        self.in_flight -= 1
+
+
+def validate_default_params(voice: VoiceConfig) -> None:
+    """Reject default params that are not TTSRequest fields or would not validate as one."""
+    unknown = set(voice.default_params) - (set(TTSRequest.model_fields) - {"text"})
+    if unknown:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Voice '{voice.voice_id}' has unknown default params: {', '.join(sorted(unknown))}"
+        )
+    try:
+        TTSRequest(text="", **voice.default_params)
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Voice '{voice.voice_id}' has invalid default params: {e.errors(include_url=False)}"
+        )
+
+
+class VoiceService:
+    def __init__(self):
+        self.db = Database.client[settings.DB_NAME]
+        self.collection = self.db.voices
+
+    async def list_voices(self) -> List[VoiceConfig]:
+        voices = await self.collection.find({}).to_list(None)
+        for voice in voices:
+            voice.pop("_id", None)
+        return [VoiceConfig(**voice) for voice in voices]
+
+    async def upsert_voice(self, voice: VoiceConfig) -> VoiceConfig:
+        validate_default_params(voice)
+        try:
+            await self.collection.update_one(
+                {"voice_id": voice.voice_id},
+                {"$set": voice.model_dump()},
+                upsert=True
+            )
+            voice_catalog.invalidate()
+            return voice
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    async def delete_voice(self, voice_id: str) -> bool:
+        try:
+            result = await self.collection.delete_one({"voice_id": voice_id})
+            voice_catalog.invalidate()
+            return result.deleted_count > 0
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+
+class VoiceCatalog:
+    """
+    Per-worker view of the available voices: the built-in defaults overlaid
+    with the `voices` collection, re-read at most every `refresh_seconds`.
+    If Mongo is unreachable the last known catalog keeps being served.
+    """
+
+    def __init__(self, defaults: List[VoiceConfig], refresh_seconds: float):
+        self.defaults = {voice.voice_id: voice for voice in defaults}
+        self.refresh_seconds = refresh_seconds
+        self._voices: Dict[str, VoiceConfig] = dict(self.defaults)
+        self._loaded_at = 0.0
+        self._limiters: Dict[str, VoiceLimiter] = {}
+
+    def invalidate(self) -> None:
+        self._loaded_at = 0.0
+
+    async def _refresh(self) -> None:
+        if time.time() - self._loaded_at < self.refresh_seconds:
+            return
+        self._loaded_at = time.time()
+        try:
+            stored = await VoiceService().list_voices()
+        except Exception as e:
+            logger.warning(f"Could not load voice catalog from MongoDB, using cached catalog: {e}")
+            return
+        voices = dict(self.defaults)
+        voices.update({voice.voice_id: voice for voice in stored})
+        self._voices = voices
+
+    async def list(self) -> List[VoiceConfig]:
+        await self._refresh()
+        return list(self._voices.values())
+
+    async def get(self, voice_id: str) -> Optional[VoiceConfig]:
+        await self._refresh()
+        voice = self._voices.get(voice_id)
+        if voice is None or not voice.enabled:
+            return None
+        return voice
+
+    def limiter(self, voice: VoiceConfig) -> VoiceLimiter:
+        limiter = self._limiters.get(voice.voice_id)
+        if limiter is None:
+            limiter = self._limiters[voice.voice_id] = VoiceLimiter(voice.voice_id, voice.max_concurrency)
+        limiter.max_concurrency = voice.max_concurrency
+        return limiter
+
+
+voice_catalog = VoiceCatalog(DEFAULT_VOICES, refresh_seconds=settings.VOICE_CATALOG_REFRESH_SECONDS)
@@ -0,0 +1,87 @@
+# benchmarks/bench_batching.py
+"""
+Compare unbatched and cross-request batched inference under concurrent load.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_batching --model Benjamin-png/swahili-mms-tts-finetuned \
+        --concurrency 8 --requests 32
+
+The headline number is sentences/sec: how many sentences the process
+synthesizes per wall-clock second while `--concurrency` requests are in flight.
+The sentence and token caches are disabled, so every request is synthesized
+even though they all send the same text.
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.config import settings
+from app.services import tts_service
+from app.services.audio_cache import sentence_cache, token_cache
+
+SENTENCES = [
+    "Habari za asubuhi.",
+    "Karibu nyumbani kwetu.",
+    "Leo ni siku nzuri sana ya kufanya kazi.",
+    "Tafadhali subiri kidogo.",
+    "Mwalimu aliwaambia wanafunzi wasome kitabu kizima kabla ya mtihani.",
+    "Asante sana.",
+]
+
+
+def run(model_name: str, concurrency: int, requests: int, batching: bool) -> dict:
+    settings.BATCHING_ENABLED = batching
+    text = " ".join(SENTENCES)
+    sentences_per_request = len(tts_service.split_into_sentences(text))
+
+    start_time = time.time()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda _: tts_service.generate_audio(text, model_name), range(requests)))
+    elapsed = time.time() - start_time
+
+    total_sentences = sentences_per_request * requests
+    return {
+        "mode": "batched" if batching else "unbatched",
+        "seconds": elapsed,
+        "sentences": total_sentences,
+        "sentences_per_second": total_sentences / elapsed,
+        "requests_per_second": requests / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="Benjamin-png/swahili-mms-tts-finetuned")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--max-batch-size", type=int, default=settings.BATCH_MAX_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=settings.BATCH_MAX_WAIT_MS)
+    args = parser.parse_args()
+
+    settings.BATCH_MAX_SIZE = args.max_batch_size
+    settings.BATCH_MAX_WAIT_MS = args.max_wait_ms
+    # Every request repeats the same text; cached sentences would skip inference
+    sentence_cache.max_bytes = 0
+    token_cache.max_entries = 0
+
+    # Load and warm the model once so neither run pays the load cost
+    settings.BATCHING_ENABLED = False
+    tts_service.generate_audio(SENTENCES[0], args.model)
+
+    results = [
+        run(args.model, args.concurrency, args.requests, batching=False),
+        run(args.model, args.concurrency, args.requests, batching=True),
+    ]
+    for result in results:
+        print(
+            f"{result['mode']:>10}: {result['sentences_per_second']:8.2f} sentences/s "
+            f"{result['requests_per_second']:8.2f} requests/s "
+            f"({result['sentences']} sentences in {result['seconds']:.2f}s)"
+        )
+    speedup = results[1]["sentences_per_second"] / results[0]["sentences_per_second"]
+    print(f"Batched throughput speedup: {speedup:.2f}x")
+    print(f"Scheduler stats: {tts_service.get_scheduler(args.model).stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# benchmarks/bench_bucketing.py
+"""
+Compare single-queue and length-bucketed cross-request batching under a
+mixed load of short interactive sentences and long paragraph chunks.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_bucketing --model Benjamin-png/swahili-mms-tts-finetuned \
+        --short-clients 2 --long-clients 6 --seconds 30
+
+Each client thread submits one sentence at a time to a `BatchScheduler`
+and waits for its waveform, short clients picking from short prompts and
+long clients from sentences near SENTENCE_MAX_CHARS. Two schedulers run
+the same load, one after the other:
+
+- single-queue: one queue per model, batches of up to `--max-batch-size`
+  in arrival order, as before length bucketing;
+- bucketed: `--bucket-edges` token-length buckets with a `--max-tokens`
+  padded-token budget and short buckets served first.
+
+Reported per scheduler: padding efficiency (real tokens / padded tokens),
+synthesized tokens/sec and latency percentiles of short and long sentences.
+The sentence cache is not involved, so repeated sentences are synthesized
+every time.
+"""
+import argparse
+import random
+import threading
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from app.config import settings
+from app.services import tts_service
+from app.services.batch_scheduler import BatchScheduler, parse_bucket_edges
+
+SHORT_SENTENCES = [
+    "Habari za asubuhi.",
+    "Karibu sana.",
+    "Tafadhali subiri kidogo.",
+    "Asante kwa kupiga simu.",
+    "Bonyeza moja kwa huduma za malipo.",
+    "Ndiyo.",
+]
+
+LONG_SENTENCES = [
+    "Watoto walicheza uwanjani, wazazi walizungumza kuhusu mavuno ya mwaka huu, walimu walipanga ratiba ya "
+    "mitihani ya mwisho wa muhula, na wazee walikaa kivulini wakisimulia hadithi za zamani.",
+    "Mkulima alipanda mahindi mengi shambani mwake lakini mvua haikunyesha kwa wakati uliotarajiwa na hivyo "
+    "mavuno yalikuwa hafifu sana mwaka ule, hata hivyo hakukata tamaa hata kidogo.",
+    "Serikali imetangaza mpango mpya wa kuboresha huduma za afya vijijini, ikiwa ni pamoja na ujenzi wa "
+    "zahanati, mafunzo kwa wauguzi na usambazaji wa dawa muhimu.",
+    "Mwalimu aliwaambia wanafunzi wasome kitabu kizima kabla ya mtihani.",
+]
+
+
+def client(scheduler: BatchScheduler, tokenizer, sentences: List[str], deadline: float, latencies: List[float], seed: int):
+    rng = random.Random(seed)
+    tokenized = tts_service.tokenize(tokenizer, sentences)
+    while time.time() < deadline:
+        input_ids = rng.choice(tokenized)
+        start_time = time.time()
+        scheduler.submit([input_ids])[0].result()
+        latencies.append(time.time() - start_time)
+
+
+def run(name: str, model_name: str, args, bucket_edges: List[int], max_tokens: int) -> dict:
+    model, tokenizer, device = tts_service.load_model(model_name)
+    scheduler = BatchScheduler(
+        name,
+        lambda input_ids, options: tts_service.synthesize_tokens(model, tokenizer, input_ids, device),
+        max_batch_size=args.max_batch_size,
+        max_wait_ms=args.max_wait_ms,
+        bucket_edges=bucket_edges,
+        max_tokens=max_tokens,
+    )
+    latencies: Dict[str, List[float]] = {"short": [], "long": []}
+    deadline = time.time() + args.seconds
+    threads = [
+        threading.Thread(target=client, args=(scheduler, tokenizer, SHORT_SENTENCES, deadline, latencies["short"], i))
+        for i in range(args.short_clients)
+    ] + [
+        threading.Thread(target=client, args=(scheduler, tokenizer, LONG_SENTENCES, deadline, latencies["long"], 100 + i))
+        for i in range(args.long_clients)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = scheduler.stats()
+    tokens = sum(bucket.tokens for bucket in scheduler.buckets.values())
+    return {
+        "mode": name,
+        "padding_efficiency": stats["padding_efficiency"],
+        "tokens_per_second": tokens / args.seconds,
+        "mean_batch_size": stats["mean_batch_size"],
+        "latency": {
+            kind: np.percentile(values, [50, 95]) if values else np.zeros(2) for kind, values in latencies.items()
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="Benjamin-png/swahili-mms-tts-finetuned")
+    parser.add_argument("--short-clients", type=int, default=2)
+    parser.add_argument("--long-clients", type=int, default=6)
+    parser.add_argument("--seconds", type=float, default=30.0, help="duration of each run (default: 30)")
+    parser.add_argument("--max-batch-size", type=int, default=settings.BATCH_MAX_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=settings.BATCH_MAX_WAIT_MS)
+    parser.add_argument("--bucket-edges", default=settings.BATCH_BUCKET_EDGES)
+    parser.add_argument("--max-tokens", type=int, default=settings.BATCH_MAX_TOKENS)
+    args = parser.parse_args()
+
+    # Load and warm the model once so neither run pays the load cost
+    tts_service.generate_audio(SHORT_SENTENCES[0], args.model)
+
+    results = [
+        run("single-queue", args.model, args, bucket_edges=[], max_tokens=0),
+        run("bucketed", args.model, args, bucket_edges=parse_bucket_edges(args.bucket_edges), max_tokens=args.max_tokens),
+    ]
+    for result in results:
+        short, long = result["latency"]["short"], result["latency"]["long"]
+        print(
+            f"{result['mode']:>12}: padding efficiency {result['padding_efficiency']:6.1%}, "
+            f"{result['tokens_per_second']:8.0f} tokens/s, mean batch {result['mean_batch_size']:.1f} | "
+            f"short p50 {short[0] * 1000:7.0f} ms p95 {short[1] * 1000:7.0f} ms | "
+            f"long p50 {long[0] * 1000:7.0f} ms p95 {long[1] * 1000:7.0f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# benchmarks/bench_compiled.py
+"""
+Compare the TorchScript backend of a voice model against eager PyTorch.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_compiled --model Benjamin-png/swahili-mms-tts-finetuned [--quantized]
+
+Both backends synthesize the same short and long Swahili sentences with
+sampling noise disabled. Reported per backend and sentence length: mean/p95
+latency, and the maximum waveform difference of the compiled graph against
+eager.
+"""
+import argparse
+import time
+
+import numpy as np
+import torch
+
+from app.services.model_registry import ModelRegistry, model_key
+
+SENTENCES = {
+    "short": [
+        "Ndio.",
+        "Asante sana.",
+        "Habari za asubuhi.",
+    ],
+    "long": [
+        "Mwalimu aliwaambia wanafunzi wasome kitabu kizima kabla ya mtihani wa wiki ijayo.",
+        "Mvua kubwa inatarajiwa kunyesha katika maeneo ya pwani na nyanda za juu kusini.",
+        "Serikali imetangaza mpango mpya wa kuboresha elimu vijijini kuanzia mwaka ujao wa fedha.",
+    ],
+}
+
+
+def synthesize(entry, sentence: str) -> tuple:
+    inputs = entry.tokenizer(sentence, return_tensors="pt")
+    start_time = time.time()
+    with torch.no_grad():
+        waveform = entry.model(**inputs).waveform
+    return waveform.squeeze().numpy(), time.time() - start_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="Benjamin-png/swahili-mms-tts-finetuned")
+    parser.add_argument("--quantized", action="store_true", help="compare the int8 variants")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    registry = ModelRegistry(memory_budget_bytes=0)
+    entries = {
+        backend: registry.get(model_key(args.model, quantized=args.quantized, backend=backend))
+        for backend in ("eager", "torchscript")
+    }
+    if entries["torchscript"].backend != "torchscript":
+        raise SystemExit("TorchScript export failed, see the log for details")
+    for entry in entries.values():
+        entry.model.noise_scale = 0.0
+        entry.model.noise_scale_duration = 0.0
+        synthesize(entry, SENTENCES["short"][0])
+
+    for length, sentences in SENTENCES.items():
+        latencies = {backend: [] for backend in entries}
+        max_error = 0.0
+        for sentence in sentences:
+            outputs = {}
+            for backend, entry in entries.items():
+                for _ in range(args.repeats):
+                    outputs[backend], latency = synthesize(entry, sentence)
+                    latencies[backend].append(latency)
+            max_error = max(max_error, float(np.abs(outputs["eager"] - outputs["torchscript"]).max()))
+
+        for backend, values in latencies.items():
+            values = np.array(values)
+            print(f"{length} {backend}: mean {values.mean() * 1000:.1f} ms, p95 {np.percentile(values, 95) * 1000:.1f} ms")
+        speedup = np.mean(latencies["eager"]) / np.mean(latencies["torchscript"])
+        print(f"{length} torchscript speedup: {speedup:.2f}x, max waveform difference {max_error:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+# benchmarks/bench_normalization.py
+"""
+Measure text normalization throughput over a large Swahili corpus.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_normalization --sentences 100000
+    python -m benchmarks.bench_normalization --csv texts.csv
+
+Sentences come from a CSV with the `client_id,path,sentence` columns used by
+the import endpoint, or are generated from Swahili templates filled with
+random amounts, dates, times, phone numbers and so on (`--sentences` of
+them, `--unique` distinct). The corpus is normalized three ways:
+
+- legacy: the previous `normalize_numbers`, one regex for plain numbers;
+- cold: every rule of `TextNormalizer` on every sentence, with the text
+  cache off (number expansions are still memoized, starting empty);
+- memoized: the same normalizer with its caches, as the API runs it.
+
+Reported per mode: sentences/sec and characters/sec, then the time spent
+in each rule during the cold pass.
+"""
+import argparse
+import csv
+import random
+import re
+import time
+from typing import Callable, List
+
+from tarakimu import num_to_words
+
+from app.services.text_normalizer import TextNormalizer, default_rules, number_words
+
+TEMPLATES = [
+    "Bw. {name} alilipa TSh {amount:,} tarehe {day}/{month}/{year} saa {hour}:{minute:02d}.",
+    "Bei ya mafuta imepanda kwa {percent}.{digit}% na sasa ni KSh {amount} kwa lita.",
+    "Mkutano utafanyika tarehe {day} Machi {year} kuanzia saa {hour}:{minute:02d} asubuhi.",
+    "Piga simu namba +255 7{digit}{digit} {digit}{digit}{digit} {digit}{digit}{digit} kwa maelezo zaidi.",
+    "Timu yetu ilishika nafasi ya {rank} kati ya timu {count} zilizoshiriki.",
+    "Umbali kutoka Dar es Salaam hadi Morogoro ni {count} km na safari huchukua saa {digit}.",
+    "Watu {count}-{amount} walihudhuria, n.k. Kisha Mhe. {name} alihutubia.",
+    "Joto lilifikia {percent}°C na mvua ya milimita {count} ilinyesha usiku.",
+    "Serikali imetenga shilingi {amount}.{minute:02d} kwa ajili ya elimu & afya.",
+    "Habari za asubuhi, karibu sana katika kituo chetu cha huduma kwa wateja.",
+]
+NAMES = ["Juma", "Amina", "Baraka", "Neema", "Hamisi", "Rehema"]
+
+
+def generate_corpus(sentences: int, unique: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    distinct = [
+        rng.choice(TEMPLATES).format(
+            name=rng.choice(NAMES),
+            amount=rng.randint(100, 2_000_000),
+            day=rng.randint(1, 28),
+            month=rng.randint(1, 12),
+            year=rng.randint(1960, 2030),
+            hour=rng.randint(0, 23),
+            minute=rng.randint(0, 59),
+            percent=rng.randint(1, 40),
+            digit=rng.randint(0, 9),
+            rank=rng.randint(1, 20),
+            count=rng.randint(2, 500),
+        )
+        for _ in range(unique)
+    ]
+    return [rng.choice(distinct) for _ in range(sentences)]
+
+
+def load_csv(path: str) -> List[str]:
+    with open(path, newline="", encoding="utf-8") as f:
+        return [row["sentence"] for row in csv.DictReader(f) if row.get("sentence")]
+
+
+def normalize_numbers(text: str) -> str:
+    """The normalization the API used before the rule-based normalizer."""
+    def replace_number(match):
+        number = match.group(0)
+        try:
+            if '.' in number:
+                return num_to_words(float(number))
+            return num_to_words(number)
+        except ValueError:
+            return number
+
+    return re.sub(r'\b\d+(?:\.\d+)?\b', replace_number, text)
+
+
+def measure(name: str, normalize: Callable[[str], str], corpus: List[str], characters: int) -> dict:
+    start_time = time.perf_counter()
+    for text in corpus:
+        normalize(text)
+    elapsed = time.perf_counter() - start_time
+    return {
+        "mode": name,
+        "seconds": elapsed,
+        "sentences_per_second": len(corpus) / elapsed,
+        "characters_per_second": characters / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", help="read sentences from this CSV instead of generating them")
+    parser.add_argument("--sentences", type=int, default=100_000, help="generated sentences (default: 100000)")
+    parser.add_argument("--unique", type=int, default=5_000, help="distinct generated sentences (default: 5000)")
+    parser.add_argument("--cache-size", type=int, default=1024, help="memoized normalizer cache size (default: 1024)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    corpus = load_csv(args.csv) if args.csv else generate_corpus(args.sentences, args.unique, args.seed)
+    characters = sum(len(text) for text in corpus)
+    print(f"{len(corpus)} sentences ({len(set(corpus))} distinct), {characters} characters")
+
+    results = [measure("legacy", normalize_numbers, corpus, characters)]
+    cold = TextNormalizer(default_rules(), cache_size=0)
+    number_words.cache_clear()
+    results.append(measure("cold", cold.normalize, corpus, characters))
+    memoized = TextNormalizer(default_rules(), cache_size=args.cache_size)
+    results.append(measure("memoized", memoized.normalize, corpus, characters))
+
+    for result in results:
+        print(
+            f"{result['mode']:>10}: {result['sentences_per_second']:10.0f} sentences/s "
+            f"{result['characters_per_second'] / 1e6:8.2f} M chars/s ({result['seconds']:.2f}s)"
+        )
+    cache = memoized.stats()["cache"]
+    print(f"Memoized cache hit ratio: {cache['hit_ratio']:.1%}")
+
+    print("\nPer-rule time in the cold pass:")
+    rules = cold.stats()["rules"]
+    total = sum(rule["seconds"] for rule in rules.values())
+    for name, rule in sorted(rules.items(), key=lambda item: -item[1]["seconds"]):
+        print(
+            f"{name:>18}: {rule['seconds'] * 1000:9.1f} ms ({rule['seconds'] / total:6.1%}) "
+            f"{rule['matches']:8d} matches"
+        )
+
+
+if __name__ == "__main__":
+    main()
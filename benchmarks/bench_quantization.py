@@ -0,0 +1,125 @@
+# benchmarks/bench_quantization.py
+"""
+Compare the dynamic int8 variant of a voice model against fp32.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_quantization --model Benjamin-png/swahili-mms-tts-finetuned
+
+Both variants synthesize the same fixed Swahili corpus with sampling noise
+disabled, so differences come from quantization alone. Reported per variant:
+mean/p95 latency per sentence; and for int8 vs fp32: mean log-mel distance
+(dB), waveform SNR (dB) and relative duration difference.
+"""
+import argparse
+import time
+
+import numpy as np
+import torch
+
+from app.services.model_registry import ModelRegistry, model_key
+
+CORPUS = [
+    "Habari za asubuhi.",
+    "Karibu nyumbani kwetu, tafadhali keti.",
+    "Leo ni siku nzuri sana ya kufanya kazi shambani.",
+    "Mwalimu aliwaambia wanafunzi wasome kitabu kizima kabla ya mtihani wa wiki ijayo.",
+    "Bei ya mchele imepanda kwa asilimia kumi mwezi huu.",
+    "Tafadhali piga simu kesho saa tatu asubuhi.",
+    "Serikali imetangaza mpango mpya wa kuboresha elimu vijijini.",
+    "Asante sana kwa msaada wako.",
+    "Mvua kubwa inatarajiwa kunyesha katika maeneo ya pwani na nyanda za juu kusini.",
+    "Watoto wanacheza mpira uwanjani baada ya shule.",
+]
+
+
+def mel_filterbank(sample_rate: int, n_fft: int, n_mels: int = 80) -> np.ndarray:
+    """Triangular mel filterbank of shape (n_mels, n_fft // 2 + 1)."""
+    def hz_to_mel(hz):
+        return 2595.0 * np.log10(1.0 + hz / 700.0)
+
+    def mel_to_hz(mel):
+        return 700.0 * (10.0 ** (mel / 2595.0) - 1.0)
+
+    mel_points = np.linspace(hz_to_mel(0.0), hz_to_mel(sample_rate / 2), n_mels + 2)
+    bins = np.floor((n_fft + 1) * mel_to_hz(mel_points) / sample_rate).astype(int)
+    filters = np.zeros((n_mels, n_fft // 2 + 1))
+    for m in range(1, n_mels + 1):
+        left, center, right = bins[m - 1], bins[m], bins[m + 1]
+        if center > left:
+            filters[m - 1, left:center] = (np.arange(left, center) - left) / (center - left)
+        if right > center:
+            filters[m - 1, center:right] = (right - np.arange(center, right)) / (right - center)
+    return filters
+
+
+def log_mel(audio: np.ndarray, filters: np.ndarray, n_fft: int = 1024, hop: int = 256) -> np.ndarray:
+    spectrum = torch.stft(
+        torch.from_numpy(audio.astype(np.float32)),
+        n_fft=n_fft,
+        hop_length=hop,
+        window=torch.hann_window(n_fft),
+        return_complex=True,
+    ).abs().numpy()
+    return 20.0 * np.log10(np.maximum(filters @ spectrum, 1e-5))
+
+
+def synthesize(entry, sentence: str) -> tuple:
+    inputs = entry.tokenizer(sentence, return_tensors="pt")
+    torch.manual_seed(0)
+    start_time = time.time()
+    with torch.no_grad():
+        waveform = entry.model(**inputs).waveform
+    return waveform.squeeze().numpy(), time.time() - start_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="Benjamin-png/swahili-mms-tts-finetuned")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    registry = ModelRegistry(memory_budget_bytes=0)
+    entries = {
+        "fp32": registry.get(model_key(args.model)),
+        "int8": registry.get(model_key(args.model, quantized=True)),
+    }
+    for entry in entries.values():
+        # Deterministic outputs so fp32 and int8 are directly comparable
+        entry.model.noise_scale = 0.0
+        entry.model.noise_scale_duration = 0.0
+        synthesize(entry, CORPUS[0])
+
+    sample_rate = entries["fp32"].model.config.sampling_rate
+    filters = mel_filterbank(sample_rate, n_fft=1024)
+
+    latencies = {name: [] for name in entries}
+    mel_distances, snrs, duration_diffs = [], [], []
+    for sentence in CORPUS:
+        outputs = {}
+        for name, entry in entries.items():
+            for _ in range(args.repeats):
+                outputs[name], latency = synthesize(entry, sentence)
+                latencies[name].append(latency)
+
+        reference, quantized = outputs["fp32"], outputs["int8"]
+        duration_diffs.append(abs(len(quantized) - len(reference)) / len(reference))
+        length = min(len(reference), len(quantized))
+        reference, quantized = reference[:length], quantized[:length]
+        noise = np.sum((reference - quantized) ** 2)
+        snrs.append(10.0 * np.log10(np.sum(reference ** 2) / max(noise, 1e-12)))
+        mel_distances.append(float(np.mean(np.abs(log_mel(reference, filters) - log_mel(quantized, filters)))))
+
+    for name, entry in entries.items():
+        values = np.array(latencies[name])
+        print(
+            f"{name}: mean {values.mean() * 1000:.1f} ms, p95 {np.percentile(values, 95) * 1000:.1f} ms per sentence, "
+            f"{entry.resident_bytes / 1024 / 1024:.1f} MB weights"
+        )
+    speedup = np.mean(latencies["fp32"]) / np.mean(latencies["int8"])
+    print(f"int8 speedup: {speedup:.2f}x")
+    print(f"int8 vs fp32: log-mel distance {np.mean(mel_distances):.2f} dB, "
+          f"waveform SNR {np.mean(snrs):.1f} dB, duration difference {np.mean(duration_diffs) * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# benchmarks/bench_segmentation.py
+"""
+Check the sentence segmenter against its regression corpus and measure it.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_segmentation --paragraphs 20000
+    python -m benchmarks.bench_segmentation --csv texts.csv --max-chars 200
+
+First every case in `benchmarks/data/segmentation_corpus.jsonl` is split
+and compared with its expected sentences (cases may set their own
+`max_chars`); any mismatch is printed and the script exits with status 1
+after the benchmark.
+
+Then a corpus of Swahili paragraphs, generated from sentences with
+abbreviations, quotes, ellipses and long run-on clauses, or taken from the
+`sentence` column of a CSV, is split two ways:
+
+- legacy: the previous `split_into_sentences`, which split only at `.!?`
+  followed by an uppercase letter;
+- segmenter: `SentenceSegmenter` with `--max-chars`.
+
+Reported per mode: paragraphs/sec and characters/sec, and the length of the
+resulting pieces (mean, p95, max and how many exceed `--max-chars`), which
+bounds the input length of every forward pass.
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import re
+import time
+from typing import Callable, List
+
+import numpy as np
+
+from app.services.sentence_segmenter import SentenceSegmenter
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "data", "segmentation_corpus.jsonl")
+
+SENTENCES = [
+    "Habari za asubuhi.",
+    "Bw. Juma na Dkt. Amina walifika mapema kwenye mkutano wa kijiji.",
+    "Alisema, \"Njoo hapa upesi.\"",
+    "\"Karibu sana!\" alisema mama huku akitabasamu.",
+    "Nilikuwa nikisubiri... nikaona gari likija kwa kasi.",
+    "Tulinunua matunda, mboga, mchele n.k. kisha tukarudi nyumbani.",
+    "Mwalimu J. K. Nyerere alikuwa rais wa kwanza wa Tanzania.",
+    "mvua ilinyesha usiku kucha.",
+    "Watoto walicheza uwanjani, wazazi walizungumza kuhusu mavuno ya mwaka huu, walimu walipanga ratiba ya "
+    "mitihani ya mwisho wa muhula, wafanyabiashara walihesabu mapato yao ya wiki nzima, na wazee walikaa "
+    "kivulini wakisimulia hadithi za zamani kuhusu safari zao ndefu kutoka pwani hadi bara wakati wa ukoloni.",
+    "Mkulima alipanda mahindi mengi shambani mwake lakini mvua haikunyesha kwa wakati uliotarajiwa na hivyo "
+    "mavuno yalikuwa hafifu sana mwaka ule; hata hivyo hakukata tamaa kwa sababu alijua kwamba msimu ujao "
+    "ungekuwa bora zaidi ikiwa angeweka mbolea ya kutosha mapema.",
+]
+
+
+def generate_paragraphs(paragraphs: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(SENTENCES) for _ in range(rng.randint(1, 8))) for _ in range(paragraphs)]
+
+
+def load_csv(path: str) -> List[str]:
+    with open(path, newline="", encoding="utf-8") as f:
+        return [row["sentence"] for row in csv.DictReader(f) if row.get("sentence")]
+
+
+def split_legacy(text: str) -> List[str]:
+    """The sentence splitting the API used before the segmenter."""
+    sentences = re.split(r'(?<=[.!?])\s+(?=[A-Z])', text.strip())
+    return [s.strip() for s in sentences if s.strip()]
+
+
+def check_corpus(max_chars: int) -> int:
+    """Split every regression case, print mismatches and return how many failed."""
+    failures = 0
+    with open(CORPUS_PATH, encoding="utf-8") as f:
+        cases = [json.loads(line) for line in f if line.strip()]
+    for case in cases:
+        result = SentenceSegmenter(case.get("max_chars", max_chars)).split(case["text"])
+        if result != case["expected"]:
+            failures += 1
+            print(f"FAIL {case['case']}:\n  text:     {case['text']!r}\n  expected: {case['expected']}\n  got:      {result}")
+    print(f"Regression corpus: {len(cases) - failures}/{len(cases)} cases pass")
+    return failures
+
+
+def measure(name: str, split: Callable[[str], List[str]], corpus: List[str], max_chars: int) -> dict:
+    start_time = time.perf_counter()
+    pieces = [piece for text in corpus for piece in split(text)]
+    elapsed = time.perf_counter() - start_time
+    lengths = np.array([len(piece) for piece in pieces])
+    return {
+        "mode": name,
+        "seconds": elapsed,
+        "paragraphs_per_second": len(corpus) / elapsed,
+        "characters_per_second": sum(len(text) for text in corpus) / elapsed,
+        "pieces": len(pieces),
+        "mean": lengths.mean(),
+        "p95": np.percentile(lengths, 95),
+        "max": lengths.max(),
+        "over_limit": int((lengths > max_chars).sum()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", help="read texts from this CSV instead of generating paragraphs")
+    parser.add_argument("--paragraphs", type=int, default=20_000, help="generated paragraphs (default: 20000)")
+    parser.add_argument("--max-chars", type=int, default=250, help="segmenter chunk limit (default: 250)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    failures = check_corpus(args.max_chars)
+
+    corpus = load_csv(args.csv) if args.csv else generate_paragraphs(args.paragraphs, args.seed)
+    print(f"\n{len(corpus)} texts, {sum(len(text) for text in corpus)} characters")
+    segmenter = SentenceSegmenter(args.max_chars)
+    for result in (
+        measure("legacy", split_legacy, corpus, args.max_chars),
+        measure("segmenter", segmenter.split, corpus, args.max_chars),
+    ):
+        print(
+            f"{result['mode']:>10}: {result['paragraphs_per_second']:9.0f} texts/s "
+            f"{result['characters_per_second'] / 1e6:6.2f} M chars/s | {result['pieces']} pieces, "
+            f"length mean {result['mean']:.0f} p95 {result['p95']:.0f} max {result['max']}, "
+            f"{result['over_limit']} over {args.max_chars}"
+        )
+
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
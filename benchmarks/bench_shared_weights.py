@@ -0,0 +1,89 @@
+# benchmarks/bench_shared_weights.py
+"""
+Measure per-worker memory with private vs memory-mapped shared model weights.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_shared_weights --model Benjamin-png/swahili-mms-tts-finetuned --workers 3
+
+For each mode, spawns `--workers` processes the way gunicorn workers load a
+voice: each loads the model through a fresh ModelRegistry and synthesizes one
+sentence. While all of them are alive, each reports how much its RSS and PSS
+grew, how much of that is clean shared pages, and how much is private dirty
+(anonymous) memory that no other process can share. RSS counts shared pages
+in every process; summed PSS growth is the real cost of the workers.
+"""
+import argparse
+import multiprocessing
+import os
+
+
+def worker(model_name: str, shared: bool, ready, done, results) -> None:
+    os.environ["SHARED_WEIGHTS"] = "true" if shared else "false"
+    import torch
+    from transformers import AutoTokenizer, VitsModel  # noqa: F401, resolve lazy imports before measuring
+    from app.services.model_registry import ModelRegistry, WARMUP_TEXT
+    from app.services.shared_weights import process_memory
+
+    torch.set_num_threads(1)
+    before = process_memory()
+    entry = ModelRegistry(memory_budget_bytes=0).get(model_name)
+    inputs = entry.tokenizer(WARMUP_TEXT, return_tensors="pt")
+    with torch.no_grad():
+        entry.model(**inputs)
+
+    ready.wait()
+    after = process_memory()
+    results.put({
+        "weights": entry.resident_bytes,
+        "rss": after["rss_bytes"] - before["rss_bytes"],
+        "pss": after["pss_bytes"] - before["pss_bytes"],
+        "shared_clean": after["shared_clean_bytes"] - before["shared_clean_bytes"],
+        "private_dirty": after["private_dirty_bytes"] - before["private_dirty_bytes"],
+    })
+    done.wait()
+
+
+def run(model_name: str, shared: bool, workers: int) -> list:
+    context = multiprocessing.get_context("spawn")
+    ready, done = context.Barrier(workers), context.Barrier(workers + 1)
+    results = context.Queue()
+    processes = [
+        context.Process(target=worker, args=(model_name, shared, ready, done, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    stats = [results.get() for _ in processes]
+    done.wait()
+    for process in processes:
+        process.join()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="Benjamin-png/swahili-mms-tts-finetuned")
+    parser.add_argument("--workers", type=int, default=3)
+    args = parser.parse_args()
+
+    # Write the shared weights file up front so its cost is not measured
+    run(args.model, shared=True, workers=1)
+
+    mb = 1024 * 1024
+    for shared in (False, True):
+        stats = run(args.model, shared, args.workers)
+        weights = stats[0]["weights"]
+        mean_rss = sum(s["rss"] for s in stats) / len(stats)
+        total_pss = sum(s["pss"] for s in stats)
+        print(
+            f"{'shared' if shared else 'private'}: {weights / mb:.1f} MB weights, "
+            f"RSS +{mean_rss / mb:.1f} MB per worker "
+            f"(of which {sum(s['shared_clean'] for s in stats) / len(stats) / mb:.1f} MB shared clean, "
+            f"{sum(s['private_dirty'] for s in stats) / len(stats) / mb:.1f} MB private dirty), "
+            f"PSS +{total_pss / mb:.1f} MB across {len(stats)} workers "
+            f"({total_pss / len(stats) / weights * 100:.0f}% of model size per worker)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# benchmarks/trace_report.py
+"""
+Summarize the JSON request traces written to TRACE_LOG_FILE, or to api.log
+when it is not set.
+
+Usage (from the repository root):
+    python -m benchmarks.trace_report api.log
+    python -m benchmarks.trace_report traces.log --group voice,format --cache MISS
+
+Every line of the trace log is one request: its method, path, status,
+attributes (voice, model, format, stream, cache, sentences...), `total_ms`
+and `stages_ms`, the milliseconds spent in each stage (normalize, queue,
+model_load, split, tokenize, inference, postprocess, encode...). Traces
+are grouped by `--group` attributes, and for every group the request count
+and p50/p95/p99 of each stage and of the total are printed.
+"""
+import argparse
+import json
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+
+def load_traces(path: str) -> List[dict]:
+    traces = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            # Tolerate a trace log shared with plain-text lines
+            start = line.find("{")
+            if start < 0:
+                continue
+            try:
+                traces.append(json.loads(line[start:]))
+            except json.JSONDecodeError:
+                continue
+    return traces
+
+
+def group_stages(traces: List[dict], group_by: List[str]) -> Dict[Tuple, Dict[str, List[float]]]:
+    groups: Dict[Tuple, Dict[str, List[float]]] = defaultdict(lambda: defaultdict(list))
+    for trace in traces:
+        stages = groups[tuple(trace.get(key) for key in group_by)]
+        for stage, ms in trace.get("stages_ms", {}).items():
+            stages[stage].append(ms)
+        stages["total"].append(trace["total_ms"])
+    return groups
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="trace log (TRACE_LOG_FILE, or api.log)")
+    parser.add_argument("--group", default="voice", help="comma-separated attributes to group by (default: voice)")
+    parser.add_argument("--path-prefix", default="/tts/", help="only requests under this path (default: /tts/)")
+    parser.add_argument("--cache", help="only requests with this audio cache status (HIT or MISS)")
+    args = parser.parse_args()
+
+    group_by = [key.strip() for key in args.group.split(",") if key.strip()]
+    traces = [
+        trace for trace in load_traces(args.path)
+        if trace.get("path", "").startswith(args.path_prefix)
+        and trace.get("status") == 200
+        and (args.cache is None or trace.get("cache") == args.cache)
+    ]
+    print(f"{len(traces)} traced requests")
+    for key, stages in sorted(group_stages(traces, group_by).items(), key=lambda item: str(item[0])):
+        label = ", ".join(f"{name}={value}" for name, value in zip(group_by, key))
+        print(f"\n{label}: {len(stages['total'])} requests")
+        for stage, values in stages.items():
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            print(f"  {stage:>12}: p50 {p50:9.1f} ms  p95 {p95:9.1f} ms  p99 {p99:9.1f} ms  ({len(values)} samples)")
+
+
+if __name__ == "__main__":
+    main()
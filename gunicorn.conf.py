@@ -0,0 +1,25 @@
+# gunicorn.conf.py
+"""
+gunicorn server hooks, loaded automatically from the working directory.
+Command-line options (workers, timeouts, bind...) are left to the command.
+
+Prometheus metrics are kept in PROMETHEUS_MULTIPROC_DIR, one set of files
+per worker process: they are cleared when the server starts, the live
+gauges of a worker are dropped when it exits, and workers forked from a
+--preload master publish the models they inherited.
+"""
+from app.services.metrics import mark_process_dead, reset_multiprocess_dir
+
+
+def on_starting(server):
+    reset_multiprocess_dir()
+
+
+def post_fork(server, worker):
+    from app.services.model_registry import model_registry
+
+    model_registry.publish_metrics()
+
+
+def child_exit(server, worker):
+    mark_process_dead(worker.pid)
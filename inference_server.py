@@ -0,0 +1,37 @@
+# inference_server.py
+"""
+Run the dedicated inference process pool.
+
+    INFERENCE_POOL_SOCKET=/tmp/swahili-tts.sock python inference_server.py
+
+Start the HTTP server with the same INFERENCE_POOL_SOCKET so its workers
+send synthesis to this pool instead of loading models themselves.
+"""
+import argparse
+import logging
+
+from app.config import settings
+from app.services.inference_pool import InferencePoolServer
+from app.services.model_registry import parse_model_list
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--socket", default=settings.INFERENCE_POOL_SOCKET, help="Unix socket path (INFERENCE_POOL_SOCKET)")
+    parser.add_argument("--processes", type=int, default=settings.INFERENCE_POOL_PROCESSES)
+    parser.add_argument("--torch-threads", type=int, default=settings.INFERENCE_POOL_TORCH_THREADS)
+    args = parser.parse_args()
+    if not args.socket:
+        parser.error("set INFERENCE_POOL_SOCKET or pass --socket")
+
+    server = InferencePoolServer(args.socket, processes=args.processes, torch_threads=args.torch_threads)
+    server.serve_forever(parse_model_list(settings.PRELOAD_MODELS), warm_up=settings.MODEL_WARMUP)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,21 @@
 # main.py
 import uvicorn
-from app.main import app
+from app.services.metrics import reset_multiprocess_dir
 import os
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+def __getattr__(name):
+    # `main:app` for gunicorn, imported on first access: `python main.py` only
+    # supervises the uvicorn workers, which import app.main themselves, and
+    # must not load the voice models it preloads
+    if name == "app":
+        from app.main import app
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 def main():
     # Get port from environment variable or default to 8000
     port = int(os.getenv("PORT", 8000))
@@ -17,6 +26,9 @@ def main():
     # Get reload setting from environment variable or default to False
     reload = os.getenv("RELOAD", "False").lower() == "true"
     
+    # Start the workers with empty Prometheus metric files
+    reset_multiprocess_dir()
+    
     # Run the application
     uvicorn.run(
         "app.main:app",
@@ -0,0 +1,240 @@
+# synthesize_corpus.py
+"""
+Render a text corpus to audio offline.
+
+    python synthesize_corpus.py --voice benny --output corpus_audio --workers 4
+    python synthesize_corpus.py --csv texts.csv --model Benjamin-png/swahili-mms-tts-finetuned --output corpus_audio
+
+Sentences come from the `training_texts` collection (approved ones by
+default) or from a CSV with the `client_id,path,sentence` columns used by
+the import endpoint. They are sharded across worker processes, each with its
+own model and pinned torch threads, and written as `<name>.wav`, where the
+name is the file stem of `path` (or the text id). Sentences are normalized
+(numbers, dates, abbreviations... spelled out) exactly as the API does
+before synthesis. Every finished item is appended to a per-shard progress
+file, so a killed run started again with the same output directory skips
+what is already done. At the end the progress files are merged into
+`manifest.csv`, with each sentence's normalized text next to the original.
+"""
+import argparse
+import asyncio
+import csv
+import glob
+import json
+import multiprocessing
+import os
+import queue
+import re
+import tempfile
+import time
+from typing import Dict, List, Set
+
+MANIFEST_FIELDS = ["name", "file", "client_id", "path", "sentence", "normalized_text", "duration_seconds", "sample_rate"]
+
+
+def load_csv(path: str) -> List[Dict[str, str]]:
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        missing = {"client_id", "path", "sentence"} - set(reader.fieldnames or [])
+        if missing:
+            raise SystemExit(f"CSV must contain columns: client_id, path, sentence (missing {', '.join(sorted(missing))})")
+        return [
+            {"id": str(i), "client_id": row["client_id"], "path": row["path"], "sentence": row["sentence"]}
+            for i, row in enumerate(reader)
+        ]
+
+
+def load_mongo(status: str) -> List[Dict[str, str]]:
+    from app.config import settings
+    from app.database.mongodb import Database, close_mongo_connection, connect_to_mongo
+
+    async def fetch():
+        await connect_to_mongo()
+        try:
+            query = {"status": status} if status else {}
+            cursor = Database.client[settings.DB_NAME].training_texts.find(
+                query, {"client_id": 1, "path": 1, "sentence": 1}
+            ).sort("_id", 1)
+            return [
+                {
+                    "id": str(text["_id"]),
+                    "client_id": str(text.get("client_id", "")),
+                    "path": text.get("path", ""),
+                    "sentence": text["sentence"],
+                }
+                async for text in cursor
+            ]
+        finally:
+            await close_mongo_connection()
+
+    return asyncio.run(fetch())
+
+
+def assign_names(items: List[Dict[str, str]]) -> None:
+    """Give every item a unique, filesystem-safe output name."""
+    seen: Set[str] = set()
+    for item in items:
+        stem = os.path.splitext(os.path.basename(item["path"]))[0] if item["path"] else item["id"]
+        name = re.sub(r"[^A-Za-z0-9_.-]+", "_", stem).strip("._") or item["id"]
+        if name in seen:
+            name = f"{name}-{item['id']}"
+        seen.add(name)
+        item["name"] = name
+
+
+def read_progress(output_dir: str) -> Dict[str, dict]:
+    """Entries already completed by earlier runs, keyed by name."""
+    done = {}
+    for path in sorted(glob.glob(os.path.join(output_dir, "progress-*.jsonl"))):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # line cut short when a run was killed
+                if os.path.exists(os.path.join(output_dir, entry["file"])):
+                    done[entry["name"]] = entry
+    return done
+
+
+def write_wav(path: str, audio, sample_rate: int) -> None:
+    from app.services.audio_service import to_pcm16, wav_header
+
+    pcm = to_pcm16(audio).tobytes()
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(wav_header(sample_rate, data_size=len(pcm)))
+        f.write(pcm)
+    os.replace(tmp_path, path)
+
+
+def worker(shard: int, items: List[Dict[str, str]], model_name: str, output_dir: str,
+           batch_size: int, torch_threads: int, progress) -> None:
+    import torch
+    from app.services.text_normalizer import normalize_text
+    from app.services.tts_service import generate_audio_batch
+
+    torch.set_num_threads(torch_threads)
+    with open(os.path.join(output_dir, f"progress-{shard}.jsonl"), "a", encoding="utf-8") as log:
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            batch_start = time.time()
+            texts = [normalize_text(item["sentence"]) for item in batch]
+            audios, sample_rate = generate_audio_batch(texts, model_name)
+            synthesis_time = time.time() - batch_start
+
+            audio_seconds = 0.0
+            for item, text, audio in zip(batch, texts, audios):
+                file_name = f"{item['name']}.wav"
+                write_wav(os.path.join(output_dir, file_name), audio, sample_rate)
+                duration = len(audio) / sample_rate
+                audio_seconds += duration
+                log.write(json.dumps({
+                    "name": item["name"],
+                    "file": file_name,
+                    "client_id": item["client_id"],
+                    "path": item["path"],
+                    "sentence": item["sentence"],
+                    "normalized_text": text,
+                    "duration_seconds": round(duration, 3),
+                    "sample_rate": sample_rate,
+                }, ensure_ascii=False) + "\n")
+            log.flush()
+            progress.put((len(batch), audio_seconds, synthesis_time))
+
+
+def write_manifest(output_dir: str, entries: Dict[str, dict]) -> str:
+    path = os.path.join(output_dir, "manifest.csv")
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=MANIFEST_FIELDS)
+        writer.writeheader()
+        for entry in sorted(entries.values(), key=lambda entry: entry["name"]):
+            writer.writerow({field: entry.get(field) for field in MANIFEST_FIELDS})
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--csv", help="read sentences from this CSV instead of MongoDB")
+    source.add_argument("--status", default="approved", help="training_texts status to render; empty for all (default: approved)")
+    voice = parser.add_mutually_exclusive_group(required=True)
+    voice.add_argument("--voice", help="built-in voice id, e.g. benny")
+    voice.add_argument("--model", help="model repository or registry key, e.g. org/model@int8")
+    parser.add_argument("--output", required=True, help="output directory; rerun with the same one to resume")
+    parser.add_argument("--workers", type=int, default=2, help="worker processes (default: 2)")
+    parser.add_argument("--torch-threads", type=int, default=1, help="torch threads per worker (default: 1)")
+    parser.add_argument("--batch-size", type=int, default=16, help="sentences per batched forward pass (default: 16)")
+    args = parser.parse_args()
+
+    from app.services.model_registry import model_key
+    from app.services.voice_service import DEFAULT_VOICES
+
+    if args.voice:
+        voices = {voice.voice_id: voice for voice in DEFAULT_VOICES}
+        if args.voice not in voices:
+            raise SystemExit(f"Unknown voice '{args.voice}', choose from: {', '.join(voices)}")
+        config = voices[args.voice]
+        model_name = model_key(config.model_name, quantized=config.quantized, backend=config.backend)
+    else:
+        model_name = args.model
+
+    items = load_csv(args.csv) if args.csv else load_mongo(args.status)
+    assign_names(items)
+    os.makedirs(args.output, exist_ok=True)
+    done = read_progress(args.output)
+    todo = [item for item in items if item["name"] not in done]
+    print(f"{len(items)} sentences, {len(items) - len(todo)} already done, {len(todo)} to synthesize with {model_name}")
+
+    if todo:
+        workers = max(1, min(args.workers, len(todo)))
+        context = multiprocessing.get_context("spawn")
+        progress = context.Queue()
+        processes = [
+            context.Process(
+                target=worker,
+                args=(shard, todo[shard::workers], model_name, args.output, args.batch_size, args.torch_threads, progress),
+            )
+            for shard in range(workers)
+        ]
+        start_time = time.time()
+        for process in processes:
+            process.start()
+
+        sentences, audio_seconds, synthesis_seconds = 0, 0.0, 0.0
+        last_report = start_time
+        while any(process.is_alive() for process in processes) or not progress.empty():
+            try:
+                batch_sentences, batch_audio, batch_time = progress.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            sentences += batch_sentences
+            audio_seconds += batch_audio
+            synthesis_seconds += batch_time
+            if time.time() - last_report >= 10 or sentences == len(todo):
+                elapsed = time.time() - start_time
+                print(
+                    f"{sentences}/{len(todo)} sentences, {sentences / elapsed:.2f} sentences/sec, "
+                    f"{audio_seconds:.1f} s of audio, RTF {elapsed / max(audio_seconds, 1e-9):.3f}"
+                )
+                last_report = time.time()
+        for process in processes:
+            process.join()
+
+        elapsed = time.time() - start_time
+        print(
+            f"Synthesized {sentences} sentences ({audio_seconds:.1f} s of audio) in {elapsed:.1f} s with {workers} workers: "
+            f"{sentences / elapsed:.2f} sentences/sec, "
+            f"RTF {elapsed / max(audio_seconds, 1e-9):.3f} overall, "
+            f"{synthesis_seconds / max(audio_seconds, 1e-9):.3f} per worker"
+        )
+        failed = [process.exitcode for process in processes if process.exitcode != 0]
+        if failed:
+            raise SystemExit(f"{len(failed)} workers failed; rerun the same command to resume")
+
+    manifest = write_manifest(args.output, read_progress(args.output))
+    print(f"Wrote {manifest}")
+
+
+if __name__ == "__main__":
+    main()